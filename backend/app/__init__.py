@@ -17,6 +17,20 @@ from app.core.errors import register_error_handlers
 from app.core.logging import setup_logging
 from app.middleware.security import SecurityMiddleware
 from app.middleware.request_context import RequestContextMiddleware
+from app.services.audit_writer import audit_writer
+from app.services.idempotency import idempotency
+from app.services.ledger import ledger
+from app.services.password_hasher import password_hasher
+from app.services.payment_queue import payment_queue
+from app.services.pi_network import pi_network
+from app.services.progress_buffer import progress_buffer
+from app.services.quest_expiry import quest_expiry_job
+from app.services.quest_participation import quest_participation
+from app.services.quest_stats import quest_stats
+from app.services.transaction_expiry import transaction_expiry_job
+from app.services.transaction_retry import transaction_retry
+from app.services.transfer_batcher import transfer_batcher
+from app.utils.snowflake import reference_numbers
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
@@ -100,6 +114,20 @@ def _initialize_extensions(app: Flask) -> None:
     jwt.init_app(app)
     bcrypt.init_app(app)
     cache.init_app(app)
+    password_hasher.init_app(app)
+    reference_numbers.init_app(app)
+    audit_writer.init_app(app)
+    idempotency.init_app(app)
+    ledger.init_app(app)
+    pi_network.init_app(app)
+    payment_queue.init_app(app)
+    transfer_batcher.init_app(app)
+    progress_buffer.init_app(app)
+    quest_stats.init_app(app)
+    quest_participation.init_app(app)
+    quest_expiry_job.init_app(app)
+    transaction_expiry_job.init_app(app)
+    transaction_retry.init_app(app)
     
     # CORS configuration for Pi Network integration
     CORS(app, resources={
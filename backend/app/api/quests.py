@@ -3,6 +3,12 @@
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, Quest, User, QuestProgress
+from app.models.quest import QuestStatus
+from app.services.progress_buffer import progress_buffer
+from app.services.quest_participation import quest_participation
+from app.services.quest_graph import quest_graph
+from app.services.quest_recommender import quest_recommender
+from app.services.quest_search import quest_search_index
 from .utils import api_response, api_error
 
 api_quests = Blueprint('api_quests', __name__)
@@ -11,7 +17,74 @@ api_quests = Blueprint('api_quests', __name__)
 @jwt_required()
 def list_quests():
     quests = Quest.query.all()
-    return api_response(data=[q.to_dict() for q in quests])
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return api_response(data=[q.to_dict() for q in quests])
+    return api_response(data=Quest.serialize_for_user(quests, user))
+
+@api_quests.route('/search', methods=['GET'])
+@jwt_required()
+def search_quests():
+    """Full-text and tag search with prefix matching, filters and pagination."""
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', 20)), 1), 100)
+        offset = max(int(args.get('offset', 0)), 0)
+        min_level = int(args['min_level']) if 'min_level' in args else None
+        max_level = int(args['max_level']) if 'max_level' in args else None
+    except ValueError:
+        return api_error('limit, offset and level filters must be integers', 400)
+
+    quest_search_index.ensure_built()
+    hits, total = quest_search_index.search(
+        args.get('q', ''),
+        difficulty=args.get('difficulty'),
+        quest_type=args.get('type'),
+        min_level=min_level,
+        max_level=max_level,
+        limit=limit,
+        offset=offset
+    )
+
+    # The index may trail a commit made by another worker; never return a quest that is no longer active
+    quests = {quest.id: quest for quest in Quest.query.filter(
+        Quest.id.in_([qid for qid, _ in hits]), Quest.status == QuestStatus.ACTIVE
+    )} if hits else {}
+    results = []
+    for quest_id, score in hits:
+        quest = quests.get(quest_id)
+        if quest is not None:
+            results.append({**quest.to_dict(), 'score': round(score, 4)})
+    return api_response(data={'results': results, 'total': total, 'limit': limit, 'offset': offset})
+
+@api_quests.route('/recommended', methods=['GET'])
+@jwt_required()
+def recommended_quests():
+    """Quests ranked for the current user by level fit, history and reward rate."""
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return api_error('User not found', 404)
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return api_error('limit must be an integer', 400)
+
+    return api_response(data=[
+        {**quest.to_dict(), 'score': score} for quest, score in quest_recommender.recommend(user, limit)
+    ])
+
+@api_quests.route('/<quest_id>/unlocks', methods=['GET'])
+@jwt_required()
+def list_unlocks(quest_id):
+    """Quests that become available once the current user completes quest_id."""
+    user_id = get_jwt_identity()
+    completed = {
+        row.quest_id for row in QuestProgress.query.with_entities(QuestProgress.quest_id).filter_by(
+            user_id=user_id, status='completed'
+        )
+    }
+    quest_graph.ensure_built()
+    return api_response(data=quest_graph.unlocked_by(quest_id, completed))
 
 @api_quests.route('/start', methods=['POST'])
 @jwt_required()
@@ -31,6 +104,9 @@ def start_quest():
     if QuestProgress.query.filter_by(user_id=user_id, quest_id=quest_id).first():
         return api_error('Quest already started', 409)
 
+    if not quest_participation.reserve(db.session, quest):
+        return api_error('Quest is full', 409)
+
     progress = QuestProgress(user_id=user_id, quest_id=quest_id, progress=0.0, completed=False)
     db.session.add(progress)
     db.session.commit()
@@ -50,8 +126,14 @@ def update_progress():
     if not progress:
         return api_error('No active quest progress found', 404)
 
-    progress.progress = float(progress_value)
-    if progress.progress >= 100.0:
-        progress.completed = True
-    db.session.commit()
-    return api_response(message="Quest progress updated", data=progress.to_dict())
+    target = db.session.query(Quest.objective_target).filter_by(id=quest_id).scalar()
+    completed = progress_buffer.record(progress, int(progress_value), data.get('data'), target)
+    if completed:
+        db.session.commit()
+        return api_response(message="Quest completed", data=progress.to_dict())
+
+    # Buffered ticks are written in the background; echo the accepted value
+    result = progress.to_dict()
+    pending = progress_buffer.pending_value(user_id, quest_id)
+    result['progress_value'] = progress.progress_value if pending is None else pending
+    return api_response(message="Quest progress updated", data=result)
@@ -8,7 +8,10 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from sqlalchemy.exc import SQLAlchemyError
 from app.models import Quest, User, db
+from app.core.exceptions import ValidationError
 from app.utils.error_handlers import error_response
+from app.services.quest_completion import complete_quest_for_users
+from app.services.quest_stats import quest_stats
 from functools import wraps
 
 admin_bp = Blueprint('admin', __name__)
@@ -53,6 +56,28 @@ def create_quest():
         current_app.logger.error("Quest creation failed: %s", str(e))
         return error_response("Failed to create quest. Please try again.", 500)
 
+@admin_bp.route('/quests/<quest_id>/complete', methods=['POST'])
+@login_required
+@admin_required
+def bulk_complete_quest(quest_id: str):
+    """Complete a quest and grant rewards for many users at once (Admin only)."""
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids')
+    if not isinstance(user_ids, list) or not user_ids:
+        return error_response("user_ids must be a non-empty list.", 400)
+
+    try:
+        outcome = complete_quest_for_users(quest_id, [str(user_id) for user_id in user_ids])
+    except ValidationError as e:
+        return error_response(str(e), 404)
+    except SQLAlchemyError as e:
+        current_app.logger.error("Bulk completion of quest %s failed: %s", quest_id, str(e))
+        return error_response("Failed to complete quest. Please try again.", 500)
+
+    current_app.logger.info("Admin '%s' completed quest %s for %d users",
+                            current_user.username, quest_id, len(outcome['results']))
+    return jsonify({"success": True, "quest_id": quest_id, **outcome})
+
 @admin_bp.route('/users/<int:user_id>/ban', methods=['POST'])
 @login_required
 @admin_required
@@ -71,3 +96,21 @@ def ban_user(user_id: int):
         db.session.rollback()
         current_app.logger.error("Failed to ban user %s: %s", user.id, str(e))
         return error_response("Failed to ban user. Please try again.", 500)
+
+@admin_bp.route('/stats/<scope>/<scope_id>', methods=['GET'])
+@login_required
+@admin_required
+def quest_stats_dashboard(scope: str, scope_id: str):
+    """All-time totals and hourly buckets for a quest or category (Admin only)."""
+    if scope not in ('quest', 'category'):
+        return error_response("Scope must be 'quest' or 'category'.", 400)
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 31)
+
+    totals = quest_stats.totals(scope, [scope_id]).get(scope_id)
+    return jsonify({
+        "success": True,
+        "scope": scope,
+        "id": scope_id,
+        "totals": totals.to_dict() if totals else None,
+        "hourly": [row.to_dict() for row in quest_stats.series(scope, scope_id, hours)]
+    })
@@ -17,10 +17,12 @@ from werkzeug.security import check_password_hash
 from sqlalchemy.exc import IntegrityError
 
 from app.models.user import User
-from app.models.audit_log import AuditLog
 from app import db
 from app.blueprints.auth import auth_bp
 from app.blueprints.auth.forms import LoginForm, RegistrationForm, PasswordResetForm
+from app.services.audit_writer import audit_writer
+from app.services.login_throttle import LoginFailureCounter
+from app.services.password_hasher import HasherBusyError
 from app.utils.rate_limiter import rate_limit
 from app.utils.validators import validate_password_strength, validate_email_format
 from app.utils.security import generate_csrf_token, verify_csrf_token
@@ -29,35 +31,27 @@ logger = logging.getLogger(__name__)
 
 # Constants for security policies
 MAX_LOGIN_ATTEMPTS = 5
+MAX_IP_LOGIN_ATTEMPTS = 20  # Across all usernames from one address
 LOCKOUT_DURATION = timedelta(minutes=30)
 SESSION_TIMEOUT = timedelta(hours=24)
 
+login_failures = LoginFailureCounter(MAX_LOGIN_ATTEMPTS, LOCKOUT_DURATION, MAX_IP_LOGIN_ATTEMPTS)
+
 def log_security_event(event_type: str, user_id: Optional[int] = None, 
                       details: Optional[Dict] = None):
-    """Log security-related events for audit purposes."""
-    try:
-        audit_entry = AuditLog(
-            event_type=event_type,
-            user_id=user_id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent', ''),
-            details=details or {},
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(audit_entry)
-        db.session.commit()
-    except Exception as e:
-        logger.error(f"Failed to log security event: {str(e)}")
+    """Queue a security-related event for the audit log."""
+    audit_writer.log(
+        event_type,
+        user_id=user_id,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent', ''),
+        details=details,
+        timestamp=datetime.utcnow()
+    )
 
 def check_account_lockout(username: str) -> bool:
-    """Check if account is currently locked due to failed attempts."""
-    recent_attempts = AuditLog.query.filter(
-        AuditLog.event_type == 'failed_login',
-        AuditLog.details.contains({'username': username}),
-        AuditLog.timestamp > datetime.utcnow() - LOCKOUT_DURATION
-    ).count()
-    
-    return recent_attempts >= MAX_LOGIN_ATTEMPTS
+    """Check if account or client IP is currently locked due to failed attempts."""
+    return login_failures.is_locked(username, request.remote_addr)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 @rate_limit(max_requests=10, window=300)  # 10 requests per 5 minutes
@@ -88,12 +82,13 @@ def login():
             
             user = User.query.filter_by(username=username).first()
             
-            if user and user.is_active and user.check_password(form.password.data):
+            if user and user.is_active and user.verify_password(form.password.data):
                 # Successful login
+                login_failures.reset(username)
                 login_user(user, remember=form.remember_me.data, 
                           duration=SESSION_TIMEOUT)
                 
-                # Update user's last login
+                # Update user's last login (also persists a rehashed password)
                 user.last_login = datetime.utcnow()
                 user.login_count += 1
                 db.session.commit()
@@ -110,6 +105,7 @@ def login():
                 return redirect(url_for('main.dashboard'))
             else:
                 # Failed login attempt
+                login_failures.record_failure(username, request.remote_addr)
                 log_security_event(
                     'failed_login',
                     user_id=user.id if user else None,
@@ -211,6 +207,9 @@ def register():
                 login_user(user)
                 return redirect(url_for('main.welcome'))
                 
+            except HasherBusyError:
+                db.session.rollback()
+                raise  # Served as 503 with Retry-After
             except IntegrityError as e:
                 db.session.rollback()
                 logger.error(f"Registration failed for {username}: {str(e)}")
@@ -26,6 +26,10 @@ from app.utils.quest_engine import QuestEngine
 from app.utils.caching import cache_result
 from app.utils.pagination import paginate_query
 from app.utils.permissions import require_permission
+from app.services.quest_board import quest_board_cache
+from app.services.quest_leaderboard import PERIODS as LEADERBOARD_PERIODS
+from app.services.quest_leaderboard import quest_leaderboard as leaderboard_store
+from app.services.quest_limits import QuestLimitCounter
 
 logger = logging.getLogger(__name__)
 
@@ -40,19 +44,36 @@ XP_MULTIPLIERS = {
     QuestDifficulty.LEGENDARY: Decimal('5.0')
 }
 
+quest_limits = QuestLimitCounter(DAILY_QUEST_LIMIT, WEEKLY_QUEST_LIMIT)
+
 class QuestManager:
     """Centralized quest management with business logic."""
     
+    @staticmethod
+    def _available_quests_query(user: User):
+        """Base query for active, level-appropriate quests the user has not completed."""
+        completed_quest_ids = db.session.query(UserQuest.quest_id).filter(
+            UserQuest.user_id == user.id,
+            UserQuest.status == QuestStatus.COMPLETED
+        ).subquery()
+        
+        return Quest.query.filter(
+            Quest.is_active == True,
+            Quest.min_level <= user.level,
+            Quest.max_level >= user.level,
+            ~Quest.id.in_(completed_quest_ids)
+        ).order_by(
+            Quest.priority.desc(),
+            Quest.xp_reward.desc(),
+            Quest.created_at.desc()
+        )
+    
     @staticmethod
     def get_available_quests(user: User, page: int = 1, 
                            category: Optional[str] = None,
                            difficulty: Optional[str] = None) -> Dict[str, Any]:
         """Get quests available to user with filtering and pagination."""
-        query = Quest.query.filter(
-            Quest.is_active == True,
-            Quest.min_level <= user.level,
-            Quest.max_level >= user.level
-        )
+        query = QuestManager._available_quests_query(user)
         
         # Filter by category if specified
         if category:
@@ -62,26 +83,110 @@ class QuestManager:
         if difficulty:
             query = query.filter(Quest.difficulty == difficulty)
         
-        # Exclude already completed quests
-        completed_quest_ids = db.session.query(UserQuest.quest_id).filter(
-            UserQuest.user_id == user.id,
-            UserQuest.status == QuestStatus.COMPLETED
-        ).subquery()
+        return paginate_query(query, page, per_page=20)
+    
+    @staticmethod
+    def _quest_card(quest: Quest) -> Dict[str, Any]:
+        """Serialize the user-independent part of a quest board entry."""
+        card = quest.to_dict()
+        card['xp_multiplier'] = float(XP_MULTIPLIERS.get(quest.difficulty, 1.0))
+        card['estimated_duration'] = quest.estimated_completion_time
+        return card
+    
+    @staticmethod
+    def build_quest_board(user: User, version: str) -> Dict[str, Any]:
+        """Materialize the user's quest board and warm the quest card cache."""
+        quests = QuestManager._available_quests_query(user).all()
+        eligibility = Quest.check_eligibility(user, quests)
+        daily_completed = user.daily_quests_completed_today()
         
-        query = query.filter(~Quest.id.in_(completed_quest_ids))
+        quest_board_cache.set_cards(version, {
+            quest.id: QuestManager._quest_card(quest) for quest in quests
+        })
         
-        # Apply ordering for better UX
-        query = query.order_by(
-            Quest.priority.desc(),
-            Quest.xp_reward.desc(),
-            Quest.created_at.desc()
-        )
+        return {
+            'version': version,
+            'built_on': datetime.utcnow().date().isoformat(),
+            'entries': [
+                {
+                    'id': quest.id,
+                    'category': getattr(quest.category, 'name', quest.category),
+                    'difficulty': getattr(quest.difficulty, 'value', quest.difficulty),
+                    'can_start': eligibility[quest.id][0],
+                    'start_reason': eligibility[quest.id][1]
+                }
+                for quest in quests
+            ],
+            'user_context': {
+                'level': user.level,
+                'daily_quests_completed': daily_completed,
+                'weekly_quests_completed': user.weekly_quests_completed(),
+                'available_quest_slots': DAILY_QUEST_LIMIT - daily_completed
+            }
+        }
+    
+    @staticmethod
+    def get_quest_board(user: User, page: int = 1,
+                        category: Optional[str] = None,
+                        difficulty: Optional[str] = None,
+                        per_page: int = 20) -> Dict[str, Any]:
+        """
+        Serve a page of the user's quest board.
         
-        return paginate_query(query, page, per_page=20)
+        On a cache hit this reads the board and the page's quest cards from
+        the cache without querying the database.
+        """
+        version = quest_board_cache.catalog_version()
+        board = quest_board_cache.get_board(user.id, version)
+        if board is None or board['built_on'] != datetime.utcnow().date().isoformat():
+            board = QuestManager.build_quest_board(user, version)
+            quest_board_cache.set_board(user.id, board)
+        
+        entries = [
+            entry for entry in board['entries']
+            if (not category or entry['category'] == category)
+            and (not difficulty or entry['difficulty'] == difficulty)
+        ]
+        page = max(1, page)
+        page_entries = entries[(page - 1) * per_page:page * per_page]
+        quest_ids = [entry['id'] for entry in page_entries]
+        
+        cards = quest_board_cache.get_cards(version, quest_ids)
+        missing = [quest_id for quest_id in quest_ids if quest_id not in cards]
+        if missing:
+            loaded = {
+                quest.id: QuestManager._quest_card(quest)
+                for quest in Quest.query.filter(Quest.id.in_(missing)).all()
+            }
+            quest_board_cache.set_cards(version, loaded)
+            cards.update(loaded)
+        
+        items = []
+        for entry in page_entries:
+            card = cards.get(entry['id'])
+            if card is None:
+                continue  # Quest deleted since the board was built
+            items.append({
+                **card,
+                'can_start': entry['can_start'],
+                'start_reason': entry['start_reason']
+            })
+        
+        return {
+            'items': items,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': len(entries),
+                'pages': (len(entries) + per_page - 1) // per_page
+            },
+            'user_context': board['user_context']
+        }
     
     @staticmethod
     def start_quest(user: User, quest_id: int) -> Tuple[bool, str, Dict[str, Any]]:
         """Start a quest for a user with comprehensive validation."""
+        slot_acquired_at = None
         try:
             quest = Quest.query.get(quest_id)
             if not quest:
@@ -109,16 +214,6 @@ class QuestManager:
                 elif existing_quest.status == QuestStatus.IN_PROGRESS:
                     return False, "You are already working on this quest", {}
             
-            # Check daily/weekly limits
-            today = datetime.utcnow().date()
-            daily_count = UserQuest.query.filter(
-                UserQuest.user_id == user.id,
-                func.date(UserQuest.started_at) == today
-            ).count()
-            
-            if daily_count >= DAILY_QUEST_LIMIT:
-                return False, f"Daily quest limit reached ({DAILY_QUEST_LIMIT})", {}
-            
             # Check prerequisites
             if quest.prerequisite_quests:
                 completed_prerequisites = db.session.query(UserQuest.quest_id).filter(
@@ -130,12 +225,19 @@ class QuestManager:
                 if len(completed_prerequisites) < len(quest.prerequisite_quests):
                     return False, "You must complete prerequisite quests first", {}
             
+            # Reserve a daily/weekly slot last so rejected starts don't consume one
+            started_at = datetime.utcnow()
+            allowed, limit_message = quest_limits.try_acquire(user.id, started_at)
+            if not allowed:
+                return False, limit_message, {}
+            slot_acquired_at = started_at
+            
             # Create user quest record
             user_quest = UserQuest(
                 user_id=user.id,
                 quest_id=quest_id,
                 status=QuestStatus.IN_PROGRESS,
-                started_at=datetime.utcnow(),
+                started_at=started_at,
                 progress_data={
                     'objectives': {obj.id: 0 for obj in quest.objectives},
                     'started_level': user.level,
@@ -159,39 +261,30 @@ class QuestManager:
             
         except Exception as e:
             db.session.rollback()
+            if slot_acquired_at is not None:
+                quest_limits.release(user.id, slot_acquired_at)
             logger.error(f"Failed to start quest {quest_id} for user {user.id}: {str(e)}")
             return False, "An error occurred while starting the quest", {}
 
 @quests_bp.route('/available')
 @login_required
-@cache_result(timeout=300)  # Cache for 5 minutes
 def get_available_quests():
-    """Get available quests for the current user."""
+    """Get available quests for the current user from their quest board."""
     page = int(request.args.get('page', 1))
     category = request.args.get('category')
     difficulty = request.args.get('difficulty')
     
-    result = QuestManager.get_available_quests(
+    board = QuestManager.get_quest_board(
         current_user, page, category, difficulty
     )
     
-    # Add user-specific context
-    for quest in result['items']:
-        quest_dict = quest.to_dict()
-        quest_dict['can_start'] = current_user.level >= quest.min_level
-        quest_dict['xp_multiplier'] = float(XP_MULTIPLIERS.get(quest.difficulty, 1.0))
-        quest_dict['estimated_duration'] = quest.estimated_completion_time
-        result['items'][result['items'].index(quest)] = quest_dict
-    
     return jsonify({
         'success': True,
-        'data': result,
-        'user_context': {
-            'level': current_user.level,
-            'daily_quests_completed': current_user.daily_quests_completed_today(),
-            'weekly_quests_completed': current_user.weekly_quests_completed(),
-            'available_quest_slots': DAILY_QUEST_LIMIT - current_user.daily_quests_completed_today()
-        }
+        'data': {
+            'items': board['items'],
+            'pagination': board['pagination']
+        },
+        'user_context': board['user_context']
     })
 
 @quests_bp.route('/start', methods=['POST'])
@@ -332,95 +425,46 @@ def get_user_quests():
     })
 
 @quests_bp.route('/leaderboard')
-@cache_result(timeout=600)  # Cache for 10 minutes
 def quest_leaderboard():
     """Get quest completion leaderboard."""
     period = request.args.get('period', 'weekly')  # daily, weekly, monthly, all-time
+    if period not in LEADERBOARD_PERIODS:
+        period = 'all-time'
     limit = min(int(request.args.get('limit', 50)), 100)
-    
-    # Calculate date range based on period
     now = datetime.utcnow()
-    if period == 'daily':
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == 'weekly':
-        start_date = now - timedelta(days=7)
-    elif period == 'monthly':
-        start_date = now - timedelta(days=30)
-    else:
-        start_date = datetime.min
     
-    # Query for leaderboard
-    leaderboard_query = db.session.query(
-        User.id,
-        User.username,
-        User.display_name,
-        User.level,
-        func.count(UserQuest.id).label('quests_completed'),
-        func.sum(Quest.xp_reward).label('total_xp_earned'),
-        func.sum(Quest.pi_reward).label('total_pi_earned')
-    ).join(
-        UserQuest, User.id == UserQuest.user_id
-    ).join(
-        Quest, UserQuest.quest_id == Quest.id
-    ).filter(
-        UserQuest.status == QuestStatus.COMPLETED,
-        UserQuest.completed_at >= start_date
-    ).group_by(
-        User.id, User.username, User.display_name, User.level
-    ).order_by(
-        desc('quests_completed'),
-        desc('total_xp_earned')
-    ).limit(limit).all()
+    data = {
+        'leaderboard': leaderboard_store.top(period, limit, now),
+        'period': period,
+        'updated_at': now.isoformat()
+    }
     
-    leaderboard_data = []
-    for rank, entry in enumerate(leaderboard_query, 1):
-        leaderboard_data.append({
-            'rank': rank,
-            'user_id': entry.id,
-            'username': entry.username,
-            'display_name': entry.display_name,
-            'level': entry.level,
-            'quests_completed': entry.quests_completed,
-            'total_xp_earned': float(entry.total_xp_earned or 0),
-            'total_pi_earned': float(entry.total_pi_earned or 0)
-        })
+    if current_user.is_authenticated:
+        data['my_rank'] = leaderboard_store.rank(period, current_user.id, now)
     
     return jsonify({
         'success': True,
-        'data': {
-            'leaderboard': leaderboard_data,
-            'period': period,
-            'updated_at': now.isoformat()
-        }
+        'data': data
     })
 
 @quests_bp.route('/categories')
-@cache_result(timeout=3600)  # Cache for 1 hour
+@cache_result(timeout=300)  # Cache for 5 minutes
 def get_quest_categories():
-    """Get all available quest categories with statistics."""
-    categories = db.session.query(
-        QuestCategory.name,
-        QuestCategory.description,
-        QuestCategory.icon,
-        func.count(Quest.id).label('quest_count'),
-        func.avg(Quest.xp_reward).label('avg_xp_reward')
-    ).join(
-        Quest, QuestCategory.name == Quest.category
+    """Get all available quest categories with statistics from the quest_stats rollup."""
+    categories = QuestCategory.query.filter_by(is_active=True).order_by(QuestCategory.name).all()
+    avg_rewards = dict(db.session.query(
+        Quest.category_id, func.avg(Quest.xp_reward)
     ).filter(
-        Quest.is_active == True
-    ).group_by(
-        QuestCategory.name, QuestCategory.description, QuestCategory.icon
-    ).all()
+        Quest.is_active,
+        Quest.category_id.in_([category.id for category in categories])
+    ).group_by(Quest.category_id).all()) if categories else {}
     
     category_data = []
-    for category in categories:
-        category_data.append({
-            'name': category.name,
-            'description': category.description,
-            'icon': category.icon,
-            'quest_count': category.quest_count,
-            'avg_xp_reward': float(category.avg_xp_reward or 0)
-        })
+    for category in QuestCategory.serialize_all(categories):
+        if not category['quest_count']:
+            continue
+        category['avg_xp_reward'] = float(avg_rewards.get(category['id']) or 0)
+        category_data.append(category)
     
     return jsonify({
         'success': True,
@@ -4,17 +4,19 @@ Organized model definitions with proper relationships and validation.
 """
 
 from .user import User
-from .quest import Quest, QuestProgress, QuestReward, QuestCategory
+from .quest import Quest, QuestProgress, QuestReward, QuestCategory, QuestStats
 from .marketplace import Item, ItemCategory, Purchase
 from .transaction import Transaction, TransactionType
+from .ledger import LedgerEntry, BalanceSnapshot
 from .notification import Notification
 from .audit import AuditLog
 
 __all__ = [
     'User',
-    'Quest', 'QuestProgress', 'QuestReward', 'QuestCategory',
+    'Quest', 'QuestProgress', 'QuestReward', 'QuestCategory', 'QuestStats',
     'Item', 'ItemCategory', 'Purchase',
     'Transaction', 'TransactionType',
+    'LedgerEntry', 'BalanceSnapshot',
     'Notification',
     'AuditLog'
 ]
@@ -0,0 +1,81 @@
+"""
+Balance Ledger Models
+Append-only double-entry ledger of Pi movements with per-account balance
+snapshots. Maintained by the ledger service.
+"""
+
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.core.exceptions import ValidationError
+
+
+class LedgerEntry(db.Model):
+    """
+    One leg of a posting. The legs of a posting share posting_id and sum to
+    zero. Rows are never updated or deleted; corrections are new postings.
+    """
+
+    __tablename__ = 'ledger_entries'
+
+    # Monotonic id orders entries for snapshot watermarks
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    posting_id = db.Column(db.String(36), nullable=False)
+    account_id = db.Column(db.String(36), nullable=False)  # User id or a system account
+    amount = db.Column(db.Numeric(precision=20, scale=8), nullable=False)  # Signed; credits positive
+    entry_type = db.Column(db.String(30), nullable=False)
+
+    # Reference data
+    reference_type = db.Column(db.String(50), nullable=True)
+    reference_id = db.Column(db.String(36), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_ledger_account_entry', 'account_id', 'id'),
+        db.Index('idx_ledger_posting', 'posting_id'),
+        db.Index('idx_ledger_reference', 'reference_type', 'reference_id'),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'posting_id': self.posting_id,
+            'account_id': self.account_id,
+            'amount': float(self.amount),
+            'entry_type': self.entry_type,
+            'reference_type': self.reference_type,
+            'reference_id': self.reference_id,
+            'created_at': self.created_at.isoformat()
+        }
+
+    def __repr__(self) -> str:
+        return f"<LedgerEntry {self.id} {self.account_id} {self.amount}>"
+
+
+class BalanceSnapshot(db.Model):
+    """
+    Balance of an account as of last_entry_id. An account's balance is the
+    snapshot plus its entries after last_entry_id. The row also serves as
+    the account's lock for debits.
+    """
+
+    __tablename__ = 'ledger_balance_snapshots'
+
+    account_id = db.Column(db.String(36), primary_key=True)
+    balance = db.Column(db.Numeric(precision=20, scale=8), default=0, nullable=False)
+    last_entry_id = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<BalanceSnapshot {self.account_id} {self.balance}@{self.last_entry_id}>"
+
+
+@event.listens_for(LedgerEntry, 'before_update')
+@event.listens_for(LedgerEntry, 'before_delete')
+def reject_ledger_mutation(mapper, connection, target):
+    """Ledger entries are append-only."""
+    raise ValidationError("Ledger entries cannot be modified")
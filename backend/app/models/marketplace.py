@@ -18,6 +18,7 @@ from sqlalchemy.orm import relationship, backref
 
 from app.extensions import db
 from app.core.exceptions import ValidationError
+from app.services.ledger import ledger
 
 # --- Enums ---
 
@@ -241,7 +242,7 @@ class MarketplaceItem(db.Model):
             return False, "Cannot purchase your own item"
         if quantity > self.quantity_available:
             return False, f"Only {self.quantity_available} available"
-        if getattr(user, 'total_rewards', 0) < self.current_price * quantity:
+        if ledger.ledger_balance(user.id) < self.current_price * quantity:
             return False, "Insufficient balance"
         return True, "Eligible"
 
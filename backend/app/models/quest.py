@@ -6,12 +6,20 @@ Comprehensive quest management with categories, rewards, and progress tracking.
 import uuid
 import enum
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from sqlalchemy import event
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import event, inspect
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, object_session
 
 from app.extensions import db
 from app.core.exceptions import ValidationError
+from app.services.ledger import REWARDS_ACCOUNT, ledger
+from app.services.quest_board import quest_board_cache
+from app.services.quest_graph import quest_graph
+from app.services.quest_participation import quest_participation
+from app.services.quest_search import quest_search_index
+from app.services.quest_stats import ALL_TIME, histogram_median, quest_stats
 
 
 class QuestType(enum.Enum):
@@ -43,6 +51,17 @@ class QuestDifficulty(enum.Enum):
     LEGENDARY = "legendary"
 
 
+# Reward multiplier per difficulty
+DIFFICULTY_MULTIPLIERS = {
+    QuestDifficulty.BEGINNER: 0.5,
+    QuestDifficulty.EASY: 1.0,
+    QuestDifficulty.MEDIUM: 1.5,
+    QuestDifficulty.HARD: 2.0,
+    QuestDifficulty.EXPERT: 3.0,
+    QuestDifficulty.LEGENDARY: 5.0
+}
+
+
 class QuestCategory(db.Model):
     """Quest categories for organization and filtering."""
     
@@ -59,15 +78,30 @@ class QuestCategory(db.Model):
     # Relationships
     quests = db.relationship('Quest', backref='category', lazy='dynamic')
     
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, stats: Optional['QuestStats'] = None) -> Dict[str, Any]:
+        """
+        Convert category to dictionary representation.
+        
+        Args:
+            stats: Preloaded all-time QuestStats row, see serialize_all
+        """
+        if stats is None:
+            stats = quest_stats.totals('category', [self.id]).get(str(self.id))
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'icon': self.icon,
             'color': self.color,
-            'quest_count': self.quests.filter_by(status=QuestStatus.ACTIVE).count()
+            'quest_count': stats.active_quests if stats else 0,
+            'stats': stats.to_dict() if stats else None
         }
+    
+    @staticmethod
+    def serialize_all(categories: List['QuestCategory']) -> List[Dict[str, Any]]:
+        """Serialize categories with their rollup stats in one query."""
+        totals = quest_stats.totals('category', [category.id for category in categories])
+        return [category.to_dict(totals.get(str(category.id))) for category in categories]
 
 
 class Quest(db.Model):
@@ -138,6 +172,7 @@ class Quest(db.Model):
         db.Index('idx_quest_status_type', 'status', 'quest_type'),
         db.Index('idx_quest_difficulty_level', 'difficulty', 'level_required'),
         db.Index('idx_quest_timing', 'starts_at', 'expires_at'),
+        db.Index('idx_quest_status_expiry', 'status', 'expires_at'),
     )
     
     @hybrid_property
@@ -148,6 +183,18 @@ class Quest(db.Model):
                 (self.starts_at is None or self.starts_at <= now) and
                 (self.expires_at is None or self.expires_at > now))
     
+    @is_active.expression
+    def is_active(cls):
+        """
+        SQL form of is_active. Expiry is applied by the sweeper in
+        app.services.quest_expiry, so queries only filter on the indexed
+        status column and the start time.
+        """
+        return db.and_(
+            cls.status == QuestStatus.ACTIVE,
+            db.or_(cls.starts_at.is_(None), cls.starts_at <= datetime.utcnow())
+        )
+    
     @hybrid_property
     def is_expired(self) -> bool:
         """Check if quest has expired."""
@@ -164,15 +211,7 @@ class Quest(db.Model):
     @hybrid_property
     def difficulty_multiplier(self) -> float:
         """Get reward multiplier based on difficulty."""
-        multipliers = {
-            QuestDifficulty.BEGINNER: 0.5,
-            QuestDifficulty.EASY: 1.0,
-            QuestDifficulty.MEDIUM: 1.5,
-            QuestDifficulty.HARD: 2.0,
-            QuestDifficulty.EXPERT: 3.0,
-            QuestDifficulty.LEGENDARY: 5.0
-        }
-        return multipliers.get(self.difficulty, 1.0)
+        return DIFFICULTY_MULTIPLIERS.get(self.difficulty, 1.0)
     
     def can_participate(self, user) -> tuple[bool, str]:
         """
@@ -181,6 +220,64 @@ class Quest(db.Model):
         Returns:
             Tuple of (can_participate, reason)
         """
+        return Quest.check_eligibility(user, [self])[self.id]
+    
+    @staticmethod
+    def load_user_progress(user, quests: List['Quest']) -> Dict[str, 'QuestProgress']:
+        """
+        Load a user's progress rows for the given quests and their prerequisites.
+        
+        A single query covers every quest in the list, so callers serializing a
+        quest board pay one round trip instead of one per quest and prerequisite.
+        
+        Returns:
+            Mapping of quest_id to the user's QuestProgress row
+        """
+        quest_ids = set()
+        for quest in quests:
+            quest_ids.add(quest.id)
+            quest_ids.update(quest.prerequisites or [])
+        
+        if not quest_ids:
+            return {}
+        
+        rows = QuestProgress.query.filter(
+            QuestProgress.user_id == user.id,
+            QuestProgress.quest_id.in_(quest_ids)
+        ).all()
+        return {row.quest_id: row for row in rows}
+    
+    @classmethod
+    def check_eligibility(cls, user, quests: List[Any],
+                          progress: Optional[Dict[str, 'QuestProgress']] = None
+                          ) -> Dict[str, Tuple[bool, str]]:
+        """
+        Check participation eligibility for many quests at once.
+        
+        Args:
+            user: User to evaluate
+            quests: Quest instances or quest IDs
+            progress: Preloaded progress map from load_user_progress
+            
+        Returns:
+            Mapping of quest_id to (can_participate, reason). Unknown quest IDs
+            are reported as not found.
+        """
+        quest_objects = [q for q in quests if isinstance(q, Quest)]
+        quest_ids = [q for q in quests if not isinstance(q, Quest)]
+        if quest_ids:
+            quest_objects.extend(cls.query.filter(cls.id.in_(quest_ids)).all())
+        
+        if progress is None:
+            progress = cls.load_user_progress(user, quest_objects)
+        
+        results = {quest_id: (False, "Quest not found") for quest_id in quest_ids}
+        for quest in quest_objects:
+            results[quest.id] = quest._evaluate_eligibility(user, progress)
+        return results
+    
+    def _evaluate_eligibility(self, user, progress: Dict[str, 'QuestProgress']) -> Tuple[bool, str]:
+        """Evaluate eligibility against a preloaded progress map without querying."""
         if not self.is_active:
             return False, "Quest is not active"
         
@@ -191,39 +288,41 @@ class Quest(db.Model):
             return False, "Quest is full"
         
         # Check if user already has progress on this quest
-        existing_progress = self.progress_records.filter_by(user_id=user.id).first()
+        existing_progress = progress.get(self.id)
         if existing_progress and existing_progress.status == 'completed':
             return False, "Quest already completed"
         
-        # Check prerequisites
-        if self.prerequisites:
-            for prereq_id in self.prerequisites:
-                prereq_progress = QuestProgress.query.filter_by(
-                    user_id=user.id,
-                    quest_id=prereq_id,
-                    status='completed'
-                ).first()
-                if not prereq_progress:
-                    return False, "Prerequisites not met"
+        # Check prerequisites against the user's completed set
+        quest_graph.ensure_built()
+        if self.id in quest_graph:
+            prerequisites = quest_graph.prerequisites_of(self.id)
+        else:
+            prerequisites = frozenset(self.prerequisites or ())
+        completed = {quest_id for quest_id, row in progress.items() if row.status == 'completed'}
+        if not prerequisites <= completed:
+            return False, "Prerequisites not met"
         
         return True, "Eligible"
     
     def start_for_user(self, user) -> 'QuestProgress':
         """Start quest for a user."""
-        can_participate, reason = self.can_participate(user)
+        progress_map = Quest.load_user_progress(user, [self])
+        can_participate, reason = self._evaluate_eligibility(user, progress_map)
         if not can_participate:
             raise ValidationError(f"Cannot start quest: {reason}")
         
         # Check for existing progress
-        progress = self.progress_records.filter_by(user_id=user.id).first()
+        progress = progress_map.get(self.id)
         if not progress:
+            # Atomic slot reservation; the start is counted on commit
+            if not quest_participation.reserve(db.session, self):
+                raise ValidationError("Cannot start quest: Quest is full")
             progress = QuestProgress(
                 user_id=user.id,
                 quest_id=self.id,
                 status='in_progress'
             )
             db.session.add(progress)
-            self.total_participants += 1
         
         return progress
     
@@ -239,17 +338,18 @@ class Quest(db.Model):
         
         # Mark as completed
         progress.complete()
-        self.total_completions += 1
+        quest_participation.record_completion(db.session, self.id)
         
         # Calculate and award rewards
-        total_pi_reward = float(self.pi_reward * self.difficulty_multiplier)
+        total_pi_reward = float(Decimal(str(self.pi_reward)) * Decimal(str(self.difficulty_multiplier)))
         total_xp_reward = int(self.xp_reward * self.difficulty_multiplier)
         
         # Award XP
         xp_result = user.add_experience(total_xp_reward, f"Quest: {self.title}")
         
         # Award Pi rewards
-        user.total_rewards += total_pi_reward
+        ledger.transfer(db.session, REWARDS_ACCOUNT, user.id, total_pi_reward, 'quest_reward',
+                        reference_type='quest', reference_id=self.id)
         
         return {
             'quest_completed': True,
@@ -259,8 +359,15 @@ class Quest(db.Model):
             'bonus_rewards': self.bonus_rewards or {}
         }
     
-    def to_dict(self, user=None) -> Dict[str, Any]:
-        """Convert quest to dictionary representation."""
+    def to_dict(self, user=None,
+                progress: Optional[Dict[str, 'QuestProgress']] = None) -> Dict[str, Any]:
+        """
+        Convert quest to dictionary representation.
+        
+        Args:
+            user: Include participation details for this user
+            progress: Preloaded progress map from load_user_progress
+        """
         data = {
             'id': self.id,
             'title': self.title,
@@ -283,17 +390,25 @@ class Quest(db.Model):
         }
         
         if user:
-            progress = self.progress_records.filter_by(user_id=user.id).first()
-            can_participate, reason = self.can_participate(user)
+            if progress is None:
+                progress = Quest.load_user_progress(user, [self])
+            user_progress = progress.get(self.id)
+            can_participate, reason = self._evaluate_eligibility(user, progress)
             
             data.update({
-                'user_progress': progress.to_dict() if progress else None,
+                'user_progress': user_progress.to_dict() if user_progress else None,
                 'can_participate': can_participate,
                 'participation_reason': reason
             })
         
         return data
     
+    @classmethod
+    def serialize_for_user(cls, quests: List['Quest'], user) -> List[Dict[str, Any]]:
+        """Serialize a quest list with per-user eligibility using one progress query."""
+        progress = cls.load_user_progress(user, quests)
+        return [quest.to_dict(user=user, progress=progress) for quest in quests]
+    
     def __repr__(self) -> str:
         return f"<Quest {self.title} ({self.difficulty.value})>"
 
@@ -434,6 +549,62 @@ class QuestReward(db.Model):
         }
 
 
+class QuestStats(db.Model):
+    """
+    Rollup of quest progress events for dashboards and listings.
+    Rows are per quest or per category, in hourly buckets plus an all-time
+    total row (bucket_start == ALL_TIME). Maintained by the quest_stats service.
+    """
+    
+    __tablename__ = 'quest_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)  # 'quest' or 'category'
+    scope_id = db.Column(db.String(36), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    
+    # Counters
+    started = db.Column(db.Integer, default=0, nullable=False)
+    completed = db.Column(db.Integer, default=0, nullable=False)
+    abandoned = db.Column(db.Integer, default=0, nullable=False)
+    active_quests = db.Column(db.Integer, default=0, nullable=False)  # Category totals only
+    
+    # Completion times
+    duration_total = db.Column(db.BigInteger, default=0, nullable=False)  # Seconds
+    duration_histogram = db.Column(db.JSON, nullable=True)  # Log-scale bucket -> count
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_id', 'bucket_start', name='unique_quest_stats_bucket'),
+    )
+    
+    @property
+    def completion_rate(self) -> float:
+        return (self.completed / self.started) * 100 if self.started else 0.0
+    
+    @property
+    def abandonment_rate(self) -> float:
+        return (self.abandoned / self.started) * 100 if self.started else 0.0
+    
+    @property
+    def median_completion_seconds(self) -> Optional[float]:
+        return histogram_median(self.duration_histogram)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats row to dictionary representation."""
+        return {
+            'bucket_start': None if self.bucket_start == ALL_TIME else self.bucket_start.isoformat(),
+            'participants': self.started,
+            'completions': self.completed,
+            'abandoned': self.abandoned,
+            'completion_rate': round(self.completion_rate, 2),
+            'abandonment_rate': round(self.abandonment_rate, 2),
+            'median_completion_seconds': self.median_completion_seconds,
+            'avg_completion_seconds': round(self.duration_total / self.completed, 1) if self.completed else None
+        }
+
+
 # Event listeners for automatic updates
 @event.listens_for(Quest, 'before_update')
 def update_quest_timestamp(mapper, connection, target):
@@ -448,6 +619,161 @@ def handle_quest_status_change(target, value, old_value, initiator):
         target.starts_at = datetime.utcnow()
 
 
+def _pending_graph_changes(session) -> Dict[str, Optional[List[str]]]:
+    """Collect prerequisite graph changes for quests touched by this flush."""
+    changes = {}
+    for obj in session.new | session.dirty:
+        if not isinstance(obj, Quest):
+            continue
+        state = inspect(obj)
+        if obj not in session.new and not (
+            state.attrs.status.history.has_changes()
+            or state.attrs.prerequisites.history.has_changes()
+        ):
+            continue
+        changes[obj.id] = list(obj.prerequisites or []) if obj.status == QuestStatus.ACTIVE else None
+    for obj in session.deleted:
+        if isinstance(obj, Quest):
+            changes[obj.id] = None
+    return changes
+
+
+@event.listens_for(Session, 'before_flush')
+def validate_quest_prerequisites(session, flush_context, instances):
+    """Reject quest saves whose prerequisites would form a cycle."""
+    for obj in session.new:
+        if isinstance(obj, Quest) and obj.id is None:
+            obj.id = str(uuid.uuid4())
+    
+    changes = _pending_graph_changes(session)
+    if not changes:
+        return
+    
+    with session.no_autoflush:
+        quest_graph.ensure_built()
+    quest_graph.validate_changes(changes)
+    session.info.setdefault('quest_graph_changes', {}).update(changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_quest_graph_changes(session):
+    """Update the prerequisite graph once quest changes are committed."""
+    changes = session.info.pop('quest_graph_changes', None)
+    if not changes:
+        return
+    try:
+        for quest_id, prerequisites in changes.items():
+            quest_graph.update_quest(quest_id, prerequisites or (), active=prerequisites is not None)
+    except ValidationError:
+        # Another writer changed the graph underneath us; reload on next read
+        quest_graph.invalidate()
+    quest_graph.publish()
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_quest_graph_changes(session):
+    """Drop staged graph changes from a rolled back transaction."""
+    session.info.pop('quest_graph_changes', None)
+
+
+# Quest fields that change which quests a user may start
+_BOARD_FIELDS = ('status', 'prerequisites', 'level_required', 'starts_at',
+                 'expires_at', 'category_id', 'difficulty')
+
+
+@event.listens_for(Quest, 'after_insert')
+@event.listens_for(Quest, 'after_delete')
+def invalidate_boards_for_quest(mapper, connection, target):
+    """New or removed quests change every user's quest board."""
+    quest_board_cache.mark_quest_stale(object_session(target), target.id, catalog=True)
+
+
+@event.listens_for(Quest, 'after_update')
+def invalidate_boards_on_quest_update(mapper, connection, target):
+    """Drop the quest card, and all boards when eligibility inputs changed."""
+    state = inspect(target)
+    catalog = any(state.attrs[field].history.has_changes() for field in _BOARD_FIELDS)
+    quest_board_cache.mark_quest_stale(object_session(target), target.id, catalog=catalog)
+
+
+@event.listens_for(Quest, 'after_insert')
+@event.listens_for(Quest, 'after_update')
+def index_quest_for_search(mapper, connection, target):
+    """Reindex the quest's search document once the transaction commits."""
+    quest_search_index.stage(object_session(target), target.id,
+                             quest_search_index.snapshot(target))
+
+
+@event.listens_for(Quest, 'after_delete')
+def unindex_quest_for_search(mapper, connection, target):
+    quest_search_index.stage(object_session(target), target.id, None)
+
+
+@event.listens_for(QuestProgress, 'after_insert')
+def invalidate_board_on_progress_start(mapper, connection, target):
+    """Starting a quest changes the user's quest board."""
+    quest_board_cache.mark_user_stale(object_session(target), target.user_id)
+
+
+@event.listens_for(QuestProgress, 'after_update')
+def invalidate_board_on_progress_status(mapper, connection, target):
+    """Completing or abandoning a quest changes the user's quest board."""
+    if inspect(target).attrs.status.history.has_changes():
+        quest_board_cache.mark_user_stale(object_session(target), target.user_id)
+
+
+def _stage_active_quest_change(target, before: Tuple, after: Tuple) -> None:
+    """Move a quest between category active counts given (status, category_id) pairs."""
+    if before == after:
+        return
+    session = object_session(target)
+    if before[0] == QuestStatus.ACTIVE and before[1] is not None:
+        quest_stats.stage(session, 'active_quests', target.id, category_id=before[1], delta=-1)
+    if after[0] == QuestStatus.ACTIVE and after[1] is not None:
+        quest_stats.stage(session, 'active_quests', target.id, category_id=after[1], delta=1)
+
+
+@event.listens_for(Quest, 'after_insert')
+def count_new_category_quest(mapper, connection, target):
+    _stage_active_quest_change(target, (None, None), (target.status, target.category_id))
+
+
+@event.listens_for(Quest, 'after_delete')
+def uncount_deleted_category_quest(mapper, connection, target):
+    _stage_active_quest_change(target, (target.status, target.category_id), (None, None))
+
+
+@event.listens_for(Quest, 'after_update')
+def recount_category_quest(mapper, connection, target):
+    """Keep per-category active quest counts current in the stats rollup."""
+    state = inspect(target)
+    status_history = state.attrs.status.history
+    category_history = state.attrs.category_id.history
+    before = (
+        status_history.deleted[0] if status_history.deleted else target.status,
+        category_history.deleted[0] if category_history.deleted else target.category_id
+    )
+    _stage_active_quest_change(target, before, (target.status, target.category_id))
+
+
+@event.listens_for(QuestProgress, 'after_insert')
+def record_progress_start(mapper, connection, target):
+    quest_stats.stage(object_session(target), 'started', target.quest_id, target.started_at)
+
+
+@event.listens_for(QuestProgress, 'after_update')
+def record_progress_outcome(mapper, connection, target):
+    """Roll completions and abandonments into quest_stats."""
+    if not inspect(target).attrs.status.history.has_changes():
+        return
+    session = object_session(target)
+    if target.status == 'completed' and target.completed_at:
+        duration = (target.completed_at - target.started_at).total_seconds()
+        quest_stats.stage(session, 'completed', target.quest_id, target.completed_at, duration=duration)
+    elif target.status == 'abandoned':
+        quest_stats.stage(session, 'abandoned', target.quest_id)
+
+
 @event.listens_for(QuestProgress, 'after_update')
 def handle_progress_completion(mapper, connection, target):
     """Handle quest completion events."""
@@ -8,11 +8,18 @@ import enum
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from decimal import Decimal
-from sqlalchemy import event
+from sqlalchemy import event, func
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from app.extensions import db
 from app.core.exceptions import ValidationError, InsufficientFundsError
+from app.services.ledger import (
+    ADJUSTMENTS_ACCOUNT, FEES_ACCOUNT, HOLD_ENTRY_TYPE, HOLD_RELEASE_ENTRY_TYPE, HOLDS_ACCOUNT,
+    PI_NETWORK_ACCOUNT, REWARDS_ACCOUNT, ledger
+)
+from app.services.pi_network import pi_network
+from app.services.transaction_retry import MAX_RETRIES, transaction_retry
+from app.utils.snowflake import reference_numbers
 
 
 class TransactionType(enum.Enum):
@@ -37,6 +44,7 @@ class TransactionStatus(enum.Enum):
     CANCELLED = "cancelled"
     DISPUTED = "disputed"
     REFUNDED = "refunded"
+    UNKNOWN = "unknown"  # Pi Network outcome unknown; awaits reconciliation, never retried
 
 
 class Transaction(db.Model):
@@ -91,6 +99,7 @@ class Transaction(db.Model):
     error_code = db.Column(db.String(50), nullable=True)
     error_message = db.Column(db.Text, nullable=True)
     retry_count = db.Column(db.Integer, default=0, nullable=False)
+    next_retry_at = db.Column(db.DateTime, nullable=True)  # Automatic retry, or recovery of a queued payment
     
     # Relationships
     sender = db.relationship('User', backref='sent_transactions', foreign_keys=[sender_id])
@@ -102,9 +111,12 @@ class Transaction(db.Model):
         db.CheckConstraint('priority >= 1 AND priority <= 10', name='valid_priority'),
         db.CheckConstraint('retry_count >= 0', name='valid_retry_count'),
         db.Index('idx_transaction_status_created', 'status', 'created_at'),
+        db.Index('idx_transaction_retry_due', 'status', 'next_retry_at'),
         db.Index('idx_transaction_type_date', 'transaction_type', 'created_at'),
         db.Index('idx_transaction_reference', 'reference_type', 'reference_id'),
-        db.Index('idx_transaction_participants', 'sender_id', 'receiver_id'),
+        # History branches: keyed and ordered for index-only keyset scans
+        db.Index('idx_transaction_sender_created', 'sender_id', 'created_at', 'id'),
+        db.Index('idx_transaction_receiver_created', 'receiver_id', 'created_at', 'id'),
     )
     
     def __init__(self, **kwargs):
@@ -139,10 +151,8 @@ class Transaction(db.Model):
     
     @staticmethod
     def _generate_reference_number() -> str:
-        """Generate unique transaction reference number."""
-        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        random_suffix = str(uuid.uuid4())[:6].upper()
-        return f"TXN{timestamp}{random_suffix}"
+        """Generate unique, time-ordered transaction reference number."""
+        return reference_numbers.next_id()
     
     def calculate_fees(self) -> None:
         """Calculate transaction fees based on type and amount."""
@@ -170,9 +180,26 @@ class Transaction(db.Model):
         Process the transaction through Pi Network.
         Returns True if successful, False otherwise.
         """
+        if not self.begin_processing():
+            return False
+        
+        try:
+            payment = self._process_pi_payment()
+        except Exception as e:
+            self._fail_transaction(str(e))
+            return False
+        return self.apply_pi_payment(payment)
+    
+    def begin_processing(self) -> bool:
+        """
+        Move a pending transaction to PROCESSING after expiry and balance checks,
+        holding the sender's funds until Pi Network settles the payment.
+        Returns False if the transaction failed instead.
+        """
         if self.status != TransactionStatus.PENDING:
             raise ValidationError("Transaction is not in pending status")
         
+        self.next_retry_at = None  # Claimed; no longer needs recovering
         if self.is_expired:
             self.status = TransactionStatus.FAILED
             self.error_message = "Transaction expired"
@@ -182,37 +209,33 @@ class Transaction(db.Model):
             self.status = TransactionStatus.PROCESSING
             self.processed_at = datetime.utcnow()
             
-            # Validate participants and balances
-            if not self._validate_transaction():
-                return False
-            
-            # Process through Pi Network (simulated)
-            success = self._process_pi_payment()
-            
-            if success:
-                self._complete_transaction()
-                return True
-            else:
-                self._fail_transaction("Pi Network payment failed")
-                return False
-                
+            # Validate participants, then reserve the sender's funds under lock
+            return self._validate_transaction() and self._hold_funds()
         except Exception as e:
             self._fail_transaction(str(e))
             return False
     
+    def apply_pi_payment(self, payment: Optional[Dict[str, str]], error: str = None) -> bool:
+        """
+        Complete or fail a PROCESSING transaction with the Pi Network result.
+        
+        Args:
+            payment: Pi identifiers for a settled payment, None if it failed
+            error: Failure reason to record when payment is None
+        """
+        if not payment:
+            self._fail_transaction(error or "Pi Network payment failed")
+            return False
+        
+        self.pi_transaction_id = payment['pi_transaction_id']
+        self.pi_payment_id = payment['pi_payment_id']
+        self.blockchain_hash = payment['blockchain_hash']
+        # Pi Network has paid, so this must not fail on funds
+        self._complete_transaction()
+        return True
+    
     def _validate_transaction(self) -> bool:
         """Validate transaction before processing."""
-        # Check sender balance for outgoing transactions
-        if self.sender_id and self.transaction_type in [
-            TransactionType.TRANSFER, 
-            TransactionType.MARKETPLACE_PURCHASE,
-            TransactionType.WITHDRAWAL
-        ]:
-            if self.sender.total_rewards < self.amount:
-                self.error_message = "Insufficient balance"
-                self.status = TransactionStatus.FAILED
-                return False
-        
         # Check receiver exists for incoming transactions
         if self.receiver_id and not self.receiver:
             self.error_message = "Invalid receiver"
@@ -221,64 +244,127 @@ class Transaction(db.Model):
         
         return True
     
-    def _process_pi_payment(self) -> bool:
+    def _hold_funds(self) -> bool:
         """
-        Process payment through Pi Network.
-        In production, this would integrate with Pi Network SDK.
+        Move the sender's amount into the holds account. The ledger locks the
+        sender and checks their ledger balance, so concurrent payments from
+        one sender cannot both pass.
         """
-        # Simulated Pi Network integration
-        import random
-        import time
-        
-        # Simulate network delay
-        time.sleep(0.1)
-        
-        # Simulate success rate (95% success in simulation)
-        success = random.random() > 0.05
+        if not self.sender_id:
+            return True
         
-        if success:
-            # Generate simulated blockchain data
-            self.pi_transaction_id = f"pi_txn_{uuid.uuid4().hex[:16]}"
-            self.pi_payment_id = f"pi_pay_{uuid.uuid4().hex[:16]}"
-            self.blockchain_hash = f"0x{uuid.uuid4().hex}{uuid.uuid4().hex}"
+        try:
+            ledger.transfer(db.session, self.sender_id, HOLDS_ACCOUNT, self.amount, HOLD_ENTRY_TYPE,
+                            reference_type='transaction', reference_id=self.id)
+        except InsufficientFundsError:
+            self.error_message = "Insufficient balance"
+            self.status = TransactionStatus.FAILED
+            return False
+        return True
+    
+    def _held_amount(self) -> Decimal:
+        """Funds currently held for this transaction."""
+        from app.models.ledger import LedgerEntry
         
-        return success
+        if not self.sender_id:
+            return Decimal(0)
+        return db.session.query(func.coalesce(func.sum(LedgerEntry.amount), 0)).filter(
+            LedgerEntry.reference_type == 'transaction',
+            LedgerEntry.reference_id == self.id,
+            LedgerEntry.account_id == HOLDS_ACCOUNT
+        ).scalar()
+    
+    def _release_hold(self) -> None:
+        """Return held funds to the sender."""
+        held = self._held_amount()
+        if held:
+            ledger.transfer(db.session, HOLDS_ACCOUNT, self.sender_id, held, HOLD_RELEASE_ENTRY_TYPE,
+                            reference_type='transaction', reference_id=self.id)
+    
+    def _process_pi_payment(self) -> Optional[Dict[str, str]]:
+        """
+        Process payment through Pi Network, blocking until it settles.
+        Background processing goes through payment_queue instead.
+        """
+        return pi_network.create_payment_blocking(self.reference_number, self.amount)
     
     def _complete_transaction(self) -> None:
         """Complete transaction and update balances."""
+        # Pay out of the hold taken when processing began; the funds were checked then
+        if self._held_amount():
+            source = HOLDS_ACCOUNT
+        else:
+            source = self.sender_id or self._external_account()
+        ledger.post(db.session, [
+            (source, -self.amount),
+            (self.receiver_id or PI_NETWORK_ACCOUNT, self.net_amount),
+            (FEES_ACCOUNT, self.total_fee)
+        ], self.transaction_type.value, reference_type='transaction', reference_id=self.id,
+            check_funds=False)
+        
         self.status = TransactionStatus.COMPLETED
         self.completed_at = datetime.utcnow()
-        
-        # Update balances
-        if self.sender_id:
-            self.sender.total_rewards -= self.amount
-        
-        if self.receiver_id:
-            self.receiver.total_rewards += self.net_amount
+    
+    def _external_account(self) -> str:
+        """System account funding a transaction with no sender."""
+        if self.transaction_type == TransactionType.DEPOSIT:
+            return PI_NETWORK_ACCOUNT
+        if self.transaction_type == TransactionType.QUEST_REWARD:
+            return REWARDS_ACCOUNT
+        return ADJUSTMENTS_ACCOUNT
     
     def _fail_transaction(self, error_message: str) -> None:
-        """Mark transaction as failed."""
+        """
+        Mark transaction as failed and release its held funds. An automatic
+        retry is scheduled only if Pi Network never took the payment; once
+        Pi has paid, a retry would pay twice.
+        """
+        self._release_hold()
         self.status = TransactionStatus.FAILED
         self.error_message = error_message
         self.retry_count += 1
+        self.next_retry_at = None if self.pi_payment_id else transaction_retry.next_retry_at(self.retry_count)
     
-    def retry(self) -> bool:
-        """Retry failed transaction."""
+    def mark_payment_unknown(self, reason: str) -> None:
+        """
+        Park a transaction whose Pi Network call may or may not have gone
+        through. Its funds stay held until it is reconciled.
+        """
+        self.status = TransactionStatus.UNKNOWN
+        self.error_message = reason
+        self.next_retry_at = None
+    
+    def mark_queued(self, now: Optional[datetime] = None) -> None:
+        """
+        Record that the payment was handed to the payment queue. If the queue
+        loses it, the retry scheduler queues it again once next_retry_at passes.
+        """
+        self.next_retry_at = transaction_retry.recovery_at(now)
+    
+    def prepare_retry(self) -> None:
+        """Return a failed transaction to PENDING so it can be processed again."""
         if self.status != TransactionStatus.FAILED:
             raise ValidationError("Can only retry failed transactions")
         
-        if self.retry_count >= 3:
+        if self.retry_count >= MAX_RETRIES:
             raise ValidationError("Maximum retry attempts exceeded")
         
         self.status = TransactionStatus.PENDING
         self.error_message = None
         self.processed_at = None
-        
+        self.next_retry_at = None
+    
+    def retry(self) -> bool:
+        """Retry failed transaction."""
+        self.prepare_retry()
         return self.process()
     
     def cancel(self, reason: str = None) -> None:
         """Cancel pending transaction."""
-        if self.status not in [TransactionStatus.PENDING, TransactionStatus.PROCESSING]:
+        if self.status == TransactionStatus.PROCESSING:
+            # Pi Network may pay at any moment; the result is applied when it settles
+            raise ValidationError("Cannot cancel a transaction while its payment is processing")
+        if self.status != TransactionStatus.PENDING:
             raise ValidationError("Cannot cancel completed or failed transaction")
         
         self.status = TransactionStatus.CANCELLED
@@ -348,18 +434,25 @@ class Transaction(db.Model):
                 'blockchain_hash': self.blockchain_hash,
                 'error_message': self.error_message,
                 'retry_count': self.retry_count,
+                'next_retry_at': self.next_retry_at.isoformat() if self.next_retry_at else None,
                 'metadata': self.metadata
             })
         
         return data
     
     @classmethod
-    def create_transfer(cls, sender, receiver, amount: Decimal, description: str = None) -> 'Transaction':
-        """Create a transfer transaction between users."""
+    def create_transfer(cls, sender, receiver, amount: Decimal, description: str = None,
+                        available: Optional[Decimal] = None) -> 'Transaction':
+        """
+        Create a transfer transaction between users.
+        
+        Args:
+            available: Sender funds to check against instead of the sender's ledger balance
+        """
         if sender.id == receiver.id:
             raise ValidationError("Cannot transfer to yourself")
         
-        if sender.total_rewards < amount:
+        if (ledger.ledger_balance(sender.id) if available is None else available) < amount:
             raise InsufficientFundsError("Insufficient balance for transfer")
         
         transaction = cls(
@@ -408,20 +501,13 @@ def handle_status_change(target, value, old_value, initiator):
         target.processed_at = datetime.utcnow()
 
 
-# Periodic cleanup task (would be run by scheduler)
-def cleanup_expired_transactions():
-    """Mark expired pending transactions as failed."""
-    expired_transactions = Transaction.query.filter(
-        Transaction.status == TransactionStatus.PENDING,
-        Transaction.expires_at <= datetime.utcnow()
-    ).all()
-    
-    for txn in expired_transactions:
-        txn.status = TransactionStatus.FAILED
-        txn.error_message = "Transaction expired"
-    
-    db.session.commit()
-    return len(expired_transactions)
+# Periodic cleanup task (scheduled by app.services.transaction_expiry)
+def cleanup_expired_transactions(batch_size: int = 1000, time_budget: Optional[float] = None,
+                                 dry_run: bool = False) -> int:
+    """Mark expired pending transactions as failed, in chunked bulk updates."""
+    from app.services.transaction_expiry import expire_transactions
+    
+    return expire_transactions(batch_size=batch_size, time_budget=time_budget, dry_run=dry_run)['expired']
 # models/transaction.py
 
 from app import db
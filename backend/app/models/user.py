@@ -5,13 +5,18 @@ Professional implementation with proper validation and business logic.
 
 import uuid
 from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Optional, Dict, Any
-from sqlalchemy import event
+from sqlalchemy import event, inspect
 from sqlalchemy.ext.hybrid import hybrid_property
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import object_session
 
 from app.extensions import db
 from app.core.exceptions import ValidationError
+from app.services import leveling
+from app.services.ledger import REWARDS_ACCOUNT, ledger
+from app.services.password_hasher import password_hasher
+from app.services.quest_board import quest_board_cache
 from app.utils.validators import validate_email, validate_username
 
 
@@ -41,6 +46,7 @@ class User(db.Model):
     # Game progression
     level = db.Column(db.Integer, default=1, nullable=False)
     experience_points = db.Column(db.BigInteger, default=0, nullable=False)
+    # Pre-ledger balance, kept for opening entries; read balances via `balance`
     total_rewards = db.Column(db.Numeric(precision=20, scale=8), default=0, nullable=False)
     
     # Account status and security
@@ -96,14 +102,23 @@ class User(db.Model):
         return (self.locked_until and 
                 self.locked_until > datetime.utcnow())
     
+    @property
+    def balance(self) -> Decimal:
+        """Pi balance from the ledger's cached running total."""
+        return ledger.balance(self.id) if self.id else Decimal(0)
+    
     @hybrid_property
     def experience_to_next_level(self) -> int:
         """Calculate XP needed for next level."""
+        if self.level >= leveling.MAX_PLAYER_LEVEL:
+            return 0
         return self._calculate_xp_for_level(self.level + 1) - self.experience_points
     
     @hybrid_property
     def level_progress_percentage(self) -> float:
         """Calculate percentage progress to next level."""
+        if self.level >= leveling.MAX_PLAYER_LEVEL:
+            return 100.0
         current_level_xp = self._calculate_xp_for_level(self.level)
         next_level_xp = self._calculate_xp_for_level(self.level + 1)
         level_xp_range = next_level_xp - current_level_xp
@@ -115,13 +130,22 @@ class User(db.Model):
         if len(password) < 8:
             raise ValidationError("Password must be at least 8 characters long")
         
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256', salt_length=16)
+        self.password_hash = password_hasher.hash(password)
     
     def verify_password(self, password: str) -> bool:
-        """Verify password against stored hash."""
+        """
+        Verify password against stored hash.
+        
+        Hashes made with an older method or work factor are replaced on a
+        successful check; the caller's commit persists the new hash.
+        """
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.password_hash = password_hasher.hash(password)
+        return True
     
     def add_experience(self, xp_amount: int, source: str = None) -> Dict[str, Any]:
         """
@@ -148,7 +172,8 @@ class User(db.Model):
             self.level = new_level
             # Award level-up rewards
             level_rewards = self._calculate_level_rewards(old_level, new_level)
-            self.total_rewards += level_rewards
+            ledger.transfer(object_session(self) or db.session, REWARDS_ACCOUNT, self.id,
+                            level_rewards, 'level_reward')
             
             return {
                 'xp_gained': xp_amount,
@@ -209,7 +234,7 @@ class User(db.Model):
             'experience_points': self.experience_points,
             'experience_to_next_level': self.experience_to_next_level,
             'level_progress_percentage': round(self.level_progress_percentage, 2),
-            'total_rewards': float(self.total_rewards),
+            'total_rewards': float(self.balance),
             'role': self.role,
             'is_verified': self.is_verified,
             'avatar_url': self.avatar_url,
@@ -230,28 +255,17 @@ class User(db.Model):
     @staticmethod
     def _calculate_xp_for_level(level: int) -> int:
         """Calculate total XP required for a specific level."""
-        if level <= 1:
-            return 0
-        # Exponential XP curve: XP = 100 * level^1.5
-        return int(100 * (level ** 1.5))
+        return leveling.xp_for_level(level)
     
     @staticmethod
     def _calculate_level_from_xp(total_xp: int) -> int:
-        """Calculate level based on total XP."""
-        level = 1
-        while User._calculate_xp_for_level(level + 1) <= total_xp:
-            level += 1
-        return level
+        """Calculate level based on total XP (table lookup, capped at MAX_PLAYER_LEVEL)."""
+        return leveling.level_for_xp(total_xp)
     
     @staticmethod
     def _calculate_level_rewards(old_level: int, new_level: int) -> float:
-        """Calculate Pi rewards for leveling up."""
-        total_rewards = 0.0
-        for level in range(old_level + 1, new_level + 1):
-            # Base reward increases with level
-            base_reward = 0.1 * (1 + (level - 1) * 0.1)
-            total_rewards += base_reward
-        return total_rewards
+        """Calculate Pi rewards for leveling up from prefix-summed totals."""
+        return leveling.level_rewards(old_level, new_level)
     
     def __repr__(self) -> str:
         return f"<User {self.username} (Level {self.level})>"
@@ -264,6 +278,13 @@ def update_modified_timestamp(mapper, connection, target):
     target.updated_at = datetime.utcnow()
 
 
+@event.listens_for(User, 'after_update')
+def invalidate_quest_board_on_level_up(mapper, connection, target):
+    """Level changes alter which quests the user can see."""
+    if inspect(target).attrs.level.history.has_changes():
+        quest_board_cache.mark_user_stale(object_session(target), target.id)
+
+
 @event.listens_for(User.username, 'set')
 def validate_username_change(target, value, old_value, initiator):
     """Validate username on change."""
@@ -4,8 +4,10 @@ from datetime import datetime
 from enum import Enum
 
 from app import db
-from sqlalchemy import Index
-from sqlalchemy.orm import validates
+from app.services.quest_board import quest_board_cache
+from app.services.quest_leaderboard import quest_leaderboard
+from sqlalchemy import Index, event, inspect, select
+from sqlalchemy.orm import object_session, validates
 
 
 class QuestStatus(Enum):
@@ -31,6 +33,7 @@ class UserQuest(db.Model):
 
     __table_args__ = (
         Index("ix_user_quests_user_id_quest_id", "user_id", "quest_id"),
+        Index("ix_user_quests_user_id_started_at", "user_id", "started_at"),
     )
 
     @validates("progress")
@@ -70,3 +73,50 @@ class UserQuest(db.Model):
             f"<UserQuest user_id={self.user_id} quest_id={self.quest_id} "
             f"status={self.status} progress={self.progress}>"
         )
+
+
+@event.listens_for(UserQuest, "after_insert")
+def invalidate_board_on_start(mapper, connection, target):
+    """Starting a quest changes the user's quest board."""
+    quest_board_cache.mark_user_stale(object_session(target), target.user_id)
+
+
+@event.listens_for(UserQuest, "after_update")
+def invalidate_board_on_status_change(mapper, connection, target):
+    """Completing a quest changes the user's quest board."""
+    if inspect(target).attrs.status.history.has_changes():
+        quest_board_cache.mark_user_stale(object_session(target), target.user_id)
+
+
+@event.listens_for(UserQuest, "after_update")
+def record_leaderboard_completion(mapper, connection, target):
+    """Stage completed quests for the incremental leaderboard."""
+    from app.models.quest import Quest
+    from app.models.user import User
+
+    history = inspect(target).attrs.status.history
+    status = getattr(target.status, "value", target.status)
+    if not history.has_changes() or status != QuestStatus.COMPLETED.value:
+        return
+
+    quest = connection.execute(
+        select(Quest.xp_reward, Quest.pi_reward).where(Quest.id == target.quest_id)
+    ).first()
+    user = connection.execute(
+        select(User.username, User.display_name, User.level).where(User.id == target.user_id)
+    ).first()
+    if quest is None or user is None:
+        return
+
+    quest_leaderboard.stage_completion(
+        object_session(target),
+        user_id=target.user_id,
+        xp=quest.xp_reward or 0,
+        pi=float(quest.pi_reward or 0),
+        profile={
+            "username": user.username,
+            "display_name": user.display_name,
+            "level": user.level,
+        },
+        when=target.completed_at or datetime.utcnow(),
+    )
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy.exc import SQLAlchemyError
 from models import Item, User, Transaction, db
+from app.services.idempotency import idempotent
 
 marketplace_bp = Blueprint('marketplace', __name__)
 
@@ -56,6 +57,7 @@ def list_item():
         return error_response("Database error while listing item", 500, code="DB_ERROR", details=str(exc))
 
 @marketplace_bp.route('/buy', methods=['POST'])
+@idempotent('marketplace_purchase')
 def buy_item():
     data = request.get_json()
     item_id = data.get('item_id')
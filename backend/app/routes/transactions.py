@@ -1,60 +1,64 @@
-from flask import Blueprint, request, jsonify, current_app
-from models import Transaction, db
-from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.exceptions import BadRequest
-
-transactions_bp = Blueprint("transactions", __name__, url_prefix="/transactions")
-
-@transactions_bp.route("/", methods=["GET"])
-def get_transactions():
-    """
-    Retrieve transactions for a specific user.
-    Expects 'user_id' as a query parameter.
-    """
-    user_id = request.args.get("user_id", type=int)
-    if not user_id:
-        raise BadRequest("Missing or invalid required parameter: user_id (integer)")
-
-    try:
-        # Limit is set for safety—adjust as needed for production usage
-        transactions = (
-            Transaction.query
-            .filter(
-                (Transaction.sender_id == user_id) |
-                (Transaction.receiver_id == user_id)
-            )
-            .order_by(Transaction.created_at.desc())
-            .limit(100)
-            .all()
-        )
-    except SQLAlchemyError as err:
-        current_app.logger.error(f"DB error fetching transactions for user {user_id}: {err}")
-        return jsonify({"error": "Database error occurred."}), 500
-
-    result = [
-        {
-            "id": tx.id,
-            "sender_id": tx.sender_id,
-            "receiver_id": tx.receiver_id,
-            "amount": float(tx.amount) if hasattr(tx.amount, "real") else tx.amount,
-            "status": tx.status,
-            "created_at": tx.created_at.isoformat()
-        }
-        for tx in transactions
-    ]
-
-    return jsonify({"user_id": user_id, "transactions": result}), 200
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, url_for
 from decimal import Decimal
 from app.extensions import db
-from app.models.transaction import Transaction, TransactionType
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
 from app.models.user import User
 from app.core.exceptions import ValidationError, InsufficientFundsError
+from app.services.idempotency import idempotent, mark_retryable
+from app.services.payment_queue import payment_queue, PaymentQueueFullError
+from app.services.transaction_export import FORMATS, export_transactions, gzip_stream
+from app.services.transaction_history import DEFAULT_PAGE_SIZE, history_page
+from app.services.transfer_batcher import transfer_batcher, TransferBatcherBusyError
 
 transactions_bp = Blueprint('transactions', __name__, url_prefix='/api/transactions')
 
 
+@transactions_bp.route('/', methods=['GET'])
+def list_transactions():
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Missing required parameter: user_id'}), 400
+
+    try:
+        page = history_page(
+            user_id,
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+            cursor=request.args.get('cursor')
+        )
+    except ValidationError as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    return jsonify({
+        'user_id': user_id,
+        'transactions': [txn.to_dict() for txn in page['transactions']],
+        'next_cursor': page['next_cursor']
+    }), 200
+
+
+@transactions_bp.route('/export', methods=['GET'])
+def export_transaction_history():
+    user_id = request.args.get('user_id')
+    fmt = request.args.get('format', 'ndjson')
+    if not user_id:
+        return jsonify({'error': 'Missing required parameter: user_id'}), 400
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unsupported format, use one of: {', '.join(FORMATS)}"}), 400
+
+    # Compress only for clients that ask for it
+    compress = request.args.get('gzip', 'true').lower() != 'false' and 'gzip' in request.accept_encodings
+    chunks = export_transactions(user_id, fmt)
+    body = gzip_stream(chunks) if compress else chunks
+
+    response = Response(stream_with_context(body), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="transactions-{user_id}.{fmt}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
 @transactions_bp.route('/transfer', methods=['POST'])
+@idempotent('transfer')
 def create_transfer():
     try:
         data = request.get_json()
@@ -66,6 +70,14 @@ def create_transfer():
         if not sender_id or not receiver_id or not amount:
             return jsonify({'error': 'Missing required fields'}), 400
 
+        if transfer_batcher.enabled:
+            status, body = transfer_batcher.submit(sender_id, receiver_id, amount, description)
+            response = jsonify(body)
+            if status == 202:
+                response.headers['Location'] = url_for('transactions.transaction_status',
+                                                       txn_id=body['transaction_id'])
+            return response, status
+
         sender = User.query.get(sender_id)
         receiver = User.query.get(receiver_id)
 
@@ -80,6 +92,11 @@ def create_transfer():
 
     except (ValidationError, InsufficientFundsError) as ve:
         return jsonify({'error': str(ve)}), 400
+    except TransferBatcherBusyError as e:
+        mark_retryable()
+        response = jsonify({'error': 'Transfers are busy. Please retry shortly.'})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Server error', 'details': str(e)}), 500
@@ -90,16 +107,40 @@ def process_transaction(txn_id):
     txn = Transaction.query.get(txn_id)
     if not txn:
         return jsonify({'error': 'Transaction not found'}), 404
+    if txn.status != TransactionStatus.PENDING:
+        return jsonify({'error': 'Transaction is not in pending status'}), 400
 
+    txn.mark_queued()
+    db.session.commit()
     try:
-        success = txn.process()
+        payment_queue.enqueue(txn.id, txn.priority)
+    except PaymentQueueFullError as e:
+        txn.next_retry_at = None
         db.session.commit()
-        return jsonify({'transaction': txn.to_dict(include_sensitive=True), 'success': success}), 200
-    except ValidationError as ve:
-        return jsonify({'error': str(ve)}), 400
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': 'Processing failed', 'details': str(e)}), 500
+        response = jsonify({'error': 'Payment processing is busy. Please retry shortly.'})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+
+    status_url = url_for('transactions.transaction_status', txn_id=txn.id)
+    response = jsonify({'transaction_id': txn.id, 'status': txn.status.value, 'status_url': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+@transactions_bp.route('/<txn_id>/status', methods=['GET'])
+def transaction_status(txn_id):
+    txn = Transaction.query.get(txn_id)
+    if not txn:
+        return jsonify({'error': 'Transaction not found'}), 404
+
+    return jsonify({
+        'transaction_id': txn.id,
+        'status': txn.status.value,
+        'queued': payment_queue.is_queued(txn.id),
+        'error_message': txn.error_message,
+        'processed_at': txn.processed_at.isoformat() if txn.processed_at else None,
+        'completed_at': txn.completed_at.isoformat() if txn.completed_at else None
+    }), 200
 
 
 @transactions_bp.route('/<txn_id>/refund', methods=['POST'])
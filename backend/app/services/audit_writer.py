@@ -0,0 +1,176 @@
+"""
+Asynchronous Audit Log Writer
+Queues audit events in memory and writes them from a background thread in
+multi-row INSERTs over a dedicated connection, so request handlers never pay
+for (or share) an audit commit.
+
+The queue is bounded: when it is full new events are dropped and counted
+rather than blocking requests. Batches are flushed when they reach
+batch_size or flush_interval elapses, and the queue is drained on shutdown.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+MAX_QUEUE_SIZE = 10000
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0  # Seconds a partial batch may wait
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Bounded queue and background batch writer for AuditLog rows."""
+
+    def __init__(self, max_queue: int = MAX_QUEUE_SIZE, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._metrics = {'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._thread: Optional[threading.Thread] = None
+        self._connection = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the background writer for this application."""
+        self._app = app
+        app.extensions['audit_writer'] = self
+        if self._thread is None and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def log(self, event_type: str, user_id: Optional[Any] = None, ip_address: Optional[str] = None,
+            user_agent: Optional[str] = None, details: Optional[Dict] = None,
+            timestamp: Optional[datetime] = None) -> bool:
+        """
+        Queue an audit event.
+
+        Returns:
+            False if the event was dropped because the queue is full
+        """
+        event = {
+            'event_type': event_type,
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent or '',
+            'details': details or {},
+            'timestamp': timestamp or datetime.utcnow()
+        }
+        if self._thread is None:
+            # No writer thread (tests, CLI): write through immediately
+            self._write([event])
+            return True
+
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self._metrics['dropped'] += 1
+                dropped = self._metrics['dropped']
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Audit queue full; {dropped} events dropped so far")
+            return False
+        return True
+
+    def metrics(self) -> Dict[str, int]:
+        """Counters for monitoring: queued, written, dropped, failed and batches."""
+        with self._lock:
+            return {'queued': self._queue.qsize(), **self._metrics}
+
+    # --- Writer thread ---
+
+    def _run(self) -> None:
+        with self._app.app_context():
+            stopping = False
+            while not stopping:
+                batch: List[Dict[str, Any]] = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                if stopping:
+                    # Drain whatever is left before exiting
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not _STOP:
+                            batch.append(item)
+
+                for start in range(0, len(batch), self.batch_size):
+                    self._write(batch[start:start + self.batch_size], dedicated=True)
+
+            self._close()
+
+    def _write(self, events: List[Dict[str, Any]], dedicated: bool = False) -> None:
+        """
+        Insert events in one multi-row statement.
+
+        Only the writer thread uses the dedicated connection; write-through
+        calls come from request threads and check out a pooled connection
+        each time instead of sharing it.
+        """
+        if not events:
+            return
+        from app.models.audit_log import AuditLog
+
+        statement = AuditLog.__table__.insert().values(events)
+        try:
+            if dedicated:
+                if self._connection is None or self._connection.closed:
+                    self._connection = db.engine.connect()
+                with self._connection.begin():
+                    self._connection.execute(statement)
+            else:
+                with db.engine.begin() as connection:
+                    connection.execute(statement)
+        except Exception as e:
+            if dedicated:
+                self._close()
+            with self._lock:
+                self._metrics['failed'] += len(events)
+            logger.error(f"Failed to write {len(events)} audit events: {str(e)}")
+            return
+
+        with self._lock:
+            self._metrics['written'] += len(events)
+            self._metrics['batches'] += 1
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the writer after draining queued events."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,187 @@
+"""
+Idempotency Keys
+Makes retried POSTs safe: a request carrying an Idempotency-Key header runs
+once, and later requests with the same key get the stored response back.
+
+The first request claims the key in the shared key-value store with a short
+IDEMPOTENCY_LOCK_TTL, runs the view and stores the status, body and a few
+headers for IDEMPOTENCY_TTL. A duplicate that arrives while the first is
+still running waits for it: it wakes immediately when both run in the same
+process and polls the store otherwise. It then replays the stored response
+without touching the database. A key reused with a different request body
+is rejected with 422.
+
+A server error may come after the view committed, so it is stored and
+replayed like any other response; running the request again could, say,
+move money twice. Only a view that calls mark_retryable() - it failed
+before writing anything, e.g. a full queue - releases the key so the
+client's retry runs the request again.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, jsonify, request
+
+from app.utils.kv_store import get_kv_store
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+RESPONSE_TTL = 86400  # Seconds a stored response is replayed
+LOCK_TTL = 60  # Seconds an in-flight claim survives a crashed worker
+WAIT_TIMEOUT = 10.0  # Seconds a duplicate waits for the in-flight request
+POLL_INTERVAL = 0.02
+
+_REPLAYED_HEADERS = ('Location', 'Content-Type')
+
+
+class IdempotencyStore:
+    """Claims, stores and replays responses by idempotency key."""
+
+    def __init__(self):
+        self.ttl = RESPONSE_TTL
+        self.lock_ttl = LOCK_TTL
+        self.wait_timeout = WAIT_TIMEOUT
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._counts = {'executed': 0, 'replayed': 0, 'waited': 0, 'conflicts': 0}
+
+    def init_app(self, app) -> None:
+        self.ttl = app.config.get('IDEMPOTENCY_TTL', RESPONSE_TTL)
+        self.lock_ttl = app.config.get('IDEMPOTENCY_LOCK_TTL', LOCK_TTL)
+        self.wait_timeout = app.config.get('IDEMPOTENCY_WAIT_TIMEOUT', WAIT_TIMEOUT)
+        app.extensions['idempotency'] = self
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    @staticmethod
+    def fingerprint() -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{request.method} {request.path}\n".encode())
+        digest.update(request.get_data(cache=True))
+        return digest.hexdigest()
+
+    def handle(self, scope: str, key: str, view, *args, **kwargs):
+        """Run view once per (scope, key); replay its response afterwards."""
+        store = get_kv_store()
+        store_key = f"idempotency:{scope}:{key}"
+        fingerprint = self.fingerprint()
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+
+        while True:
+            claim = json.dumps({'state': 'pending', 'fingerprint': fingerprint})
+            if store.set_if_absent(store_key, claim, ttl=self.lock_ttl):
+                return self._execute(store, store_key, fingerprint, view, *args, **kwargs)
+
+            raw = store.get(store_key)
+            if raw is None:
+                continue  # The owner failed or its claim expired: claim again
+            record = json.loads(raw)
+            if record['fingerprint'] != fingerprint:
+                self._count('conflicts')
+                return jsonify({'error': f"{HEADER} was already used for a different request"}), 422
+            if record['state'] == 'done':
+                self._count('replayed')
+                return self._replay(record)
+
+            if not waited:
+                waited = True
+                self._count('waited')
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                response = jsonify({'error': 'A request with this idempotency key is still in progress'})
+                response.headers['Retry-After'] = '1'
+                return response, 409
+            event = self._inflight.get(store_key)
+            if event is not None:
+                event.wait(remaining)  # Same process: wake when the owner finishes
+            else:
+                time.sleep(min(POLL_INTERVAL, remaining))
+
+    def _execute(self, store, store_key: str, fingerprint: str, view, *args, **kwargs):
+        event = threading.Event()
+        with self._lock:
+            self._inflight[store_key] = event
+        g.idempotency_retryable = False
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            if g.idempotency_retryable:
+                store.delete(store_key)
+            else:
+                # The view may have committed before failing; never run it twice
+                self._store_response(store, store_key, fingerprint, current_app.make_response(
+                    (jsonify({'error': 'Server error'}), 500)
+                ))
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(store_key, None)
+            event.set()
+
+        if response.status_code >= 500 and g.idempotency_retryable:
+            store.delete(store_key)
+        else:
+            self._store_response(store, store_key, fingerprint, response)
+        self._count('executed')
+        return response
+
+    def _store_response(self, store, store_key: str, fingerprint: str, response) -> None:
+        store.set(store_key, json.dumps({
+            'state': 'done',
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'body': response.get_data(as_text=True),
+            'headers': {name: response.headers[name] for name in _REPLAYED_HEADERS if name in response.headers},
+        }), ttl=self.ttl)
+
+    @staticmethod
+    def _replay(record: Dict[str, Any]):
+        response = current_app.response_class(record['body'], status=record['status'])
+        for name, value in record['headers'].items():
+            response.headers[name] = value
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+
+idempotency = IdempotencyStore()
+
+
+def mark_retryable() -> None:
+    """
+    Declare that the current request failed before writing anything, so its
+    idempotency key is released and a retry with the same key runs again.
+    """
+    g.idempotency_retryable = True
+
+
+def idempotent(scope: str):
+    """
+    Honour the Idempotency-Key header on a view. Requests without the
+    header run as before.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key: Optional[str] = request.headers.get(HEADER)
+            if key is None:
+                return view(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({'error': f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+            return idempotency.handle(scope, key, view, *args, **kwargs)
+        return wrapper
+    return decorator
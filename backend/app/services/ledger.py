@@ -0,0 +1,410 @@
+"""
+Balance Ledger
+Double-entry postings over the append-only ledger_entries table. An
+account's balance is its latest snapshot plus the entries after it.
+
+Credits append without taking any lock, so a busy seller's account is never
+a write hotspot. Debits lock only the debited account's snapshot row and
+check its ledger balance before appending. Balance reads are O(1) from a
+cached running total in the key-value store, incremented after each commit
+and refreshed from the ledger on a miss or after CACHE_TTL. Each commit also
+bumps the account's generation; a fill that saw the generation move while it
+read the ledger drops what it wrote, so a read that raced a posting cannot
+stay cached. Checks that guard a debit always read the ledger itself.
+
+Payments settled by Pi Network move the sender's amount into HOLDS_ACCOUNT
+when processing begins, under the debit lock and funds check, so the
+posting made once Pi has paid cannot fail.
+
+A periodic snapshot folds entries older than SNAPSHOT_MARGIN into the
+snapshots so strict reads only sum a short index range. The margin leaves
+room for transactions that allocated entry ids but have not yet committed.
+"""
+
+import atexit
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import bindparam, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import InsufficientFundsError, ValidationError
+from app.extensions import db
+from app.utils.kv_store import KeyValueStore, get_kv_store
+
+logger = logging.getLogger(__name__)
+
+# System accounts may go negative; they are the other side of money entering
+# or leaving user balances
+REWARDS_ACCOUNT = 'system:rewards'
+FEES_ACCOUNT = 'system:fees'
+PI_NETWORK_ACCOUNT = 'system:pi_network'
+ADJUSTMENTS_ACCOUNT = 'system:adjustments'
+OPENING_ACCOUNT = 'system:opening'
+HOLDS_ACCOUNT = 'system:holds'  # Sender funds reserved while a Pi payment settles
+OPENING_ENTRY_TYPE = 'opening_balance'
+HOLD_ENTRY_TYPE = 'hold'
+HOLD_RELEASE_ENTRY_TYPE = 'hold_release'
+
+QUANTUM = Decimal('0.00000001')  # Matches Numeric(20, 8)
+UNITS = 10 ** 8  # Cached balances are integers of QUANTUM
+
+CACHE_TTL = 600  # Seconds before a cached balance is re-read from the ledger
+SNAPSHOT_INTERVAL = 300  # Seconds between scheduled snapshots
+SNAPSHOT_MARGIN = timedelta(minutes=5)
+SNAPSHOT_MAX_ENTRIES = 500000  # Entries folded per snapshot run
+OPENING_BATCH_SIZE = 1000
+
+_STAGED_KEY = 'ledger_deltas'
+_SNAPSHOT_LOCK_KEY = 'ledger:snapshot_lock'
+
+Amount = Union[Decimal, float, int, str]
+
+
+def is_system_account(account_id: str) -> bool:
+    return account_id.startswith('system:')
+
+
+def _quantize(amount: Amount) -> Decimal:
+    return Decimal(str(amount)).quantize(QUANTUM)
+
+
+def _from_units(units: Union[int, str]) -> Decimal:
+    return (Decimal(int(units)) / UNITS).quantize(QUANTUM)
+
+
+class Ledger:
+    """Posting, balance and snapshot operations for the ledger."""
+
+    def __init__(self, store: Optional[KeyValueStore] = None):
+        self.snapshot_interval = SNAPSHOT_INTERVAL
+        self.cache_ttl = CACHE_TTL
+        self._store = store
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start scheduled snapshots unless TESTING or LEDGER_SNAPSHOT_INTERVAL is 0."""
+        self._app = app
+        self.snapshot_interval = app.config.get('LEDGER_SNAPSHOT_INTERVAL', SNAPSHOT_INTERVAL)
+        self.cache_ttl = app.config.get('LEDGER_BALANCE_CACHE_TTL', CACHE_TTL)
+        app.extensions['ledger'] = self
+        if self._thread is None and self.snapshot_interval and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='ledger-snapshot', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    @property
+    def store(self) -> KeyValueStore:
+        return self._store or get_kv_store()
+
+    @staticmethod
+    def _cache_key(account_id: str) -> str:
+        return f"ledger:balance:{account_id}"
+
+    @staticmethod
+    def _generation_key(account_id: str) -> str:
+        return f"ledger:balance_gen:{account_id}"
+
+    # --- Postings ---
+
+    def post(self, session: Session, legs: Sequence[Tuple[str, Amount]], entry_type: str,
+             reference_type: Optional[str] = None, reference_id: Optional[str] = None,
+             check_funds: bool = True) -> Optional[str]:
+        """
+        Append a balanced posting to the session's transaction.
+
+        Args:
+            session: Session whose commit makes the posting visible
+            legs: (account_id, amount) pairs summing to zero; credits positive
+            entry_type: Kind of movement, e.g. 'transfer' or 'quest_reward'
+            reference_type: Type of the record that caused the posting
+            reference_id: ID of that record
+            check_funds: Refuse to take a user account below zero
+
+        Returns:
+            The posting id shared by its entries, None if every leg is zero
+
+        Raises:
+            ValidationError: If the legs do not sum to zero
+            InsufficientFundsError: If a debited user account lacks the funds
+        """
+        from app.models.ledger import LedgerEntry
+
+        totals: Dict[str, Decimal] = {}
+        for account_id, amount in legs:
+            totals[account_id] = totals.get(account_id, Decimal(0)) + _quantize(amount)
+        totals = {account_id: amount for account_id, amount in totals.items() if amount}
+        if sum(totals.values(), Decimal(0)) != 0:
+            raise ValidationError("Ledger posting does not balance")
+        if not totals:
+            return None
+
+        if check_funds:
+            # Lock in account order so concurrent postings cannot deadlock
+            debits = sorted(account_id for account_id, amount in totals.items()
+                            if amount < 0 and not is_system_account(account_id))
+            for account_id in debits:
+                self._lock_account(session, account_id)
+                if self.ledger_balance(account_id, session) + totals[account_id] < 0:
+                    raise InsufficientFundsError("Insufficient balance")
+
+        posting_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        session.execute(LedgerEntry.__table__.insert(), [{
+            'posting_id': posting_id,
+            'account_id': account_id,
+            'amount': amount,
+            'entry_type': entry_type,
+            'reference_type': reference_type,
+            'reference_id': reference_id,
+            'created_at': now
+        } for account_id, amount in totals.items()])
+
+        staged = session.info.setdefault(_STAGED_KEY, {})
+        for account_id, amount in totals.items():
+            staged[account_id] = staged.get(account_id, 0) + int(amount * UNITS)
+        return posting_id
+
+    def transfer(self, session: Session, source: str, destination: str, amount: Amount,
+                 entry_type: str, **kwargs) -> Optional[str]:
+        """Post amount from source to destination."""
+        return self.post(session, [(source, -_quantize(amount)), (destination, _quantize(amount))],
+                         entry_type, **kwargs)
+
+    def _lock_account(self, session: Session, account_id: str) -> None:
+        from app.models.ledger import BalanceSnapshot
+
+        table = BalanceSnapshot.__table__
+        locked = select(table.c.account_id).where(table.c.account_id == account_id).with_for_update()
+        if session.execute(locked).first() is not None:
+            return
+        try:
+            with session.begin_nested():
+                session.execute(table.insert().values(
+                    account_id=account_id, balance=0, last_entry_id=0, updated_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            pass  # Created concurrently
+        session.execute(locked)
+
+    # --- Balances ---
+
+    def ledger_balance(self, account_id: str, session: Optional[Session] = None) -> Decimal:
+        """Balance read from the snapshot and later entries, bypassing the cache."""
+        from app.models.ledger import BalanceSnapshot, LedgerEntry
+
+        session = session or db.session
+        snapshot = session.query(BalanceSnapshot.balance, BalanceSnapshot.last_entry_id).filter(
+            BalanceSnapshot.account_id == account_id
+        ).first()
+        base, last_entry_id = (snapshot.balance, snapshot.last_entry_id) if snapshot else (0, 0)
+        recent = session.query(func.coalesce(func.sum(LedgerEntry.amount), 0)).filter(
+            LedgerEntry.account_id == account_id,
+            LedgerEntry.id > last_entry_id
+        ).scalar()
+        return _quantize(base) + _quantize(recent)
+
+    def ledger_balances(self, account_ids: Iterable[str],
+                        session: Optional[Session] = None) -> Dict[str, Decimal]:
+        """Ledger balances for several accounts in two queries, bypassing the cache."""
+        from app.models.ledger import BalanceSnapshot, LedgerEntry
+
+        account_ids = list(dict.fromkeys(account_ids))
+        if not account_ids:
+            return {}
+        session = session or db.session
+        balances = {account_id: Decimal(0) for account_id in account_ids}
+        for account_id, balance in session.query(BalanceSnapshot.account_id, BalanceSnapshot.balance).filter(
+                BalanceSnapshot.account_id.in_(account_ids)):
+            balances[account_id] = _quantize(balance)
+        recent = session.query(LedgerEntry.account_id, func.sum(LedgerEntry.amount)).outerjoin(
+            BalanceSnapshot, BalanceSnapshot.account_id == LedgerEntry.account_id
+        ).filter(
+            LedgerEntry.account_id.in_(account_ids),
+            LedgerEntry.id > func.coalesce(BalanceSnapshot.last_entry_id, 0)
+        ).group_by(LedgerEntry.account_id)
+        for account_id, amount in recent:
+            balances[account_id] += _quantize(amount)
+        return balances
+
+    def balance(self, account_id: str) -> Decimal:
+        """Committed balance from the cached running total."""
+        key = self._cache_key(account_id)
+        cached = self.store.get(key)
+        if cached is not None:
+            return _from_units(cached)
+
+        generation_key = self._generation_key(account_id)
+        generation = self.store.get(generation_key)
+        balance = self.ledger_balance(account_id)
+        # Don't cache a read that includes this session's uncommitted postings
+        if account_id not in db.session.info.get(_STAGED_KEY, {}):
+            self.store.set_if_absent(key, int(balance * UNITS), ttl=self.cache_ttl)
+            if self.store.get(generation_key) != generation:
+                # A posting committed during the read may have missed the cache
+                self.store.delete(key)
+        return balance
+
+    def balances(self, account_ids: Iterable[str]) -> Dict[str, Decimal]:
+        """Cached balances for several accounts in one round trip."""
+        account_ids = list(account_ids)
+        cached = self.store.get_many([self._cache_key(account_id) for account_id in account_ids])
+        return {
+            account_id: _from_units(value) if value is not None else self.balance(account_id)
+            for account_id, value in zip(account_ids, cached)
+        }
+
+    def _apply(self, deltas: Dict[str, int]) -> None:
+        store = self.store
+        for account_id, units in deltas.items():
+            # Bump first: a fill that read the ledger before this commit then discards its value
+            store.incr(self._generation_key(account_id), ttl=self.cache_ttl)
+            # Uncached accounts are read from the ledger on first use
+            store.incr_existing(self._cache_key(account_id), units)
+
+    # --- Snapshots ---
+
+    def snapshot(self, margin: timedelta = SNAPSHOT_MARGIN,
+                 max_entries: int = SNAPSHOT_MAX_ENTRIES) -> Dict[str, Any]:
+        """
+        Fold entries older than margin into the balance snapshots.
+
+        Every entry up to the highest last_entry_id is already folded, so a
+        run only aggregates the entries after it, in one transaction.
+
+        Returns:
+            Summary with accounts updated and the new entry watermark
+        """
+        from app.models.ledger import BalanceSnapshot, LedgerEntry
+
+        cutoff = datetime.utcnow() - margin
+        watermark = db.session.query(func.coalesce(func.max(BalanceSnapshot.last_entry_id), 0)).scalar()
+        upper = db.session.query(func.max(LedgerEntry.id)).filter(
+            LedgerEntry.id > watermark,
+            LedgerEntry.id <= watermark + max_entries,
+            LedgerEntry.created_at <= cutoff
+        ).scalar()
+        if not upper:
+            db.session.rollback()
+            return {'accounts': 0, 'watermark': watermark}
+
+        table = BalanceSnapshot.__table__
+        now = datetime.utcnow()
+        try:
+            sums = db.session.query(LedgerEntry.account_id, func.sum(LedgerEntry.amount)).filter(
+                LedgerEntry.id > watermark,
+                LedgerEntry.id <= upper
+            ).group_by(LedgerEntry.account_id).all()
+
+            existing = set()
+            accounts = [account_id for account_id, _ in sums]
+            for start in range(0, len(accounts), OPENING_BATCH_SIZE):
+                existing.update(row.account_id for row in db.session.query(BalanceSnapshot.account_id).filter(
+                    BalanceSnapshot.account_id.in_(accounts[start:start + OPENING_BATCH_SIZE])
+                ))
+
+            updates = [{'b_account': account_id, 'b_delta': delta}
+                       for account_id, delta in sums if account_id in existing]
+            if updates:
+                db.session.execute(table.update().where(table.c.account_id == bindparam('b_account')).values(
+                    balance=table.c.balance + bindparam('b_delta'), last_entry_id=upper, updated_at=now
+                ), updates)
+            inserts = [{'account_id': account_id, 'balance': delta, 'last_entry_id': upper, 'updated_at': now}
+                       for account_id, delta in sums if account_id not in existing]
+            if inserts:
+                db.session.execute(table.insert(), inserts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        logger.info("Ledger snapshot folded entries %d-%d for %d accounts", watermark + 1, upper, len(sums))
+        return {'accounts': len(sums), 'watermark': upper}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.snapshot_interval):
+            store = self.store
+            if not store.set_if_absent(_SNAPSHOT_LOCK_KEY, '1', ttl=self.snapshot_interval):
+                continue
+            with self._app.app_context():
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    logger.error(f"Ledger snapshot error: {str(e)}")
+                finally:
+                    db.session.remove()
+                    store.delete(_SNAPSHOT_LOCK_KEY)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # --- Migration ---
+
+    def open_balances(self, batch_size: int = OPENING_BATCH_SIZE) -> int:
+        """
+        Post opening entries from users.total_rewards for users whose
+        account has not been opened yet. Safe to re-run, including after
+        other postings have reached an account.
+
+        Returns:
+            Number of accounts opened
+        """
+        from app.models.ledger import LedgerEntry
+        from app.models.user import User
+
+        opened = 0
+        last_id = None
+        while True:
+            query = db.session.query(User.id, User.total_rewards).filter(User.total_rewards > 0).order_by(User.id)
+            if last_id is not None:
+                query = query.filter(User.id > last_id)
+            rows = query.limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            posted = {row.account_id for row in db.session.query(LedgerEntry.account_id).filter(
+                LedgerEntry.account_id.in_([row.id for row in rows]),
+                LedgerEntry.entry_type == OPENING_ENTRY_TYPE
+            ).distinct()}
+            legs = [(row.id, row.total_rewards) for row in rows if row.id not in posted]
+            if not legs:
+                continue
+            try:
+                self.post(db.session, [(OPENING_ACCOUNT, -sum(amount for _, amount in legs))] + legs,
+                          OPENING_ENTRY_TYPE, check_funds=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            opened += len(legs)
+        return opened
+
+
+ledger = Ledger()
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_ledger_deltas(session):
+    """Move cached running totals by the committed postings."""
+    deltas = session.info.pop(_STAGED_KEY, None)
+    if deltas:
+        try:
+            ledger._apply(deltas)
+        except Exception as e:
+            logger.error(f"Failed to update cached balances: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_ledger_deltas(session):
+    session.info.pop(_STAGED_KEY, None)
@@ -0,0 +1,131 @@
+"""
+Level Progression Tables
+Precomputed XP thresholds and cumulative level-up rewards up to
+MAX_PLAYER_LEVEL, so level lookups are a bisect and reward totals a
+subtraction. Includes a vectorized recompute for curve rebalances.
+"""
+
+import bisect
+import logging
+import time
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Mirror BaseConfig; config is not importable at model import time
+MAX_PLAYER_LEVEL = 250
+BASE_XP_REQUIREMENT = 100
+XP_MULTIPLIER = 1.5
+
+RECOMPUTE_BATCH_SIZE = 50000
+
+
+def _xp_curve(level: int) -> int:
+    """Total XP required for a level: BASE * level^MULTIPLIER."""
+    if level <= 1:
+        return 0
+    return int(BASE_XP_REQUIREMENT * (level ** XP_MULTIPLIER))
+
+
+def _level_reward(level: int) -> float:
+    """Pi granted on reaching a level."""
+    return 0.1 * (1 + (level - 1) * 0.1)
+
+
+# XP_THRESHOLDS[i] is the total XP needed for level i + 1
+XP_THRESHOLDS: Tuple[int, ...] = tuple(_xp_curve(level) for level in range(1, MAX_PLAYER_LEVEL + 1))
+
+# REWARD_TOTALS[level] is the Pi earned levelling from 1 up to level
+REWARD_TOTALS: Tuple[float, ...] = tuple(
+    np.concatenate(([0.0, 0.0], np.cumsum([_level_reward(level) for level in range(2, MAX_PLAYER_LEVEL + 1)])))
+)
+
+_THRESHOLD_ARRAY = np.array(XP_THRESHOLDS, dtype=np.int64)
+
+
+def xp_for_level(level: int) -> int:
+    """Total XP required to reach a level."""
+    if 1 <= level <= MAX_PLAYER_LEVEL:
+        return XP_THRESHOLDS[level - 1]
+    return _xp_curve(level)
+
+
+def level_for_xp(total_xp: int) -> int:
+    """Level reached with total_xp, capped at MAX_PLAYER_LEVEL."""
+    return max(1, bisect.bisect_right(XP_THRESHOLDS, total_xp))
+
+
+def level_rewards(old_level: int, new_level: int) -> float:
+    """Pi rewards for levelling from old_level to new_level."""
+    if new_level <= old_level:
+        return 0.0
+    old_level = min(max(old_level, 1), MAX_PLAYER_LEVEL)
+    new_level = min(new_level, MAX_PLAYER_LEVEL)
+    return REWARD_TOTALS[new_level] - REWARD_TOTALS[old_level]
+
+
+def levels_for_xp(total_xp: np.ndarray) -> np.ndarray:
+    """Vectorized level_for_xp over an array of XP totals."""
+    return np.maximum(np.searchsorted(_THRESHOLD_ARRAY, total_xp, side='right'), 1)
+
+
+def recompute_user_levels(batch_size: int = RECOMPUTE_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Recompute every user's level from experience_points after a curve change.
+
+    Users are read in keyset-paginated batches of (id, xp, level) columns,
+    levels are computed with one searchsorted per batch and only changed rows
+    are written, with an executemany UPDATE per batch. No level-up rewards
+    are granted.
+
+    Returns:
+        Summary with users scanned, users updated and elapsed time
+    """
+    from app.models.user import User
+    from app.services.quest_board import quest_board_cache
+
+    started = time.monotonic()
+    table = User.__table__
+    stmt = table.update().where(table.c.id == bindparam('b_id')).values(level=bindparam('b_level'))
+    summary = {'scanned': 0, 'updated': 0}
+    last_id = None
+
+    while True:
+        query = db.session.query(User.id, User.experience_points, User.level).order_by(User.id)
+        if last_id is not None:
+            query = query.filter(User.id > last_id)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            break
+
+        experience = np.fromiter((row.experience_points for row in rows), np.int64, len(rows))
+        current = np.fromiter((row.level for row in rows), np.int64, len(rows))
+        levels = levels_for_xp(experience)
+        changed = np.flatnonzero(levels != current)
+
+        if len(changed):
+            try:
+                db.session.execute(stmt, [
+                    {'b_id': rows[i].id, 'b_level': int(levels[i])} for i in changed
+                ])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        summary['scanned'] += len(rows)
+        summary['updated'] += len(changed)
+        last_id = rows[-1].id
+
+    if summary['updated']:
+        # Bulk updates skip the per-user board invalidation listener
+        quest_board_cache.invalidate_catalog()
+
+    summary['elapsed_ms'] = round((time.monotonic() - started) * 1000, 2)
+    logger.info("Recomputed levels: %(updated)d of %(scanned)d users changed", summary)
+    return summary
@@ -0,0 +1,66 @@
+"""
+Failed Login Counters
+Per-username and per-IP failure counters with sliding expiry, held in the
+shared key-value store (in-process fallback without Redis).
+
+Each failure bumps both counters and pushes their expiry out by the lockout
+window, so a lockout ends one window after the last failure. A lockout check
+is a single multi-key read. AuditLog remains the permanent record.
+"""
+
+from datetime import timedelta
+from typing import Optional
+
+from app.utils.kv_store import KeyValueStore, get_kv_store
+
+
+class LoginFailureCounter:
+    """Sliding-expiry failure counters for login throttling."""
+
+    def __init__(self, max_attempts: int, window: timedelta, max_ip_attempts: int,
+                 store: Optional[KeyValueStore] = None):
+        self.max_attempts = max_attempts
+        self.max_ip_attempts = max_ip_attempts
+        self.ttl = int(window.total_seconds())
+        self._store = store
+
+    @property
+    def store(self) -> KeyValueStore:
+        return self._store or get_kv_store()
+
+    @staticmethod
+    def _user_key(username: str) -> str:
+        return f"login_failures:user:{username}"
+
+    @staticmethod
+    def _ip_key(ip_address: str) -> str:
+        return f"login_failures:ip:{ip_address}"
+
+    def is_locked(self, username: str, ip_address: Optional[str] = None) -> bool:
+        """True if the username or the client IP has too many recent failures."""
+        keys = [self._user_key(username)]
+        if ip_address:
+            keys.append(self._ip_key(ip_address))
+        counts = [int(value) if value else 0 for value in self.store.get_many(keys)]
+        if counts[0] >= self.max_attempts:
+            return True
+        return len(counts) > 1 and counts[1] >= self.max_ip_attempts
+
+    def record_failure(self, username: str, ip_address: Optional[str] = None) -> int:
+        """
+        Count a failed login.
+
+        Returns:
+            The username's failure count within the window
+        """
+        store = self.store
+        count = store.incr(self._user_key(username), 1, self.ttl)
+        store.expire(self._user_key(username), self.ttl)
+        if ip_address:
+            store.incr(self._ip_key(ip_address), 1, self.ttl)
+            store.expire(self._ip_key(ip_address), self.ttl)
+        return count
+
+    def reset(self, username: str) -> None:
+        """Clear a username's failures after a successful login."""
+        self.store.delete(self._user_key(username))
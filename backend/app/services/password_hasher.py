@@ -0,0 +1,155 @@
+"""
+Password Hashing Pool
+Runs pbkdf2 password hashing and verification in a bounded process pool so
+login bursts don't pin request threads on CPU and the GIL.
+
+Callers block on hash()/verify() or await hash_async()/verify_async(). When
+more than PASSWORD_HASH_MAX_PENDING operations are in flight, new requests
+fail fast with HasherBusyError, which is served as 503 with Retry-After.
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Optional
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+# Werkzeug stores the full method, including iterations, as the hash prefix
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+SALT_LENGTH = 16
+
+
+def _hash_password(password: str, method: str, salt_length: int) -> str:
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify_password(password_hash: str, password: str) -> bool:
+    return check_password_hash(password_hash, password)
+
+
+class HasherBusyError(Exception):
+    """Raised when the hashing queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing capacity exceeded")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Bounded process pool for password hashing."""
+
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.workers = os.cpu_count() or 1
+        self.max_pending = self.workers * 8
+        self.retry_after = 2
+        self.inline = True  # Until init_app configures the pool
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def init_app(self, app) -> None:
+        """Configure the pool from PASSWORD_HASH_* settings."""
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.workers * 8)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 2)
+        self.inline = bool(app.config.get('TESTING')) or self.workers <= 0
+        app.extensions['password_hasher'] = self
+        app.register_error_handler(HasherBusyError, _busy_response)
+        atexit.register(self.shutdown)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: request-handling threads make forking unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if self.inline:
+            future: Future = Future()
+            future.set_result(fn(*args))
+            return future
+
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                raise HasherBusyError(self.retry_after)
+            self._in_flight += 1
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    # --- Futures ---
+
+    def submit_hash(self, password: str) -> Future:
+        return self._submit(_hash_password, password, self.method, SALT_LENGTH)
+
+    def submit_verify(self, password_hash: str, password: str) -> Future:
+        return self._submit(_verify_password, password_hash, password)
+
+    # --- Blocking ---
+
+    def hash(self, password: str, timeout: Optional[float] = None) -> str:
+        return self.submit_hash(password).result(timeout)
+
+    def verify(self, password_hash: str, password: str, timeout: Optional[float] = None) -> bool:
+        return self.submit_verify(password_hash, password).result(timeout)
+
+    # --- Async ---
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self.submit_hash(password))
+
+    async def verify_async(self, password_hash: str, password: str) -> bool:
+        return await asyncio.wrap_future(self.submit_verify(password_hash, password))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if the hash was made with a different method or work factor."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def _busy_response(error: HasherBusyError):
+    logger.warning("Password hashing queue full; rejecting request")
+    response = jsonify({
+        'success': False,
+        'error': {
+            'type': 'service_unavailable',
+            'message': 'Authentication is busy. Please retry shortly.'
+        }
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+password_hasher = PasswordHasher()
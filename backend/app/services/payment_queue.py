@@ -0,0 +1,267 @@
+"""
+Pi Payment Queue
+Processes transactions in the background so /process returns immediately
+instead of holding a request thread for the duration of a Pi Network call.
+
+Queued transactions are ordered by priority (1 is highest) and handled by a
+fixed number of asyncio workers, which caps concurrent Pi Network calls.
+Each payment is claimed with a row lock (PENDING -> PROCESSING), which also
+holds the sender's funds in the ledger, settled against Pi Network and then
+completed from the hold or failed, releasing it. Database steps run on a small thread pool so they never block the
+event loop.
+
+The queue is in-process. Queued transactions carry a recovery deadline in
+next_retry_at, and the transaction retry scheduler queues those still
+PENDING after it passes again, e.g. after a restart; claiming is
+idempotent, so a duplicate is skipped.
+"""
+
+import asyncio
+import atexit
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from app.extensions import db
+from app.services.pi_network import pi_network
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_PENDING = 10000
+DEFAULT_TIMEOUT = 30.0  # Seconds before a Pi Network call is abandoned
+DB_THREADS = 4
+
+
+class PaymentQueueFullError(Exception):
+    """Raised when too many payments are waiting to be processed."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Payment queue is full")
+        self.retry_after = retry_after
+
+
+class PaymentQueue:
+    """Priority queue and asyncio worker pool for Pi payments."""
+
+    def __init__(self, network=None):
+        self.network = network or pi_network
+        self.workers = DEFAULT_WORKERS
+        self.max_pending = DEFAULT_MAX_PENDING
+        self.timeout = DEFAULT_TIMEOUT
+        self.retry_after = 5
+        self.inline = True  # Until init_app starts the workers
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._sequence = itertools.count()
+        self._metrics = {'completed': 0, 'failed': 0, 'unknown': 0, 'skipped': 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Configure from PAYMENT_QUEUE_* settings and start the workers."""
+        self._app = app
+        self.workers = app.config.get('PAYMENT_QUEUE_WORKERS', DEFAULT_WORKERS)
+        self.max_pending = app.config.get('PAYMENT_QUEUE_MAX_PENDING', DEFAULT_MAX_PENDING)
+        self.timeout = app.config.get('PAYMENT_QUEUE_TIMEOUT', DEFAULT_TIMEOUT)
+        self.retry_after = app.config.get('PAYMENT_QUEUE_RETRY_AFTER', 5)
+        self.inline = bool(app.config.get('TESTING'))
+        app.extensions['payment_queue'] = self
+        if self._thread is None and not self.inline:
+            self._thread = threading.Thread(target=self._run, name='payment-queue', daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            atexit.register(self.stop)
+
+    def enqueue(self, transaction_id: str, priority: int = 5) -> bool:
+        """
+        Queue a transaction for processing.
+
+        Returns:
+            False if the transaction is already queued or being processed
+
+        Raises:
+            PaymentQueueFullError: If max_pending payments are outstanding
+        """
+        if self.inline:
+            self.process_now(transaction_id)
+            return True
+
+        with self._lock:
+            if transaction_id in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                raise PaymentQueueFullError(self.retry_after)
+            self._pending.add(transaction_id)
+        item = (priority, next(self._sequence), transaction_id)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        return True
+
+    def is_queued(self, transaction_id: str) -> bool:
+        """True while the transaction is waiting or in flight."""
+        with self._lock:
+            return transaction_id in self._pending
+
+    def metrics(self) -> Dict[str, int]:
+        """Queue depth, in-flight payments and outcome counters."""
+        with self._lock:
+            pending = len(self._pending)
+            counters = dict(self._metrics)
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {'queued': depth, 'in_flight': pending - depth, **counters}
+
+    def process_now(self, transaction_id: str) -> Optional[bool]:
+        """
+        Process a transaction synchronously in the current session.
+
+        Returns:
+            Whether the payment completed, or None if it was not claimable
+        """
+        claim = self._claim(transaction_id)
+        if claim is None:
+            return None
+        try:
+            payment, error = self.network.create_payment_blocking(*claim), None
+        except Exception as e:
+            payment, error = None, str(e)
+        return self._settle(transaction_id, payment, error)
+
+    # --- Database steps ---
+
+    def _claim(self, transaction_id: str) -> Optional[Tuple[str, Decimal]]:
+        """Lock a PENDING transaction, hold the sender's funds and move it to PROCESSING."""
+        from app.models.transaction import Transaction, TransactionStatus
+
+        try:
+            txn = Transaction.query.filter_by(id=transaction_id).with_for_update().first()
+            if txn is None or txn.status != TransactionStatus.PENDING:
+                db.session.rollback()
+                self._count('skipped')
+                return None
+            ready = txn.begin_processing()
+            claim = (txn.reference_number, txn.amount)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if not ready:
+            self._count('failed')
+            return None
+        return claim
+
+    def _settle(self, transaction_id: str, payment: Optional[Dict[str, str]],
+                error: Optional[str] = None, unknown: bool = False) -> Optional[bool]:
+        """
+        Apply the Pi Network result to a PROCESSING transaction.
+
+        Args:
+            unknown: The call timed out, so Pi may have paid; park the
+                transaction for reconciliation instead of failing it
+        """
+        from app.models.transaction import Transaction, TransactionStatus
+
+        try:
+            txn = Transaction.query.filter_by(id=transaction_id).with_for_update().first()
+            if txn is None or txn.status != TransactionStatus.PROCESSING:
+                # Already settled, e.g. by another worker after a re-enqueue
+                db.session.rollback()
+                self._count('skipped')
+                return None
+
+            if unknown:
+                txn.mark_payment_unknown(error)
+                completed = False
+            else:
+                completed = txn.apply_pi_payment(payment, error)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self._count('unknown' if unknown else 'completed' if completed else 'failed')
+        return completed
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self._metrics[outcome] += 1
+
+    def _in_context(self, fn: Callable, *args) -> Any:
+        with self._app.app_context():
+            try:
+                return fn(*args)
+            finally:
+                db.session.remove()
+
+    # --- Event loop ---
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='payment-db')
+        tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._executor.shutdown(wait=True)
+            loop.close()
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, transaction_id = await self._queue.get()
+            try:
+                await self._handle(transaction_id)
+            except Exception as e:
+                logger.error(f"Payment processing failed for {transaction_id}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending.discard(transaction_id)
+                self._queue.task_done()
+
+    async def _handle(self, transaction_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        claim = await loop.run_in_executor(self._executor, self._in_context, self._claim, transaction_id)
+        if claim is None:
+            return
+
+        error, unknown = None, False
+        try:
+            payment = await asyncio.wait_for(self.network.create_payment(*claim), self.timeout)
+        except asyncio.TimeoutError:
+            payment, error, unknown = None, "Pi Network payment timed out", True
+        except Exception as e:
+            payment, error = None, str(e)
+
+        await loop.run_in_executor(self._executor, self._in_context,
+                                   self._settle, transaction_id, payment, error, unknown)
+
+    async def _drain(self) -> None:
+        await self._queue.join()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Finish queued payments (up to timeout) and stop the workers."""
+        if self._thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result(timeout)
+        except Exception:
+            logger.warning(f"Stopping payment queue with {self.metrics()['queued']} payments still queued")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+
+payment_queue = PaymentQueue()
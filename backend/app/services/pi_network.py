@@ -0,0 +1,58 @@
+"""
+Local Pi Network Stub
+Stands in for the Pi Network payments API so the payment pipeline can run
+and be load-tested offline.
+
+Payments settle after a configurable latency and fail at a configurable
+rate. A real SDK client replaces the stub by exposing the same
+create_payment/create_payment_blocking interface.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from decimal import Decimal
+from typing import Dict, Optional
+
+DEFAULT_LATENCY = 0.1  # Seconds per payment
+DEFAULT_FAILURE_RATE = 0.05
+
+
+class LocalPiNetwork:
+    """Simulated Pi Network payments endpoint."""
+
+    def __init__(self, latency: float = DEFAULT_LATENCY, failure_rate: float = DEFAULT_FAILURE_RATE):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def init_app(self, app) -> None:
+        self.latency = app.config.get('PI_NETWORK_STUB_LATENCY', DEFAULT_LATENCY)
+        self.failure_rate = app.config.get('PI_NETWORK_STUB_FAILURE_RATE', DEFAULT_FAILURE_RATE)
+
+    def _settle(self, reference: str, amount: Decimal) -> Optional[Dict[str, str]]:
+        if random.random() < self.failure_rate:
+            return None
+        return {
+            'pi_transaction_id': f"pi_txn_{uuid.uuid4().hex[:16]}",
+            'pi_payment_id': f"pi_pay_{uuid.uuid4().hex[:16]}",
+            'blockchain_hash': f"0x{uuid.uuid4().hex}{uuid.uuid4().hex}"
+        }
+
+    async def create_payment(self, reference: str, amount: Decimal) -> Optional[Dict[str, str]]:
+        """
+        Submit a payment and wait for it to settle.
+
+        Returns:
+            Pi identifiers for the settled payment, or None if it was rejected
+        """
+        await asyncio.sleep(self.latency)
+        return self._settle(reference, amount)
+
+    def create_payment_blocking(self, reference: str, amount: Decimal) -> Optional[Dict[str, str]]:
+        """Blocking variant of create_payment for synchronous callers."""
+        time.sleep(self.latency)
+        return self._settle(reference, amount)
+
+
+pi_network = LocalPiNetwork()
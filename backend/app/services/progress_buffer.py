@@ -0,0 +1,186 @@
+"""
+Quest Progress Write-Behind Buffer
+Coalesces frequent client progress ticks per (user, quest) in memory and
+writes them to quest_progress in periodic batches.
+
+Ticks that cross a quest's completion threshold bypass the buffer and go
+through QuestProgress.update_progress immediately, so completion events and
+reward records are never delayed. Each worker process keeps its own buffer,
+so progress only moves forward: ticks coalesce to the highest value seen, and
+a flush never lowers a value another worker has already written.
+"""
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import and_, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.25  # Seconds between background flushes
+FLUSH_BATCH_SIZE = 500  # Rows per executemany UPDATE
+
+
+class _PendingProgress:
+    """Latest buffered state for one progress row."""
+
+    __slots__ = ('progress_id', 'value', 'data')
+
+    def __init__(self, progress_id: str, value: int, data: Optional[Dict[str, Any]]):
+        self.progress_id = progress_id
+        self.value = value
+        self.data = data
+
+
+class ProgressBuffer:
+    """In-memory write-behind buffer for quest progress updates."""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, batch_size: int = FLUSH_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], _PendingProgress] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the background flusher for this application."""
+        self._app = app
+        app.extensions['progress_buffer'] = self
+        if self._thread is None and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='progress-buffer', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def record(self, progress, value: int, data: Optional[Dict[str, Any]] = None,
+               target: Optional[int] = None) -> bool:
+        """
+        Record a progress tick.
+
+        Args:
+            progress: QuestProgress row the tick applies to
+            value: New progress value; lower than a buffered value it is ignored
+            data: Progress data to merge into progress_data
+            target: The quest's objective_target, if any
+
+        Returns:
+            True if the tick completed the quest. The completion is applied to
+            the ORM object and the caller must commit the session.
+        """
+        if progress.status == 'completed':
+            return False
+
+        value = max(0, value)
+        key = (progress.user_id, progress.quest_id)
+
+        if target and value >= target:
+            with self._lock:
+                pending = self._pending.pop(key, None)
+            merged = {**(pending.data or {}), **(data or {})} if pending else data
+            return progress.update_progress(value, merged)
+
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = _PendingProgress(progress.id, value, progress.progress_data)
+                self._pending[key] = pending
+            pending.value = max(pending.value, value)
+            if data:
+                pending.data = {**(pending.data or {}), **data}
+        return False
+
+    def pending_value(self, user_id: str, quest_id: str) -> Optional[int]:
+        """Buffered progress value not yet written, if any."""
+        with self._lock:
+            pending = self._pending.get((user_id, quest_id))
+            return pending.value if pending else None
+
+    def flush(self) -> int:
+        """
+        Write all buffered progress in batched UPDATE statements.
+
+        Rows completed since they were buffered, or already past the
+        buffered value, are left untouched.
+
+        Returns:
+            Number of progress rows written
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        from app.models.quest import QuestProgress
+
+        table = QuestProgress.__table__
+        stmt = table.update().where(and_(
+            table.c.id == bindparam('b_id'),
+            table.c.status == 'in_progress',
+            # Equal values still write, so data-only ticks are kept
+            table.c.progress_value <= bindparam('b_value')
+        )).values(
+            progress_value=bindparam('b_value'),
+            progress_data=bindparam('b_data'),
+            last_updated=bindparam('b_updated')
+        )
+
+        now = datetime.utcnow()
+        rows = [
+            {'b_id': entry.progress_id, 'b_value': entry.value,
+             'b_data': entry.data, 'b_updated': now}
+            for entry in pending.values()
+        ]
+
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                db.session.execute(stmt, rows[start:start + self.batch_size])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._requeue(pending)
+            logger.error(f"Failed to flush {len(rows)} quest progress updates: {str(e)}")
+            return 0
+
+        return len(rows)
+
+    def _requeue(self, pending: Dict[Tuple[str, str], _PendingProgress]) -> None:
+        """Put unwritten entries back without overwriting newer ticks."""
+        with self._lock:
+            for key, entry in pending.items():
+                newer = self._pending.get(key)
+                if newer is None:
+                    self._pending[key] = entry
+                else:
+                    newer.data = {**(entry.data or {}), **(newer.data or {})}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._flush_in_context()
+
+    def _flush_in_context(self) -> None:
+        with self._app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Quest progress flusher error: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def stop(self) -> None:
+        """Stop the background flusher and drain the buffer."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._app is not None:
+            self._flush_in_context()
+
+
+progress_buffer = ProgressBuffer()
@@ -0,0 +1,136 @@
+"""
+Quest Board Cache
+Materialized per-user quest boards backed by the shared application cache.
+
+A board holds the ordered list of quests available to a user together with
+their eligibility and the user's quest counters, so serving /quests/available
+is a handful of cache lookups. Boards are invalidated after commit when the
+user starts or completes a quest or levels up; quest catalog changes rotate a
+global version token that retires every board at once.
+"""
+
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import cache
+
+BOARD_TIMEOUT = 900  # Seconds; boards are also invalidated explicitly
+CARD_TIMEOUT = 300  # Seconds; cards carry participant counts that drift
+
+_CATALOG_VERSION_KEY = 'quest_board:version'
+_STALE_USERS_KEY = 'quest_board_stale_users'
+_STALE_QUESTS_KEY = 'quest_board_stale_quests'
+_STALE_CATALOG_KEY = 'quest_board_stale_catalog'
+
+
+class QuestBoardCache:
+    """Cache access and invalidation for per-user quest boards."""
+
+    @staticmethod
+    def _board_key(user_id: str) -> str:
+        return f'quest_board:user:{user_id}'
+
+    @staticmethod
+    def _card_key(version: str, quest_id: str) -> str:
+        return f'quest_board:card:{version}:{quest_id}'
+
+    def catalog_version(self) -> str:
+        """Current catalog version token, created on first use."""
+        version = cache.get(_CATALOG_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(_CATALOG_VERSION_KEY, version, timeout=0)
+        return version
+
+    def get_board(self, user_id: str, version: str) -> Optional[Dict[str, Any]]:
+        """Return the cached board if it was built for the current catalog version."""
+        board = cache.get(self._board_key(user_id))
+        if board and board.get('version') == version:
+            return board
+        return None
+
+    def set_board(self, user_id: str, board: Dict[str, Any]) -> None:
+        cache.set(self._board_key(user_id), board, timeout=BOARD_TIMEOUT)
+
+    def get_cards(self, version: str, quest_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch serialized quest cards; missing cards are omitted."""
+        if not quest_ids:
+            return {}
+        values = cache.get_many(*[self._card_key(version, quest_id) for quest_id in quest_ids])
+        return {quest_id: card for quest_id, card in zip(quest_ids, values) if card is not None}
+
+    def set_cards(self, version: str, cards: Dict[str, Dict[str, Any]]) -> None:
+        if cards:
+            cache.set_many(
+                {self._card_key(version, quest_id): card for quest_id, card in cards.items()},
+                timeout=CARD_TIMEOUT
+            )
+
+    # --- Invalidation ---
+
+    def invalidate_users(self, user_ids: Iterable[str]) -> None:
+        keys = [self._board_key(user_id) for user_id in user_ids]
+        if keys:
+            cache.delete_many(*keys)
+
+    def invalidate_quests(self, quest_ids: Iterable[str]) -> None:
+        version = cache.get(_CATALOG_VERSION_KEY)
+        if version is None:
+            return
+        keys = [self._card_key(version, quest_id) for quest_id in quest_ids]
+        if keys:
+            cache.delete_many(*keys)
+
+    def invalidate_catalog(self) -> None:
+        """Retire every board and card by rotating the catalog version."""
+        cache.set(_CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+
+    # --- Commit-time staging ---
+
+    @staticmethod
+    def mark_user_stale(session: Optional[Session], user_id: str) -> None:
+        """Invalidate a user's board once the current transaction commits."""
+        if session is not None and user_id is not None:
+            session.info.setdefault(_STALE_USERS_KEY, set()).add(user_id)
+
+    @staticmethod
+    def mark_quest_stale(session: Optional[Session], quest_id: str, catalog: bool = False) -> None:
+        """
+        Drop a quest's cached card once the current transaction commits.
+
+        Args:
+            catalog: The change affects eligibility, so retire all boards too
+        """
+        if session is None:
+            return
+        session.info.setdefault(_STALE_QUESTS_KEY, set()).add(quest_id)
+        if catalog:
+            session.info[_STALE_CATALOG_KEY] = True
+
+
+quest_board_cache = QuestBoardCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_quest_board_invalidations(session):
+    """Apply invalidations staged during the committed transaction."""
+    stale_users = session.info.pop(_STALE_USERS_KEY, None)
+    stale_quests = session.info.pop(_STALE_QUESTS_KEY, None)
+    stale_catalog = session.info.pop(_STALE_CATALOG_KEY, False)
+
+    if stale_catalog:
+        quest_board_cache.invalidate_catalog()
+    elif stale_quests:
+        quest_board_cache.invalidate_quests(stale_quests)
+    if stale_users:
+        quest_board_cache.invalidate_users(stale_users)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_quest_board_invalidations(session):
+    """Drop invalidations staged by a rolled back transaction."""
+    for key in (_STALE_USERS_KEY, _STALE_QUESTS_KEY, _STALE_CATALOG_KEY):
+        session.info.pop(key, None)
@@ -0,0 +1,166 @@
+"""
+Bulk Quest Completion
+Completes one quest for many users with set-based statements, for event
+finales where thousands of players finish at once.
+
+Per batch of users this runs a locking select of the open progress rows, one
+UPDATE marking them completed, one executemany INSERT of QuestReward rows and
+one executemany UPDATE applying XP and level to users, plus a single ledger
+posting crediting every user's Pi. Bulk statements
+bypass ORM listeners, so the participation counters, stats rollup and quest
+boards are updated explicitly.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam
+
+from app.core.exceptions import ValidationError
+from app.extensions import db
+from app.services.ledger import REWARDS_ACCOUNT, ledger
+from app.services.quest_board import quest_board_cache
+from app.services.quest_participation import quest_participation
+from app.services.quest_stats import quest_stats
+
+logger = logging.getLogger(__name__)
+
+COMPLETION_BATCH_SIZE = 1000
+
+
+def complete_quest_for_users(quest_id: str, user_ids: Iterable[str],
+                             batch_size: int = COMPLETION_BATCH_SIZE,
+                             now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Complete a quest and grant its rewards for many users.
+
+    Users without an in-progress row for the quest are skipped. Each batch
+    commits on its own so a failure only rolls back that batch.
+
+    Args:
+        quest_id: Quest to complete
+        user_ids: Users to complete it for
+        batch_size: Users per transaction
+        now: Completion time
+
+    Returns:
+        Dict with per-user results (same shape as User.add_experience plus
+        pi_reward) and the list of skipped user IDs
+
+    Raises:
+        ValidationError: If the quest does not exist
+    """
+    from app.models.quest import Quest, QuestProgress, QuestReward
+    from app.models.user import User
+
+    quest = Quest.query.get(quest_id)
+    if not quest:
+        raise ValidationError("Quest not found")
+
+    now = now or datetime.utcnow()
+    multiplier = quest.difficulty_multiplier
+    xp_reward = int(quest.xp_reward * multiplier)
+    pi_reward = Decimal(str(quest.pi_reward)) * Decimal(str(multiplier))
+    # Snapshot reward columns; each batch commit expires the quest instance
+    base_rewards = {
+        'pi_amount': quest.pi_reward,
+        'xp_amount': quest.xp_reward,
+        'bonus_rewards': quest.bonus_rewards,
+        'difficulty_multiplier': multiplier
+    }
+    objective_target = quest.objective_target
+
+    user_ids = list(dict.fromkeys(user_ids))
+    results: Dict[str, Dict[str, Any]] = {}
+    skipped: List[str] = []
+
+    progress_table = QuestProgress.__table__
+    user_table = User.__table__
+    reward_insert = QuestReward.__table__.insert()
+    user_update = user_table.update().where(user_table.c.id == bindparam('b_id')).values(
+        experience_points=bindparam('b_xp'),
+        level=bindparam('b_level'),
+        updated_at=now
+    )
+
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        try:
+            progress_rows = db.session.query(
+                QuestProgress.id, QuestProgress.user_id, QuestProgress.started_at
+            ).filter(
+                QuestProgress.quest_id == quest_id,
+                QuestProgress.user_id.in_(batch),
+                QuestProgress.status == 'in_progress'
+            ).with_for_update().all()
+
+            completed_users = {row.user_id for row in progress_rows}
+            skipped.extend(user_id for user_id in batch if user_id not in completed_users)
+            if not progress_rows:
+                db.session.rollback()
+                continue
+
+            values = {'status': 'completed', 'completed_at': now, 'last_updated': now}
+            if objective_target:
+                values['progress_value'] = objective_target
+            db.session.execute(
+                progress_table.update().where(
+                    progress_table.c.id.in_([row.id for row in progress_rows])
+                ).values(**values)
+            )
+
+            db.session.execute(reward_insert, [{
+                'id': str(uuid.uuid4()),
+                'user_id': row.user_id,
+                'quest_id': quest_id,
+                'progress_id': row.id,
+                'awarded_at': now,
+                **base_rewards
+            } for row in progress_rows])
+
+            # Lock the users and compute levels from their current XP
+            users = db.session.query(
+                User.id, User.level, User.experience_points
+            ).filter(User.id.in_(completed_users)).order_by(User.id).with_for_update().all()
+
+            updates = []
+            credits = []
+            batch_results = {}
+            for user in users:
+                experience = user.experience_points + xp_reward
+                new_level = max(user.level, User._calculate_level_from_xp(experience))
+                level_rewards = User._calculate_level_rewards(user.level, new_level) if new_level > user.level else 0.0
+                updates.append({'b_id': user.id, 'b_xp': experience, 'b_level': new_level})
+                credits.append((user.id, pi_reward + Decimal(str(level_rewards))))
+                batch_results[user.id] = {
+                    'xp_gained': xp_reward,
+                    'levels_gained': new_level - user.level,
+                    'new_level': new_level,
+                    'level_rewards': float(level_rewards),
+                    'leveled_up': new_level > user.level,
+                    'pi_reward': float(pi_reward)
+                }
+            if updates:
+                db.session.execute(user_update, updates)
+                ledger.post(db.session, [(REWARDS_ACCOUNT, -sum(amount for _, amount in credits))] + credits,
+                            'quest_reward', reference_type='quest', reference_id=quest_id)
+
+            session = db.session()
+            quest_participation.record_completion(session, quest_id, len(progress_rows))
+            for row in progress_rows:
+                quest_stats.stage(session, 'completed', quest_id, now,
+                                  duration=(now - row.started_at).total_seconds())
+                quest_board_cache.mark_user_stale(session, row.user_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        results.update(batch_results)
+
+    logger.info("Bulk completed quest %s for %d users (%d skipped)",
+                quest_id, len(results), len(skipped))
+    return {'results': results, 'skipped': skipped}
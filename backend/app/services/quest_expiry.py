@@ -0,0 +1,169 @@
+"""
+Quest Expiry Sweeper
+Moves quests past expires_at into QuestStatus.EXPIRED with chunked set-based
+updates, closing their open progress rows in the same transaction.
+
+Runs on a schedule inside the app (QUEST_EXPIRY_INTERVAL) and on demand via
+`manage.py expire_quests`. A shared lock in the key-value store keeps
+concurrent worker processes from sweeping at once.
+
+Bulk UPDATEs bypass ORM events, so after each committed batch the sweeper
+updates this worker's prerequisite graph and search index, and bumps their
+shared versions so every other worker rebuilds on its next read. Cached
+quest boards are retired by rotating the shared catalog version.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.extensions import db
+from app.models.quest import Quest, QuestProgress, QuestStatus
+from app.services.quest_board import quest_board_cache
+from app.services.quest_graph import quest_graph
+from app.services.quest_search import quest_search_index
+from app.services.quest_stats import ALL_TIME, quest_stats
+from app.utils.kv_store import get_kv_store
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+SWEEP_INTERVAL = 60  # Seconds between scheduled runs
+LOCK_KEY = 'quest_expiry:lock'
+LOCK_TTL = 300  # Seconds; a crashed run releases the lock on its own
+
+
+def expire_quests(batch_size: int = SWEEP_BATCH_SIZE,
+                  now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Expire every active quest whose expires_at has passed.
+
+    Each batch selects up to batch_size ids through idx_quest_status_expiry,
+    updates the quests and their in-progress rows, commits and invalidates.
+
+    Returns:
+        Summary with quests expired, progress rows closed and batches run
+    """
+    now = now or datetime.utcnow()
+    started = time.monotonic()
+    summary = {'quests_expired': 0, 'progress_closed': 0, 'batches': 0}
+
+    while True:
+        quest_ids = [
+            row.id for row in Quest.query.with_entities(Quest.id).filter(
+                Quest.status == QuestStatus.ACTIVE,
+                Quest.expires_at <= now
+            ).order_by(Quest.expires_at).limit(batch_size)
+        ]
+        if not quest_ids:
+            break
+
+        try:
+            expired = Quest.query.filter(
+                Quest.id.in_(quest_ids),
+                Quest.status == QuestStatus.ACTIVE
+            ).update(
+                {Quest.status: QuestStatus.EXPIRED, Quest.updated_at: now},
+                synchronize_session=False
+            )
+            closed = QuestProgress.query.filter(
+                QuestProgress.quest_id.in_(quest_ids),
+                QuestProgress.status == 'in_progress'
+            ).update(
+                {QuestProgress.status: 'expired', QuestProgress.last_updated: now},
+                synchronize_session=False
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        summary['quests_expired'] += expired
+        summary['progress_closed'] += closed
+        summary['batches'] += 1
+        _invalidate_expired_quests(quest_ids)
+
+        if len(quest_ids) < batch_size:
+            break
+
+    summary['elapsed_ms'] = round((time.monotonic() - started) * 1000, 2)
+    if summary['quests_expired']:
+        logger.info(
+            "Expired %(quests_expired)d quests and closed %(progress_closed)d "
+            "progress rows in %(batches)d batches", summary
+        )
+    return summary
+
+
+def _invalidate_expired_quests(quest_ids: List[str]) -> None:
+    """Drop expired quests from the indexes of every worker, cached boards and category counts."""
+    for quest_id in quest_ids:
+        quest_graph.remove_quest(quest_id)
+        quest_search_index.set_status(quest_id, QuestStatus.EXPIRED.value)
+    quest_graph.publish()
+    quest_search_index.publish()
+    quest_board_cache.invalidate_catalog()
+
+    # Bulk updates skip the ORM listeners that keep category counts
+    quest_stats.record([
+        ('active_quests', row.id, ALL_TIME, {'category_id': row.category_id, 'delta': -1})
+        for row in Quest.query.with_entities(Quest.id, Quest.category_id).filter(
+            Quest.id.in_(quest_ids), Quest.category_id.isnot(None)
+        )
+    ])
+
+
+class QuestExpiryJob:
+    """Runs expire_quests periodically in a background thread."""
+
+    def __init__(self, interval: float = SWEEP_INTERVAL, batch_size: int = SWEEP_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the schedule unless TESTING or QUEST_EXPIRY_INTERVAL is 0."""
+        self._app = app
+        self.interval = app.config.get('QUEST_EXPIRY_INTERVAL', SWEEP_INTERVAL)
+        self.batch_size = app.config.get('QUEST_EXPIRY_BATCH_SIZE', SWEEP_BATCH_SIZE)
+        app.extensions['quest_expiry'] = self
+        if self._thread is None and self.interval and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='quest-expiry', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """Sweep now, unless another process holds the sweep lock."""
+        store = get_kv_store()
+        if not store.set_if_absent(LOCK_KEY, '1', ttl=LOCK_TTL):
+            return None
+        try:
+            self.last_run = expire_quests(batch_size=self.batch_size)
+        finally:
+            store.delete(LOCK_KEY)
+        return self.last_run
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Quest expiry job error: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+quest_expiry_job = QuestExpiryJob()
@@ -0,0 +1,300 @@
+"""
+Quest Prerequisite Graph
+In-memory DAG index over active quest prerequisites with transitive closure,
+topological ordering and cycle detection.
+
+Each worker keeps its own copy. Committed changes are applied locally and
+bump a version in the shared key-value store; other workers see the new
+version on their next read and rebuild from the database.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from app.core.exceptions import ValidationError
+from app.utils.kv_store import KeyValueStore, SharedVersion
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'quest_graph:version'
+
+
+class QuestGraph:
+    """
+    Prerequisite graph built from active quests.
+
+    Edges point from a quest to the quests it requires. The index keeps the
+    direct prerequisites, the reverse (dependent) edges and the transitive
+    closure per quest, so eligibility becomes a set comparison against the
+    user's completed quests. Updates only recompute the closure of the changed
+    quest and its dependents; the topological order is rebuilt lazily.
+    """
+
+    def __init__(self, store: Optional[KeyValueStore] = None):
+        self._lock = threading.RLock()
+        self._prerequisites: Dict[str, FrozenSet[str]] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._closure: Dict[str, FrozenSet[str]] = {}
+        self._order: Optional[List[str]] = None
+        self._built = False
+        self._shared = SharedVersion(VERSION_KEY, store=store)
+        self._version = 0  # Shared version the local copy reflects
+
+    # --- Construction ---
+
+    def build(self, edges: Dict[str, Iterable[str]]) -> None:
+        """
+        Replace the graph with the given quest -> prerequisites mapping.
+
+        Raises:
+            ValidationError: If the prerequisites contain a cycle
+        """
+        prerequisites = {quest_id: frozenset(prereqs or ()) for quest_id, prereqs in edges.items()}
+        dependents: Dict[str, Set[str]] = {}
+        for quest_id, prereqs in prerequisites.items():
+            for prereq_id in prereqs:
+                dependents.setdefault(prereq_id, set()).add(quest_id)
+
+        order = self._topological_sort(prerequisites)
+        closure: Dict[str, FrozenSet[str]] = {}
+        for quest_id in order:
+            reachable = set()
+            for prereq_id in prerequisites.get(quest_id, ()):
+                reachable.add(prereq_id)
+                reachable.update(closure.get(prereq_id, ()))
+            closure[quest_id] = frozenset(reachable)
+
+        with self._lock:
+            self._prerequisites = prerequisites
+            self._dependents = dependents
+            self._closure = closure
+            self._order = order
+            self._built = True
+
+    @staticmethod
+    def _load_edges() -> Dict[str, List[str]]:
+        from app.models.quest import Quest, QuestStatus
+
+        rows = Quest.query.with_entities(Quest.id, Quest.prerequisites).filter(
+            Quest.status == QuestStatus.ACTIVE
+        ).all()
+        return {row.id: row.prerequisites or [] for row in rows}
+
+    def rebuild(self) -> None:
+        """Rebuild the graph from all active quests in the database."""
+        # Read first: a change committed during the load bumps past it
+        version = self._shared.get(refresh=True)
+        edges = self._load_edges()
+        with self._lock:
+            self.build(edges)
+            self._version = version
+        logger.info("Quest prerequisite graph rebuilt with %d quests", len(edges))
+
+    def _current(self) -> bool:
+        return self._built and self._shared.get() == self._version
+
+    def ensure_built(self) -> None:
+        """Build the graph on first use, and rebuild it after another worker's change."""
+        if not self._current():
+            with self._lock:
+                if not self._current():
+                    self.rebuild()
+
+    def invalidate(self) -> None:
+        """Mark the graph stale so the next reader rebuilds it from the database."""
+        with self._lock:
+            self._built = False
+
+    def publish(self) -> None:
+        """
+        Tell other workers about a committed change. Call after applying the
+        change locally; the local copy stays current unless another worker
+        changed the graph in between.
+        """
+        try:
+            version = self._shared.bump()
+        except Exception as e:
+            logger.error(f"Failed to publish quest graph change: {str(e)}")
+            return
+        with self._lock:
+            if version == self._version + 1:
+                self._version = version
+
+    # --- Incremental maintenance ---
+
+    def validate(self, quest_id: str, prerequisites: Iterable[str]) -> None:
+        """
+        Check that giving quest_id these prerequisites keeps the graph acyclic.
+
+        Raises:
+            ValidationError: If the change would introduce a cycle
+        """
+        prereqs = set(prerequisites or ())
+        if quest_id in prereqs:
+            raise ValidationError("Quest cannot be its own prerequisite")
+
+        with self._lock:
+            for prereq_id in prereqs:
+                if quest_id in self._closure.get(prereq_id, ()):
+                    raise ValidationError(
+                        f"Prerequisite {prereq_id} already depends on quest {quest_id}"
+                    )
+
+    def validate_changes(self, changes: Dict[str, Optional[Iterable[str]]]) -> None:
+        """
+        Check a batch of pending changes against the current graph.
+
+        Args:
+            changes: Mapping of quest_id to its new prerequisites, or None for
+                quests leaving the active set
+
+        Raises:
+            ValidationError: If the combined changes would introduce a cycle
+        """
+        if len(changes) == 1:
+            quest_id, prerequisites = next(iter(changes.items()))
+            if prerequisites is not None:
+                self.validate(quest_id, prerequisites)
+            return
+
+        with self._lock:
+            candidate = dict(self._prerequisites)
+        for quest_id, prerequisites in changes.items():
+            if prerequisites is None:
+                candidate.pop(quest_id, None)
+            else:
+                candidate[quest_id] = frozenset(prerequisites)
+        self._topological_sort(candidate)
+
+    def update_quest(self, quest_id: str, prerequisites: Iterable[str], active: bool = True) -> None:
+        """
+        Insert, update or remove a single quest.
+
+        Inactive quests are dropped from the index; their dependents keep the
+        edge so an unfinished prerequisite still blocks them.
+        """
+        with self._lock:
+            if active:
+                new_prereqs = frozenset(prerequisites or ())
+                self.validate(quest_id, new_prereqs)
+            else:
+                new_prereqs = None
+
+            for prereq_id in self._prerequisites.get(quest_id, ()):
+                self._dependents.get(prereq_id, set()).discard(quest_id)
+
+            if new_prereqs is None:
+                self._prerequisites.pop(quest_id, None)
+                self._closure.pop(quest_id, None)
+            else:
+                self._prerequisites[quest_id] = new_prereqs
+                for prereq_id in new_prereqs:
+                    self._dependents.setdefault(prereq_id, set()).add(quest_id)
+
+            self._refresh_closure(quest_id)
+            self._order = None
+
+    def remove_quest(self, quest_id: str) -> None:
+        """Remove a quest from the index."""
+        self.update_quest(quest_id, (), active=False)
+
+    def _refresh_closure(self, quest_id: str) -> None:
+        """Recompute the closure of quest_id and everything downstream of it."""
+        affected = [quest_id]
+        seen = {quest_id}
+        queue = deque([quest_id])
+        while queue:
+            current = queue.popleft()
+            for dependent in self._dependents.get(current, ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    affected.append(dependent)
+                    queue.append(dependent)
+
+        # Process in dependency order so each closure builds on fresh values
+        for current in self._topological_sort({q: self._prerequisites.get(q, frozenset()) for q in affected}):
+            if current not in self._prerequisites:
+                continue
+            reachable = set()
+            for prereq_id in self._prerequisites[current]:
+                reachable.add(prereq_id)
+                reachable.update(self._closure.get(prereq_id, ()))
+            self._closure[current] = frozenset(reachable)
+
+    @staticmethod
+    def _topological_sort(prerequisites: Dict[str, FrozenSet[str]]) -> List[str]:
+        """Kahn's algorithm over the given nodes, prerequisites first."""
+        in_degree = {
+            quest_id: sum(1 for prereq_id in prereqs if prereq_id in prerequisites)
+            for quest_id, prereqs in prerequisites.items()
+        }
+        dependents: Dict[str, List[str]] = {}
+        for quest_id, prereqs in prerequisites.items():
+            for prereq_id in prereqs:
+                if prereq_id in prerequisites:
+                    dependents.setdefault(prereq_id, []).append(quest_id)
+
+        queue = deque(sorted(q for q, degree in in_degree.items() if degree == 0))
+        order = []
+        while queue:
+            quest_id = queue.popleft()
+            order.append(quest_id)
+            for dependent in dependents.get(quest_id, ()):
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    queue.append(dependent)
+
+        if len(order) != len(prerequisites):
+            cyclic = sorted(q for q, degree in in_degree.items() if degree > 0)
+            raise ValidationError(f"Quest prerequisites contain a cycle: {', '.join(cyclic)}")
+        return order
+
+    # --- Queries ---
+
+    def __contains__(self, quest_id: str) -> bool:
+        return quest_id in self._prerequisites
+
+    def prerequisites_of(self, quest_id: str) -> FrozenSet[str]:
+        """Direct prerequisites of a quest."""
+        return self._prerequisites.get(quest_id, frozenset())
+
+    def all_prerequisites(self, quest_id: str) -> FrozenSet[str]:
+        """Transitive prerequisites of a quest."""
+        return self._closure.get(quest_id, frozenset())
+
+    def missing_prerequisites(self, quest_id: str, completed: Set[str]) -> FrozenSet[str]:
+        """Direct prerequisites the user has not completed yet."""
+        return self.prerequisites_of(quest_id) - completed
+
+    def prerequisites_met(self, quest_id: str, completed: Set[str]) -> bool:
+        """Check prerequisites with a single subset test."""
+        return self.prerequisites_of(quest_id) <= completed
+
+    def unlocked_by(self, quest_id: str, completed: Set[str]) -> List[str]:
+        """
+        Quests that become startable once quest_id is completed.
+
+        Args:
+            quest_id: Quest about to be completed
+            completed: IDs of quests the user has already completed
+        """
+        with self._lock:
+            after = set(completed) | {quest_id}
+            return sorted(
+                dependent for dependent in self._dependents.get(quest_id, ())
+                if dependent in self._prerequisites
+                and dependent not in completed
+                and self._prerequisites[dependent] <= after
+            )
+
+    def topological_order(self) -> List[str]:
+        """Active quests ordered so prerequisites come first."""
+        with self._lock:
+            if self._order is None:
+                self._order = self._topological_sort(self._prerequisites)
+            return list(self._order)
+
+
+quest_graph = QuestGraph()
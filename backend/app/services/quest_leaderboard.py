@@ -0,0 +1,207 @@
+"""
+Quest Leaderboard Store
+Incrementally maintained quest completion leaderboards with daily, weekly,
+monthly and all-time buckets held in sorted sets.
+
+Each completion adds to the current bucket of every period, so reads are a
+top-K range or rank lookup (O(log n) in Redis) and rollover is just a new
+bucket key; old buckets expire on their own.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.utils.kv_store import KeyValueStore, get_kv_store
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('daily', 'weekly', 'monthly', 'all-time')
+
+# Scores pack (completions, xp) so one sorted set orders by completions then XP
+XP_SCALE = 10 ** 10
+
+_BUCKET_TTL = {
+    'daily': int(timedelta(days=2).total_seconds()),
+    'weekly': int(timedelta(days=15).total_seconds()),
+    'monthly': int(timedelta(days=62).total_seconds()),
+    'all-time': None,
+}
+
+_STAGED_KEY = 'quest_leaderboard_completions'
+
+
+class QuestLeaderboard:
+    """Sorted-set backed quest leaderboard."""
+
+    def __init__(self, store: Optional[KeyValueStore] = None):
+        self._store = store
+
+    @property
+    def store(self) -> KeyValueStore:
+        return self._store or get_kv_store()
+
+    @staticmethod
+    def bucket_key(period: str, when: datetime) -> str:
+        """Sorted set key holding the given period's bucket at `when`."""
+        if period == 'daily':
+            suffix = f"{when:%Y%m%d}"
+        elif period == 'weekly':
+            iso_year, iso_week, _ = when.isocalendar()
+            suffix = f"{iso_year}W{iso_week:02d}"
+        elif period == 'monthly':
+            suffix = f"{when:%Y%m}"
+        else:
+            return 'leaderboard:quests:all-time'
+        return f"leaderboard:quests:{period}:{suffix}"
+
+    @staticmethod
+    def _profile_key(user_id: str) -> str:
+        return f"leaderboard:profile:{user_id}"
+
+    def record_completion(self, user_id: str, xp: int, pi: float,
+                          profile: Dict[str, Any], when: Optional[datetime] = None) -> None:
+        """Add one quest completion to every period's current bucket."""
+        when = when or datetime.utcnow()
+        store = self.store
+        for period in PERIODS:
+            key = self.bucket_key(period, when)
+            store.zincrby(key, user_id, XP_SCALE + int(xp))
+            store.zincrby(f"{key}:pi", user_id, float(pi))
+            ttl = _BUCKET_TTL[period]
+            if ttl:
+                store.expire(key, ttl)
+                store.expire(f"{key}:pi", ttl)
+        store.set(self._profile_key(user_id), json.dumps(profile))
+
+    def _entries(self, key: str, ranked: List[tuple], start_rank: int) -> List[Dict[str, Any]]:
+        store = self.store
+        user_ids = [user_id for user_id, _ in ranked]
+        pi_scores = store.zscores(f"{key}:pi", user_ids)
+        profiles = store.get_many([self._profile_key(user_id) for user_id in user_ids])
+
+        entries = []
+        for offset, ((user_id, score), pi, profile) in enumerate(zip(ranked, pi_scores, profiles)):
+            profile = json.loads(profile) if profile else {}
+            entries.append({
+                'rank': start_rank + offset,
+                'user_id': user_id,
+                'username': profile.get('username'),
+                'display_name': profile.get('display_name'),
+                'level': profile.get('level'),
+                'quests_completed': int(score // XP_SCALE),
+                'total_xp_earned': float(score % XP_SCALE),
+                'total_pi_earned': float(pi or 0)
+            })
+        return entries
+
+    def top(self, period: str, limit: int = 50,
+            now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Top entries for the period's current bucket."""
+        key = self.bucket_key(period, now or datetime.utcnow())
+        return self._entries(key, self.store.ztop(key, limit), 1)
+
+    def rank(self, period: str, user_id: str,
+             now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """A single user's leaderboard entry, or None if they have no completions."""
+        key = self.bucket_key(period, now or datetime.utcnow())
+        position = self.store.zrank(key, user_id)
+        if position is None:
+            return None
+        score = self.store.zscores(key, [user_id])[0]
+        return self._entries(key, [(user_id, score)], position + 1)[0]
+
+    def rebuild(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Recompute the current buckets from user_quests.
+
+        Only needed to backfill or recover after a store outage; normal
+        operation is incremental.
+
+        Returns:
+            Number of users written per period
+        """
+        from app.extensions import db
+        from app.models.quest import Quest
+        from app.models.user import User
+        from app.models.user_quest import UserQuest, QuestStatus
+
+        now = now or datetime.utcnow()
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        starts = {
+            'daily': day_start,
+            'weekly': day_start - timedelta(days=day_start.weekday()),
+            'monthly': day_start.replace(day=1),
+            'all-time': None,
+        }
+
+        store = self.store
+        written = {}
+        for period, start in starts.items():
+            key = self.bucket_key(period, now)
+            store.delete(key, f"{key}:pi")
+
+            query = db.session.query(
+                User.id, User.username, User.display_name, User.level,
+                func.count(UserQuest.id).label('quests_completed'),
+                func.sum(Quest.xp_reward).label('total_xp_earned'),
+                func.sum(Quest.pi_reward).label('total_pi_earned')
+            ).join(
+                UserQuest, User.id == UserQuest.user_id
+            ).join(
+                Quest, UserQuest.quest_id == Quest.id
+            ).filter(
+                UserQuest.status == QuestStatus.COMPLETED
+            ).group_by(User.id, User.username, User.display_name, User.level)
+            if start is not None:
+                query = query.filter(UserQuest.completed_at >= start)
+
+            count = 0
+            for row in query:
+                store.zincrby(key, row.id, row.quests_completed * XP_SCALE + int(row.total_xp_earned or 0))
+                store.zincrby(f"{key}:pi", row.id, float(row.total_pi_earned or 0))
+                store.set(self._profile_key(row.id), json.dumps({
+                    'username': row.username,
+                    'display_name': row.display_name,
+                    'level': row.level
+                }))
+                count += 1
+
+            ttl = _BUCKET_TTL[period]
+            if ttl:
+                store.expire(key, ttl)
+                store.expire(f"{key}:pi", ttl)
+            written[period] = count
+
+        logger.info("Rebuilt quest leaderboards: %s", written)
+        return written
+
+    # --- Commit-time staging ---
+
+    @staticmethod
+    def stage_completion(session: Optional[Session], **completion) -> None:
+        """Record a completion once the current transaction commits."""
+        if session is not None:
+            session.info.setdefault(_STAGED_KEY, []).append(completion)
+
+
+quest_leaderboard = QuestLeaderboard()
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_leaderboard_completions(session):
+    """Publish completions from the committed transaction to the leaderboard."""
+    for completion in session.info.pop(_STAGED_KEY, None) or ():
+        try:
+            quest_leaderboard.record_completion(**completion)
+        except Exception as e:
+            logger.error(f"Failed to record leaderboard completion: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_leaderboard_completions(session):
+    session.info.pop(_STAGED_KEY, None)
@@ -0,0 +1,138 @@
+"""
+Quest Start Limits
+Per-user daily and weekly quest start counters kept in the shared key-value
+store, so limit checks never scan the user_quests table.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import case, func
+
+from app.utils.kv_store import KeyValueStore, get_kv_store
+
+logger = logging.getLogger(__name__)
+
+# Counters outlive their window slightly so late reads near a boundary still hit
+_DAY_TTL = int(timedelta(days=2).total_seconds())
+_WEEK_TTL = int(timedelta(days=8).total_seconds())
+
+
+class QuestLimitCounter:
+    """
+    Daily and weekly quest start counters.
+
+    Counters are bucketed by UTC calendar day and ISO week, so they reset on
+    day and week boundaries simply by moving to a new key. Starts reserve a
+    slot atomically and release it if the start is not committed.
+    """
+
+    def __init__(self, daily_limit: int, weekly_limit: int, store: Optional[KeyValueStore] = None):
+        self.daily_limit = daily_limit
+        self.weekly_limit = weekly_limit
+        self._store = store
+
+    @property
+    def store(self) -> KeyValueStore:
+        return self._store or get_kv_store()
+
+    @staticmethod
+    def _keys(user_id: str, when: datetime) -> Tuple[str, str]:
+        iso_year, iso_week, _ = when.isocalendar()
+        return (
+            f"quest_limits:daily:{user_id}:{when:%Y%m%d}",
+            f"quest_limits:weekly:{user_id}:{iso_year}W{iso_week:02d}",
+        )
+
+    @staticmethod
+    def _window_starts(when: datetime) -> Tuple[datetime, datetime]:
+        day_start = when.replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = day_start - timedelta(days=day_start.weekday())
+        return day_start, week_start
+
+    def counts(self, user_id: str, now: Optional[datetime] = None) -> Tuple[int, int]:
+        """Return (daily, weekly) quest starts for the user."""
+        daily, weekly = self.store.get_many(self._keys(user_id, now or datetime.utcnow()))
+        return int(daily or 0), int(weekly or 0)
+
+    def try_acquire(self, user_id: str, now: Optional[datetime] = None) -> Tuple[bool, str]:
+        """
+        Reserve one quest start for the user.
+
+        Returns:
+            Tuple of (allowed, message)
+        """
+        now = now or datetime.utcnow()
+        daily_key, weekly_key = self._keys(user_id, now)
+        store = self.store
+
+        daily = store.incr(daily_key, ttl=_DAY_TTL)
+        if daily > self.daily_limit:
+            store.incr_existing(daily_key, -1)
+            return False, f"Daily quest limit reached ({self.daily_limit})"
+
+        weekly = store.incr(weekly_key, ttl=_WEEK_TTL)
+        if weekly > self.weekly_limit:
+            store.incr_existing(weekly_key, -1)
+            store.incr_existing(daily_key, -1)
+            return False, f"Weekly quest limit reached ({self.weekly_limit})"
+
+        return True, "OK"
+
+    def release(self, user_id: str, acquired_at: datetime) -> None:
+        """Give back a slot reserved by try_acquire whose start was not committed."""
+        daily_key, weekly_key = self._keys(user_id, acquired_at)
+        # An expired counter has nothing to give back; recreating it at -1 would grant a start
+        self.store.incr_existing(daily_key, -1)
+        self.store.incr_existing(weekly_key, -1)
+
+    def reconcile(self, user_ids: Optional[Iterable[str]] = None,
+                  now: Optional[datetime] = None) -> int:
+        """
+        Rebuild counters from the user_quests table, e.g. after a store outage.
+
+        Uses range predicates on started_at so the scan stays on the index.
+
+        Args:
+            user_ids: Limit the rebuild to these users; defaults to everyone
+                who started a quest this week
+
+        Returns:
+            Number of users whose counters were rewritten
+        """
+        from app.extensions import db
+        from app.models.user_quest import UserQuest
+
+        now = now or datetime.utcnow()
+        day_start, week_start = self._window_starts(now)
+
+        query = db.session.query(
+            UserQuest.user_id,
+            func.count(UserQuest.id).label('weekly'),
+            func.sum(
+                case((UserQuest.started_at >= day_start, 1), else_=0)
+            ).label('daily')
+        ).filter(
+            UserQuest.started_at >= week_start,
+            UserQuest.started_at <= now
+        ).group_by(UserQuest.user_id)
+
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            query = query.filter(UserQuest.user_id.in_(user_ids))
+
+        store = self.store
+        seen = set()
+        for row in query:
+            daily_key, weekly_key = self._keys(row.user_id, now)
+            store.set(daily_key, int(row.daily or 0), ttl=_DAY_TTL)
+            store.set(weekly_key, int(row.weekly), ttl=_WEEK_TTL)
+            seen.add(row.user_id)
+
+        # Explicitly requested users with no starts this week get zeroed counters
+        for user_id in set(user_ids or ()) - seen:
+            store.delete(*self._keys(user_id, now))
+
+        logger.info("Reconciled quest limit counters for %d users", len(seen))
+        return len(seen)
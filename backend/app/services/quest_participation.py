@@ -0,0 +1,254 @@
+"""
+Quest Participation Counters
+Exact max_participants enforcement and sharded participation counters.
+
+Limited quests keep their remaining slots in one shared counter that is
+reserved with an atomic decrement and given back when the decrement went
+below zero or the starting transaction rolls back. Committed starts and
+completions are spread over sharded counters and periodically folded into
+quests.total_participants / total_completions with one batched UPDATE, so
+starts never contend on the quest row.
+
+The fold runs in the background every QUEST_PARTICIPATION_FLUSH_INTERVAL
+seconds. The counters are shared by every worker, so a lock in the
+key-value store lets one process fold at a time.
+"""
+
+import atexit
+import logging
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.utils.kv_store import KeyValueStore, get_kv_store
+
+logger = logging.getLogger(__name__)
+
+SHARD_COUNT = 16
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL = 5.0  # Seconds between background flushes
+LOCK_KEY = 'quest_participation:flush_lock'
+LOCK_TTL = 60  # Seconds; a crashed flusher releases the lock on its own
+
+_DIRTY_KEY = 'quest_participation:dirty'
+_FIELDS = ('started', 'completed')
+_STAGED_KEY = 'quest_participation_changes'
+
+
+class QuestParticipation:
+    """Slot reservations and sharded participation counters."""
+
+    def __init__(self, shards: int = SHARD_COUNT, store: Optional[KeyValueStore] = None,
+                 interval: float = FLUSH_INTERVAL):
+        self.shards = shards
+        self.interval = interval
+        self._store = store
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the background flusher unless TESTING or QUEST_PARTICIPATION_FLUSH_INTERVAL is 0."""
+        self._app = app
+        self.interval = app.config.get('QUEST_PARTICIPATION_FLUSH_INTERVAL', FLUSH_INTERVAL)
+        app.extensions['quest_participation'] = self
+        if self._thread is None and self.interval and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='quest-participation', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    @property
+    def store(self) -> KeyValueStore:
+        return self._store or get_kv_store()
+
+    @staticmethod
+    def _slots_key(quest_id: str, max_participants: int) -> str:
+        # Keyed by the limit so changing max_participants starts a fresh counter
+        return f"quest_participation:slots:{quest_id}:{max_participants}"
+
+    def _shard_keys(self, quest_id: str, field: str) -> List[str]:
+        return [f"quest_participation:{field}:{quest_id}:{shard}" for shard in range(self.shards)]
+
+    def pending(self, quest_id: str, field: str = 'started') -> int:
+        """Counted but not yet flushed starts or completions."""
+        return sum(int(value) for value in self.store.get_many(self._shard_keys(quest_id, field)) if value)
+
+    def remaining(self, quest) -> Optional[int]:
+        """Remaining slots for a limited quest, or None if unlimited."""
+        if not quest.max_participants:
+            return None
+        return max(int(self.store.get(self._ensure_slots(quest))), 0)
+
+    def _ensure_slots(self, quest) -> str:
+        key = self._slots_key(quest.id, quest.max_participants)
+        if self.store.get(key) is None:
+            taken = (quest.total_participants or 0) + self.pending(quest.id)
+            self.store.set_if_absent(key, max(quest.max_participants - taken, 0))
+        return key
+
+    # --- Reservations ---
+
+    def reserve(self, session: Optional[Session], quest) -> bool:
+        """
+        Reserve a participation slot for one start.
+
+        The start is counted when the session commits; on rollback a reserved
+        slot is returned.
+
+        Returns:
+            False if a limited quest has no slots left
+        """
+        slots_key = None
+        if quest.max_participants:
+            slots_key = self._ensure_slots(quest)
+            if self.store.incr(slots_key, -1) < 0:
+                self.store.incr(slots_key, 1)
+                return False
+        self._stage(session, ('started', quest.id, slots_key, 1))
+        return True
+
+    def record_completion(self, session: Optional[Session], quest_id: str, count: int = 1) -> None:
+        """Count completions once the session commits."""
+        self._stage(session, ('completed', quest_id, None, count))
+
+    def _stage(self, session: Optional[Session], change: Tuple[str, str, Optional[str], int]) -> None:
+        if session is None:
+            self._apply([change])
+        else:
+            session.info.setdefault(_STAGED_KEY, []).append(change)
+
+    def _apply(self, changes: List[Tuple[str, str, Optional[str], int]]) -> None:
+        store = self.store
+        for field, quest_id, _, amount in changes:
+            shard = random.randrange(self.shards)
+            store.incr(f"quest_participation:{field}:{quest_id}:{shard}", amount)
+            store.zincrby(_DIRTY_KEY, quest_id, 1)
+
+    def _release(self, changes: List[Tuple[str, str, Optional[str], int]]) -> None:
+        for _, _, slots_key, _ in changes:
+            if slots_key:
+                self.store.incr(slots_key, 1)
+
+    # --- Flushing ---
+
+    def _drain(self, quest_id: str, field: str) -> int:
+        """Take the current shard totals, leaving concurrent increments in place."""
+        store = self.store
+        keys = self._shard_keys(quest_id, field)
+        total = 0
+        for key, value in zip(keys, store.get_many(keys)):
+            amount = int(value) if value else 0
+            if amount:
+                store.incr(key, -amount)
+                total += amount
+        return total
+
+    def flush(self) -> int:
+        """
+        Fold pending counts into quests.total_participants/total_completions.
+
+        Returns:
+            Number of quests updated
+        """
+        from app.extensions import db
+        from app.models.quest import Quest
+
+        store = self.store
+        quest_ids = [quest_id for quest_id, _ in store.ztop(_DIRTY_KEY, store.zcard(_DIRTY_KEY))]
+        if not quest_ids:
+            return 0
+        # Clear the marks first so increments racing the drain mark again
+        store.zrem(_DIRTY_KEY, *quest_ids)
+
+        rows: List[Dict[str, int]] = []
+        for quest_id in quest_ids:
+            started = self._drain(quest_id, 'started')
+            completed = self._drain(quest_id, 'completed')
+            if started or completed:
+                rows.append({'b_id': quest_id, 'b_started': started, 'b_completed': completed})
+        if not rows:
+            return 0
+
+        table = Quest.__table__
+        stmt = table.update().where(table.c.id == bindparam('b_id')).values(
+            total_participants=table.c.total_participants + bindparam('b_started'),
+            total_completions=table.c.total_completions + bindparam('b_completed')
+        )
+        try:
+            for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                db.session.execute(stmt, rows[start:start + FLUSH_BATCH_SIZE])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for row in rows:
+                self._restore(row['b_id'], row['b_started'], row['b_completed'])
+            logger.error(f"Failed to flush participation counts for {len(rows)} quests: {str(e)}")
+            return 0
+
+        return len(rows)
+
+    def _restore(self, quest_id: str, started: int, completed: int) -> None:
+        store = self.store
+        for field, amount in zip(_FIELDS, (started, completed)):
+            if amount:
+                store.incr(self._shard_keys(quest_id, field)[0], amount)
+        store.zincrby(_DIRTY_KEY, quest_id, 1)
+
+    def run_once(self) -> Optional[int]:
+        """Flush now, unless another process holds the flush lock."""
+        store = self.store
+        if not store.set_if_absent(LOCK_KEY, '1', ttl=LOCK_TTL):
+            return None
+        try:
+            return self.flush()
+        finally:
+            store.delete(LOCK_KEY)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._flush_in_context()
+
+    def _flush_in_context(self) -> None:
+        from app.extensions import db
+
+        with self._app.app_context():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Quest participation flusher error: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def stop(self) -> None:
+        """Stop the background flusher and fold what is pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+            self._flush_in_context()
+
+
+quest_participation = QuestParticipation()
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_participation_changes(session):
+    """Count starts and completions from the committed transaction."""
+    changes = session.info.pop(_STAGED_KEY, None)
+    if changes:
+        try:
+            quest_participation._apply(changes)
+        except Exception as e:
+            logger.error(f"Failed to record quest participation: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def release_participation_reservations(session):
+    """Return slots reserved by a rolled back transaction."""
+    changes = session.info.pop(_STAGED_KEY, None)
+    if changes:
+        quest_participation._release(changes)
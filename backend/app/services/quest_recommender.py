@@ -0,0 +1,229 @@
+"""
+Quest Recommendation Scorer
+Ranks the active quest catalog for a user with vectorized NumPy scoring.
+
+The catalog is held as column arrays per worker and rebuilt when the quest
+board catalog version rotates or the snapshot ages out, so a request costs
+one small history query plus a handful of array operations. The best
+candidates are then checked with Quest.check_eligibility, a few times the
+requested count at a time, so quests the user cannot start (prerequisites
+unmet, no free slots) are replaced by the next best.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.extensions import db
+from app.services.quest_board import quest_board_cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_TTL = 300  # Seconds before counters and rewards are re-read
+DEFAULT_DURATION = 30.0  # Minutes assumed when estimated_duration is unset
+LEVEL_SCALE = 5.0  # Level gap at which level fit decays to 1/e
+PI_XP_WEIGHT = 100.0  # XP-equivalent value of 1 Pi when comparing rewards
+OVERFETCH = 3  # Candidates checked per eligibility round, as a multiple of the limit
+
+# Relative weight of each signal in the final score
+WEIGHTS = {
+    'level_fit': 0.30,
+    'difficulty_fit': 0.15,
+    'completion_rate': 0.15,
+    'affinity': 0.25,
+    'reward_rate': 0.15,
+}
+
+
+class QuestCatalogMatrix:
+    """Column arrays for the active quest catalog."""
+
+    def __init__(self, quest_ids: List[str], level_required: np.ndarray,
+                 difficulty_multiplier: np.ndarray, completion_rate: np.ndarray,
+                 duration: np.ndarray, reward: np.ndarray, category_index: np.ndarray,
+                 categories: Dict[Optional[int], int], version: str):
+        self.quest_ids = quest_ids
+        self.positions = {quest_id: i for i, quest_id in enumerate(quest_ids)}
+        self.level_required = level_required
+        self.difficulty_multiplier = difficulty_multiplier
+        self.completion_rate = completion_rate
+        self.category_index = category_index
+        self.categories = categories
+        self.version = version
+        self.built_at = time.monotonic()
+
+        # Reward per minute on a log scale, normalised to [0, 1]
+        reward_rate = np.log1p(reward * difficulty_multiplier / duration)
+        peak = reward_rate.max() if len(reward_rate) else 0.0
+        self.reward_rate = reward_rate / peak if peak > 0 else reward_rate
+
+    def __len__(self) -> int:
+        return len(self.quest_ids)
+
+    @classmethod
+    def load(cls, version: str) -> 'QuestCatalogMatrix':
+        """Read the active catalog in one column-only query."""
+        from app.models.quest import DIFFICULTY_MULTIPLIERS, Quest
+
+        rows = Quest.query.with_entities(
+            Quest.id, Quest.level_required, Quest.difficulty, Quest.total_participants,
+            Quest.total_completions, Quest.estimated_duration, Quest.xp_reward,
+            Quest.pi_reward, Quest.category_id
+        ).filter(Quest.is_active).all()
+
+        categories: Dict[Optional[int], int] = {}
+        for row in rows:
+            categories.setdefault(row.category_id, len(categories))
+
+        participants = np.fromiter((row.total_participants or 0 for row in rows), np.float64, len(rows))
+        completions = np.fromiter((row.total_completions or 0 for row in rows), np.float64, len(rows))
+        completion_rate = np.divide(completions, participants,
+                                    out=np.zeros_like(completions), where=participants > 0)
+
+        return cls(
+            quest_ids=[row.id for row in rows],
+            level_required=np.fromiter((row.level_required for row in rows), np.float64, len(rows)),
+            difficulty_multiplier=np.fromiter(
+                (DIFFICULTY_MULTIPLIERS.get(row.difficulty, 1.0) for row in rows), np.float64, len(rows)
+            ),
+            completion_rate=completion_rate,
+            duration=np.fromiter(
+                (max(row.estimated_duration or DEFAULT_DURATION, 1) for row in rows), np.float64, len(rows)
+            ),
+            reward=np.fromiter(
+                (row.xp_reward + float(row.pi_reward or 0) * PI_XP_WEIGHT for row in rows),
+                np.float64, len(rows)
+            ),
+            category_index=np.fromiter((categories[row.category_id] for row in rows), np.int64, len(rows)),
+            categories=categories,
+            version=version
+        )
+
+
+class QuestRecommender:
+    """Scores the active catalog against a user's level and quest history."""
+
+    def __init__(self, ttl: int = CATALOG_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._matrix: Optional[QuestCatalogMatrix] = None
+
+    def catalog(self) -> QuestCatalogMatrix:
+        """Current catalog matrix, reloading it when stale."""
+        version = quest_board_cache.catalog_version()
+        matrix = self._matrix
+        if matrix is None or matrix.version != version or time.monotonic() - matrix.built_at > self.ttl:
+            with self._lock:
+                matrix = self._matrix
+                if matrix is None or matrix.version != version or time.monotonic() - matrix.built_at > self.ttl:
+                    started = time.monotonic()
+                    matrix = QuestCatalogMatrix.load(version)
+                    self._matrix = matrix
+                    logger.info("Loaded %d active quests for recommendations in %.1fms",
+                                len(matrix), (time.monotonic() - started) * 1000)
+        return matrix
+
+    def invalidate(self) -> None:
+        self._matrix = None
+
+    @staticmethod
+    def _history(user_id: str) -> List[Tuple[str, Optional[int], object, str]]:
+        """(quest_id, category_id, difficulty, status) for each of the user's progress rows."""
+        from app.models.quest import Quest, QuestProgress
+
+        return db.session.query(
+            QuestProgress.quest_id, Quest.category_id, Quest.difficulty, QuestProgress.status
+        ).join(Quest, QuestProgress.quest_id == Quest.id).filter(
+            QuestProgress.user_id == user_id
+        ).all()
+
+    def score(self, matrix: QuestCatalogMatrix, user_level: int,
+              history: List[Tuple[str, Optional[int], object, str]]) -> np.ndarray:
+        """
+        Score every quest in the catalog for one user.
+
+        Args:
+            matrix: Active catalog
+            user_level: The user's current level
+            history: (quest_id, category_id, difficulty, status) per QuestProgress row
+
+        Returns:
+            Score array aligned with matrix.quest_ids; -inf marks quests
+            above the user's level or already started. The remaining
+            eligibility rules are checked by recommend().
+        """
+        from app.models.quest import DIFFICULTY_MULTIPLIERS
+
+        # Category affinity relative to the user's most played category
+        affinity = np.zeros(len(matrix.categories), dtype=np.float64)
+        started = np.zeros(len(matrix), dtype=bool)
+        completed_multipliers = []
+        for quest_id, category_id, difficulty, status in history:
+            category = matrix.categories.get(category_id)
+            if category is not None:
+                affinity[category] += 2.0 if status == 'completed' else 1.0
+            position = matrix.positions.get(quest_id)
+            if position is not None:
+                started[position] = True
+            if status == 'completed':
+                completed_multipliers.append(DIFFICULTY_MULTIPLIERS.get(difficulty, 1.0))
+        if affinity.sum() > 0:
+            affinity /= affinity.max()
+
+        preferred_multiplier = float(np.mean(completed_multipliers)) if completed_multipliers else 1.0
+
+        level_fit = np.exp(-np.abs(user_level - matrix.level_required) / LEVEL_SCALE)
+        difficulty_fit = np.exp(-np.abs(matrix.difficulty_multiplier - preferred_multiplier))
+
+        scores = (
+            WEIGHTS['level_fit'] * level_fit
+            + WEIGHTS['difficulty_fit'] * difficulty_fit
+            + WEIGHTS['completion_rate'] * matrix.completion_rate
+            + WEIGHTS['affinity'] * affinity[matrix.category_index]
+            + WEIGHTS['reward_rate'] * matrix.reward_rate
+        )
+        scores[started | (matrix.level_required > user_level)] = -np.inf
+        return scores
+
+    def recommend(self, user, limit: int = 10) -> List[Tuple[object, float]]:
+        """
+        Top quests the user can start.
+
+        Returns:
+            List of (quest, score) pairs, best first
+        """
+        from app.models.quest import Quest
+
+        matrix = self.catalog()
+        if not len(matrix):
+            return []
+
+        scores = self.score(matrix, user.level, self._history(user.id))
+        available = int(np.isfinite(scores).sum())
+
+        results = []
+        checked = 0
+        batch = limit * OVERFETCH
+        while len(results) < limit and checked < available:
+            count = min(checked + batch, available)
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top], kind='stable')][checked:]
+            checked = count
+            batch *= 2
+
+            quests = Quest.query.filter(Quest.id.in_([matrix.quest_ids[i] for i in top])).all()
+            eligibility = Quest.check_eligibility(user, quests)
+            by_id = {quest.id: quest for quest in quests}
+            for i in top:
+                quest_id = matrix.quest_ids[i]
+                if quest_id in by_id and eligibility[quest_id][0]:
+                    results.append((by_id[quest_id], round(float(scores[i]), 4)))
+                    if len(results) == limit:
+                        break
+        return results
+
+
+quest_recommender = QuestRecommender()
@@ -0,0 +1,323 @@
+"""
+Quest Search Index
+In-memory inverted index over quest titles, descriptions and tags with
+prefix matching, attribute filters and relevance ranking.
+
+The index is built lazily per worker from a column-only scan and kept current
+from committed quest inserts, updates and deletes. Each commit also bumps a
+version in the shared key-value store, so other workers rebuild on their
+next search instead of serving their stale copy.
+"""
+
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.utils.kv_store import KeyValueStore, SharedVersion
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of a term by the field it appears in
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.5,
+    'short_description': 1.5,
+    'description': 1.0,
+}
+PREFIX_PENALTY = 0.6  # Prefix matches score lower than exact terms
+COMPLETION_WEIGHT = 0.5  # Boost for quests with a 100% completion rate
+MIN_PREFIX_LENGTH = 2
+
+VERSION_KEY = 'quest_search:version'
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STAGED_KEY = 'quest_search_changes'
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+class QuestSearchIndex:
+    """Inverted index with a sorted term dictionary for prefix lookups."""
+
+    def __init__(self, store: Optional[KeyValueStore] = None):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._terms: List[str] = []
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._built = False
+        self._shared = SharedVersion(VERSION_KEY, store=store)
+        self._version = 0  # Shared version the local copy reflects
+
+    # --- Documents ---
+
+    @staticmethod
+    def snapshot(quest) -> Dict[str, Any]:
+        """Capture the indexed fields of a quest row or ORM object."""
+        total = quest.total_participants or 0
+        return {
+            'id': quest.id,
+            'title': quest.title,
+            'description': quest.description,
+            'short_description': quest.short_description,
+            'tags': list(quest.tags or []),
+            'difficulty': getattr(quest.difficulty, 'value', quest.difficulty),
+            'quest_type': getattr(quest.quest_type, 'value', quest.quest_type),
+            'status': getattr(quest.status, 'value', quest.status),
+            'level_required': quest.level_required,
+            'completion_rate': (quest.total_completions or 0) / total if total else 0.0,
+        }
+
+    @staticmethod
+    def _term_weights(doc: Dict[str, Any]) -> Dict[str, float]:
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            value = doc.get(field)
+            tokens = tokenize(' '.join(value)) if field == 'tags' else tokenize(value)
+            for token in tokens:
+                weights[token] = weights.get(token, 0.0) + weight
+        return weights
+
+    @staticmethod
+    def _signature(doc: Dict[str, Any]) -> Tuple:
+        return tuple(
+            tuple(doc.get(field) or ()) if field == 'tags' else doc.get(field)
+            for field in FIELD_WEIGHTS
+        )
+
+    def _add_postings(self, quest_id: str, weights: Dict[str, float], new_terms: List[str]) -> None:
+        for term, weight in weights.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                new_terms.append(term)
+            posting[quest_id] = weight
+
+    def _remove_postings(self, quest_id: str) -> None:
+        doc = self._docs.get(quest_id)
+        if not doc:
+            return
+        for term in doc['terms']:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(quest_id, None)
+            if not posting:
+                del self._postings[term]
+                index = bisect.bisect_left(self._terms, term)
+                if index < len(self._terms) and self._terms[index] == term:
+                    del self._terms[index]
+
+    def index_quest(self, doc: Dict[str, Any]) -> None:
+        """Add or replace a quest document."""
+        with self._lock:
+            existing = self._docs.get(doc['id'])
+            signature = self._signature(doc)
+            if existing and existing['signature'] == signature:
+                # Only filters and stats changed; postings stay as they are
+                existing.update({k: v for k, v in doc.items() if k not in FIELD_WEIGHTS})
+                return
+
+            self._remove_postings(doc['id'])
+            weights = self._term_weights(doc)
+            new_terms: List[str] = []
+            self._add_postings(doc['id'], weights, new_terms)
+            for term in new_terms:
+                bisect.insort(self._terms, term)
+
+            self._docs[doc['id']] = {
+                **{k: v for k, v in doc.items() if k not in FIELD_WEIGHTS},
+                'terms': frozenset(weights),
+                'signature': signature,
+            }
+
+    def set_status(self, quest_id: str, status: str) -> None:
+        """Update a quest's status filter without touching its postings."""
+        with self._lock:
+            doc = self._docs.get(quest_id)
+            if doc is not None:
+                doc['status'] = status
+
+    def remove_quest(self, quest_id: str) -> None:
+        with self._lock:
+            self._remove_postings(quest_id)
+            self._docs.pop(quest_id, None)
+
+    def build(self, docs: Iterable[Dict[str, Any]]) -> int:
+        """Replace the index contents with the given documents."""
+        postings: Dict[str, Dict[str, float]] = {}
+        stored: Dict[str, Dict[str, Any]] = {}
+        for doc in docs:
+            weights = self._term_weights(doc)
+            for term, weight in weights.items():
+                postings.setdefault(term, {})[doc['id']] = weight
+            stored[doc['id']] = {
+                **{k: v for k, v in doc.items() if k not in FIELD_WEIGHTS},
+                'terms': frozenset(weights),
+                'signature': self._signature(doc),
+            }
+
+        with self._lock:
+            self._postings = postings
+            self._terms = sorted(postings)
+            self._docs = stored
+            self._built = True
+        return len(stored)
+
+    def _load_docs(self, chunk_size: int) -> Iterable[Dict[str, Any]]:
+        from app.models.quest import Quest
+
+        query = Quest.query.with_entities(
+            Quest.id, Quest.title, Quest.description, Quest.short_description,
+            Quest.tags, Quest.difficulty, Quest.quest_type, Quest.status,
+            Quest.level_required, Quest.total_participants, Quest.total_completions
+        ).yield_per(chunk_size)
+        return (self.snapshot(row) for row in query)
+
+    def rebuild(self, chunk_size: int = 5000) -> int:
+        """Rebuild from the quests table with a streamed column-only scan."""
+        started = time.monotonic()
+        # Read first: a change committed during the scan bumps past it
+        version = self._shared.get(refresh=True)
+        with self._lock:
+            count = self.build(self._load_docs(chunk_size))
+            self._version = version
+        logger.info("Quest search index rebuilt with %d quests in %.2fs",
+                    count, time.monotonic() - started)
+        return count
+
+    def _current(self) -> bool:
+        return self._built and self._shared.get() == self._version
+
+    def ensure_built(self) -> None:
+        """Build the index on first use, and rebuild it after another worker's change."""
+        if not self._current():
+            with self._lock:
+                if not self._current():
+                    self.rebuild()
+
+    def publish(self) -> None:
+        """
+        Tell other workers about committed quest changes. Call after applying
+        them locally; the local copy stays current unless another worker
+        changed quests in between.
+        """
+        try:
+            version = self._shared.bump()
+        except Exception as e:
+            logger.error(f"Failed to publish quest search change: {str(e)}")
+            return
+        with self._lock:
+            if version == self._version + 1:
+                self._version = version
+
+    # --- Queries ---
+
+    def _match(self, token: str, prefix: bool) -> Dict[str, float]:
+        """Quest scores for one query token, including prefix expansions."""
+        total_docs = max(1, len(self._docs))
+        scores: Dict[str, float] = {}
+
+        terms = [(token, 1.0)] if token in self._postings else []
+        if prefix and len(token) >= MIN_PREFIX_LENGTH:
+            start = bisect.bisect_left(self._terms, token)
+            for term in self._terms[start:]:
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    terms.append((term, PREFIX_PENALTY))
+
+        for term, factor in terms:
+            posting = self._postings[term]
+            idf = math.log(1 + total_docs / len(posting))
+            for quest_id, weight in posting.items():
+                score = weight * idf * factor
+                if score > scores.get(quest_id, 0.0):
+                    scores[quest_id] = score
+        return scores
+
+    def search(self, query: str, difficulty: Optional[str] = None,
+               quest_type: Optional[str] = None, min_level: Optional[int] = None,
+               max_level: Optional[int] = None, status: Optional[str] = 'active',
+               limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Search quests. Every query token must match a term or term prefix.
+
+        Returns:
+            Tuple of ([(quest_id, score)] for the requested page, total matches)
+        """
+        tokens = tokenize(query)
+        with self._lock:
+            if tokens:
+                candidates: Optional[Dict[str, float]] = None
+                for token in tokens:
+                    matches = self._match(token, prefix=True)
+                    if candidates is None:
+                        candidates = matches
+                    else:
+                        candidates = {
+                            quest_id: score + matches[quest_id]
+                            for quest_id, score in candidates.items() if quest_id in matches
+                        }
+                    if not candidates:
+                        return [], 0
+            else:
+                candidates = {quest_id: 1.0 for quest_id in self._docs}
+
+            results = []
+            for quest_id, score in candidates.items():
+                doc = self._docs[quest_id]
+                if status and doc['status'] != status:
+                    continue
+                if difficulty and doc['difficulty'] != difficulty:
+                    continue
+                if quest_type and doc['quest_type'] != quest_type:
+                    continue
+                if min_level is not None and doc['level_required'] < min_level:
+                    continue
+                if max_level is not None and doc['level_required'] > max_level:
+                    continue
+                results.append((quest_id, score * (1 + COMPLETION_WEIGHT * doc['completion_rate'])))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[offset:offset + limit], len(results)
+
+    # --- Commit-time staging ---
+
+    @staticmethod
+    def stage(session: Optional[Session], quest_id: str, doc: Optional[Dict[str, Any]]) -> None:
+        """Apply a quest change (doc, or None for deletion) after commit."""
+        if session is not None:
+            session.info.setdefault(_STAGED_KEY, {})[quest_id] = doc
+
+
+quest_search_index = QuestSearchIndex()
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_quest_search_changes(session):
+    """Apply committed quest changes to the search index."""
+    changes = session.info.pop(_STAGED_KEY, None)
+    if not changes:
+        return
+    if quest_search_index._built:  # An unbuilt index will load the committed rows itself
+        for quest_id, doc in changes.items():
+            if doc is None:
+                quest_search_index.remove_quest(quest_id)
+            else:
+                quest_search_index.index_quest(doc)
+    quest_search_index.publish()
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_quest_search_changes(session):
+    session.info.pop(_STAGED_KEY, None)
@@ -0,0 +1,340 @@
+"""
+Quest Statistics Rollup
+Maintains the quest_stats table from quest progress events.
+
+Committed starts, completions and abandonments are merged in memory into
+hourly and all-time deltas per quest and per category, and a background
+flusher folds them into quest_stats with one read-modify-write batch.
+Completion times are kept as log-scale histograms so medians can be read
+from any set of buckets without touching quest_progress.
+"""
+
+import atexit
+import logging
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 5.0  # Seconds between background flushes
+HISTOGRAM_STEPS = 4  # Histogram buckets per doubling of duration (~19% resolution)
+ALL_TIME = datetime(1970, 1, 1)  # bucket_start of all-time total rows
+
+_COUNTERS = ('started', 'completed', 'abandoned', 'active_quests', 'duration_total')
+_STAGED_KEY = 'quest_stats_events'
+
+StatsKey = Tuple[str, str, datetime]
+
+
+def hour_bucket(when: datetime) -> datetime:
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def duration_bucket(seconds: float) -> str:
+    """Histogram bucket for a completion time (JSON keys are strings)."""
+    return str(int(HISTOGRAM_STEPS * math.log2(max(seconds, 0) + 1)))
+
+
+def merge_histograms(histograms: Iterable[Optional[Dict[str, int]]]) -> Dict[str, int]:
+    merged: Dict[str, int] = defaultdict(int)
+    for histogram in histograms:
+        for bucket, count in (histogram or {}).items():
+            merged[bucket] += count
+    return dict(merged)
+
+
+def histogram_median(histogram: Optional[Dict[str, int]]) -> Optional[float]:
+    """Approximate median in seconds, or None for an empty histogram."""
+    if not histogram:
+        return None
+    total = sum(histogram.values())
+    seen = 0
+    for bucket in sorted(histogram, key=int):
+        seen += histogram[bucket]
+        if seen * 2 >= total:
+            # Geometric midpoint of the bucket
+            return round(2 ** ((int(bucket) + 0.5) / HISTOGRAM_STEPS) - 1, 1)
+    return None
+
+
+class _Delta:
+    """Pending counter changes for one quest_stats row."""
+
+    __slots__ = _COUNTERS + ('histogram',)
+
+    def __init__(self):
+        for field in _COUNTERS:
+            setattr(self, field, 0)
+        self.histogram: Dict[str, int] = defaultdict(int)
+
+    def merge(self, other: '_Delta') -> None:
+        for field in _COUNTERS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] += count
+
+
+class QuestStatsRollup:
+    """In-memory delta buffer and flusher for quest_stats."""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Dict[StatsKey, _Delta] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the background flusher for this application."""
+        self._app = app
+        app.extensions['quest_stats'] = self
+        if self._thread is None and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='quest-stats', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    # --- Events ---
+
+    @staticmethod
+    def stage(session: Optional[Session], kind: str, quest_id: str,
+              when: Optional[datetime] = None, **values) -> None:
+        """
+        Record a progress event once the session commits.
+
+        Args:
+            kind: 'started', 'completed', 'abandoned' or 'active_quests'
+            quest_id: Quest the event belongs to
+            when: Event time, used for the hourly bucket
+            values: duration (seconds) for completions, delta and
+                category_id for active_quests changes
+        """
+        if session is not None:
+            session.info.setdefault(_STAGED_KEY, []).append(
+                (kind, quest_id, when or datetime.utcnow(), values)
+            )
+
+    def record(self, events: List[Tuple[str, str, datetime, Dict[str, Any]]]) -> None:
+        """Merge committed events into the pending deltas."""
+        deltas: Dict[StatsKey, _Delta] = defaultdict(_Delta)
+        for kind, quest_id, when, values in events:
+            if kind == 'active_quests':
+                # Quest catalog changes only touch the category total
+                if values.get('category_id') is not None:
+                    deltas[('category', str(values['category_id']), ALL_TIME)].active_quests += values['delta']
+                continue
+            for bucket in (hour_bucket(when), ALL_TIME):
+                delta = deltas[('quest', quest_id, bucket)]
+                setattr(delta, kind, getattr(delta, kind) + 1)
+                if kind == 'completed' and values.get('duration') is not None:
+                    delta.duration_total += int(values['duration'])
+                    delta.histogram[duration_bucket(values['duration'])] += 1
+
+        with self._lock:
+            for key, delta in deltas.items():
+                self._pending.setdefault(key, _Delta()).merge(delta)
+
+    # --- Flushing ---
+
+    def flush(self) -> int:
+        """
+        Fold pending deltas into quest_stats.
+
+        Quest deltas are also applied to their category's rows. Existing rows
+        are locked and updated in place; missing rows are inserted.
+
+        Returns:
+            Number of quest_stats rows written
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        from app.models.quest import Quest, QuestStats
+
+        try:
+            deltas = self._with_categories(pending, Quest)
+            keys = list(deltas)
+            existing = {
+                (row.scope, row.scope_id, row.bucket_start): row
+                for start in range(0, len(keys), 500)
+                for row in QuestStats.query.filter(
+                    tuple_(QuestStats.scope, QuestStats.scope_id, QuestStats.bucket_start).in_(keys[start:start + 500])
+                ).with_for_update()
+            }
+
+            now = datetime.utcnow()
+            for key, delta in deltas.items():
+                row = existing.get(key)
+                if row is None:
+                    row = QuestStats(scope=key[0], scope_id=key[1], bucket_start=key[2],
+                                     duration_histogram={})
+                    for field in _COUNTERS:
+                        setattr(row, field, 0)
+                    db.session.add(row)
+                for field in _COUNTERS:
+                    setattr(row, field, getattr(row, field) + getattr(delta, field))
+                if delta.histogram:
+                    row.duration_histogram = merge_histograms([row.duration_histogram, delta.histogram])
+                row.updated_at = now
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._requeue(pending)
+            logger.error(f"Failed to flush quest stats for {len(pending)} buckets: {str(e)}")
+            return 0
+
+        return len(deltas)
+
+    @staticmethod
+    def _with_categories(pending: Dict[StatsKey, _Delta], quest_model) -> Dict[StatsKey, _Delta]:
+        """Add each quest delta to its category's rows."""
+        quest_ids = {key[1] for key in pending if key[0] == 'quest'}
+        categories = dict(
+            db.session.query(quest_model.id, quest_model.category_id).filter(
+                quest_model.id.in_(quest_ids), quest_model.category_id.isnot(None)
+            )
+        ) if quest_ids else {}
+
+        deltas: Dict[StatsKey, _Delta] = {}
+        for key, delta in pending.items():
+            deltas.setdefault(key, _Delta()).merge(delta)
+            scope, scope_id, bucket = key
+            if scope == 'quest' and scope_id in categories:
+                category_key = ('category', str(categories[scope_id]), bucket)
+                deltas.setdefault(category_key, _Delta()).merge(delta)
+        return deltas
+
+    def _requeue(self, pending: Dict[StatsKey, _Delta]) -> None:
+        with self._lock:
+            for key, delta in pending.items():
+                self._pending.setdefault(key, _Delta()).merge(delta)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._flush_in_context()
+
+    def _flush_in_context(self) -> None:
+        with self._app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Quest stats flusher error: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def stop(self) -> None:
+        """Stop the background flusher and drain pending deltas."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._app is not None:
+            self._flush_in_context()
+
+    # --- Rebuild ---
+
+    def rebuild(self, chunk_size: int = 5000) -> int:
+        """
+        Recompute quest_stats from quest_progress.
+
+        Only needed to backfill or recover; normal operation is incremental.
+        Pending in-memory deltas are discarded since the rebuild covers them.
+
+        Returns:
+            Number of quest_stats rows written
+        """
+        from app.models.quest import Quest, QuestProgress, QuestStats, QuestStatus
+
+        with self._lock:
+            self._pending = {}
+
+        try:
+            QuestStats.query.delete(synchronize_session=False)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
+
+        events = []
+        rows = QuestProgress.query.with_entities(
+            QuestProgress.quest_id, QuestProgress.status, QuestProgress.started_at,
+            QuestProgress.completed_at, QuestProgress.last_updated
+        ).yield_per(chunk_size)
+        for row in rows:
+            events.append(('started', row.quest_id, row.started_at, {}))
+            if row.status == 'completed' and row.completed_at:
+                duration = (row.completed_at - row.started_at).total_seconds()
+                events.append(('completed', row.quest_id, row.completed_at, {'duration': duration}))
+            elif row.status == 'abandoned':
+                events.append(('abandoned', row.quest_id, row.last_updated or row.started_at, {}))
+            if len(events) >= chunk_size:
+                self.record(events)
+                events = []
+
+        for category_id, count in db.session.query(
+            Quest.category_id, db.func.count(Quest.id)
+        ).filter(
+            Quest.status == QuestStatus.ACTIVE, Quest.category_id.isnot(None)
+        ).group_by(Quest.category_id):
+            events.append(('active_quests', None, ALL_TIME, {'category_id': category_id, 'delta': count}))
+
+        self.record(events)
+        return self.flush()
+
+    # --- Reads ---
+
+    @staticmethod
+    def totals(scope: str, scope_ids: Iterable[Any]) -> Dict[str, Any]:
+        """All-time QuestStats rows by scope id."""
+        from app.models.quest import QuestStats
+
+        scope_ids = [str(scope_id) for scope_id in scope_ids]
+        if not scope_ids:
+            return {}
+        return {
+            row.scope_id: row for row in QuestStats.query.filter(
+                QuestStats.scope == scope,
+                QuestStats.scope_id.in_(scope_ids),
+                QuestStats.bucket_start == ALL_TIME
+            )
+        }
+
+    @staticmethod
+    def series(scope: str, scope_id: Any, hours: int = 24,
+               now: Optional[datetime] = None) -> List[Any]:
+        """Hourly QuestStats rows for the last `hours` hours, oldest first."""
+        from app.models.quest import QuestStats
+
+        since = hour_bucket(now or datetime.utcnow()) - timedelta(hours=hours - 1)
+        return QuestStats.query.filter(
+            QuestStats.scope == scope,
+            QuestStats.scope_id == str(scope_id),
+            QuestStats.bucket_start >= since
+        ).order_by(QuestStats.bucket_start).all()
+
+
+quest_stats = QuestStatsRollup()
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_quest_stats_events(session):
+    """Merge progress events from the committed transaction."""
+    events = session.info.pop(_STAGED_KEY, None)
+    if events:
+        quest_stats.record(events)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_quest_stats_events(session):
+    session.info.pop(_STAGED_KEY, None)
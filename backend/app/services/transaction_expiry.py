@@ -0,0 +1,170 @@
+"""
+Transaction Expiry Sweeper
+Fails PENDING transactions past expires_at with chunked set-based updates,
+each batch a single UPDATE ... WHERE id IN (SELECT ... LIMIT n) walking
+idx_transaction_status_created, committed on its own.
+
+Runs on a schedule inside the app (TRANSACTION_EXPIRY_INTERVAL) and on
+demand via `manage.py expire_transactions`. Each run stops at its time
+budget; whatever is left is picked up by the next run. A shared lock in the
+key-value store keeps concurrent worker processes from sweeping at once.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.transaction import Transaction, TransactionStatus
+from app.utils.kv_store import get_kv_store
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 1000
+SWEEP_TIME_BUDGET = 30.0  # Seconds per run
+SWEEP_INTERVAL = 300  # Seconds between scheduled runs
+LOCK_KEY = 'transaction_expiry:lock'
+
+EXPIRED_MESSAGE = "Transaction expired"
+
+
+def _expired_filter(now: datetime):
+    return (
+        Transaction.status == TransactionStatus.PENDING,
+        Transaction.expires_at <= now
+    )
+
+
+def expire_transactions(batch_size: int = SWEEP_BATCH_SIZE,
+                        time_budget: Optional[float] = SWEEP_TIME_BUDGET,
+                        dry_run: bool = False,
+                        now: Optional[datetime] = None,
+                        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Mark expired pending transactions as failed.
+
+    Args:
+        batch_size: Transactions per UPDATE
+        time_budget: Seconds after which no new batch is started (None for no limit)
+        dry_run: Only count what would expire
+        now: Expiry cutoff
+        progress: Called with the running summary after each batch
+
+    Returns:
+        Summary with transactions expired (or expirable, for a dry run),
+        batches run, whether the budget ran out, and elapsed time
+    """
+    now = now or datetime.utcnow()
+    started = time.monotonic()
+    summary = {'expired': 0, 'batches': 0, 'dry_run': dry_run, 'budget_exhausted': False}
+
+    if dry_run:
+        summary['expired'] = db.session.query(db.func.count(Transaction.id)).filter(
+            *_expired_filter(now)
+        ).scalar()
+        summary['elapsed_ms'] = round((time.monotonic() - started) * 1000, 2)
+        return summary
+
+    # Oldest first along (status, created_at). The derived table lets MySQL
+    # accept LIMIT inside the IN subquery.
+    batch = select(Transaction.id).where(*_expired_filter(now)).order_by(
+        Transaction.created_at
+    ).limit(batch_size).subquery()
+
+    while True:
+        if time_budget is not None and time.monotonic() - started >= time_budget:
+            summary['budget_exhausted'] = True
+            break
+
+        try:
+            expired = Transaction.query.filter(
+                Transaction.id.in_(select(batch.c.id)),
+                Transaction.status == TransactionStatus.PENDING
+            ).update(
+                {Transaction.status: TransactionStatus.FAILED,
+                 Transaction.error_message: EXPIRED_MESSAGE,
+                 Transaction.next_retry_at: None},
+                synchronize_session=False
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if not expired:
+            break
+        summary['expired'] += expired
+        summary['batches'] += 1
+        if progress:
+            progress(dict(summary, elapsed_ms=round((time.monotonic() - started) * 1000, 2)))
+        if expired < batch_size:
+            break
+
+    summary['elapsed_ms'] = round((time.monotonic() - started) * 1000, 2)
+    if summary['expired']:
+        logger.info("Expired %(expired)d transactions in %(batches)d batches", summary)
+    if summary['budget_exhausted']:
+        logger.warning("Transaction expiry stopped at its time budget; remaining rows wait for the next run")
+    return summary
+
+
+class TransactionExpiryJob:
+    """Runs expire_transactions periodically in a background thread."""
+
+    def __init__(self, interval: float = SWEEP_INTERVAL, batch_size: int = SWEEP_BATCH_SIZE,
+                 time_budget: float = SWEEP_TIME_BUDGET):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the schedule unless TESTING or TRANSACTION_EXPIRY_INTERVAL is 0."""
+        self._app = app
+        self.interval = app.config.get('TRANSACTION_EXPIRY_INTERVAL', SWEEP_INTERVAL)
+        self.batch_size = app.config.get('TRANSACTION_EXPIRY_BATCH_SIZE', SWEEP_BATCH_SIZE)
+        self.time_budget = app.config.get('TRANSACTION_EXPIRY_TIME_BUDGET', SWEEP_TIME_BUDGET)
+        app.extensions['transaction_expiry'] = self
+        if self._thread is None and self.interval and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='transaction-expiry', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """Sweep now, unless another process holds the sweep lock."""
+        store = get_kv_store()
+        # The lock outlives a run that hits its budget, then expires on its own
+        if not store.set_if_absent(LOCK_KEY, '1', ttl=int(self.time_budget) + 60):
+            return None
+        try:
+            self.last_run = expire_transactions(batch_size=self.batch_size, time_budget=self.time_budget)
+        finally:
+            store.delete(LOCK_KEY)
+        return self.last_run
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Transaction expiry job error: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+transaction_expiry_job = TransactionExpiryJob()
@@ -0,0 +1,113 @@
+"""
+Transaction History
+Per-user transaction history with keyset (cursor) paging.
+
+A user's history is the union of transactions they sent and transactions
+they received. Filtering `sender_id = :u OR receiver_id = :u` defeats the
+(sender_id, created_at) and (receiver_id, created_at) indexes, so the page
+query is a UNION ALL of two branches, each an index range scan already in
+(created_at, id) order and limited to the page size. The database merges at
+most two pages of index entries, then only the page's rows are fetched by
+primary key. Cost depends on the page size, not on how many transactions
+the user has.
+
+Cursors are opaque tokens holding the (created_at, id) of the last row
+returned; the next page starts strictly after it.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_, union_all
+
+from app.core.exceptions import ValidationError
+from app.extensions import db
+from app.models.transaction import Transaction
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+Cursor = Tuple[datetime, str]
+
+
+def encode_cursor(created_at: datetime, txn_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{txn_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Raises:
+        ValidationError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, txn_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), txn_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError("Invalid cursor")
+
+
+def _branch(column, user_id: str, after: Optional[Cursor], limit: int):
+    """Ids of one side of the history, newest first, read from (column, created_at, id)."""
+    query = select(Transaction.id, Transaction.created_at).where(column == user_id)
+    if after is not None:
+        created_at, txn_id = after
+        # The plain bound gives a range even where row values are not sargable
+        query = query.where(
+            Transaction.created_at <= created_at,
+            tuple_(Transaction.created_at, Transaction.id) < tuple_(created_at, txn_id)
+        )
+    return query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit)
+
+
+def history_ids_query(user_id: str, limit: int, after: Optional[Cursor] = None):
+    """
+    UNION ALL of the sent and received branches, merged newest first.
+
+    Each branch is wrapped as a derived table so its ORDER BY/LIMIT is
+    allowed inside the compound select on every backend. Self-transfers are
+    rejected at creation, so the branches never return the same row.
+    """
+    sent = _branch(Transaction.sender_id, user_id, after, limit).subquery('sent')
+    received = _branch(Transaction.receiver_id, user_id, after, limit).subquery('received')
+    merged = union_all(select(sent.c.id, sent.c.created_at),
+                       select(received.c.id, received.c.created_at)).subquery('history')
+    return select(merged.c.id, merged.c.created_at).order_by(
+        merged.c.created_at.desc(), merged.c.id.desc()
+    ).limit(limit)
+
+
+def history_page(user_id: str, limit: int = DEFAULT_PAGE_SIZE,
+                 cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One page of a user's transactions, newest first.
+
+    Args:
+        user_id: User whose sent and received transactions are listed
+        limit: Page size, capped at MAX_PAGE_SIZE
+        cursor: next_cursor from the previous page
+
+    Returns:
+        Dictionary with transactions and next_cursor (None on the last page)
+
+    Raises:
+        ValidationError: If the cursor is malformed
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+
+    # One extra row tells whether another page exists
+    keys = db.session.execute(history_ids_query(user_id, limit + 1, after)).all()
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    transactions: List[Transaction] = []
+    if keys:
+        by_id = {txn.id: txn for txn in Transaction.query.filter(Transaction.id.in_([key.id for key in keys]))}
+        transactions = [by_id[key.id] for key in keys if key.id in by_id]
+
+    next_cursor = encode_cursor(keys[-1].created_at, keys[-1].id) if has_more else None
+    return {'transactions': transactions, 'next_cursor': next_cursor}
@@ -0,0 +1,262 @@
+"""
+Transaction Retry Scheduler
+Retries failed transactions in the background with exponential backoff.
+
+When a transaction fails with retries left, it gets a next_retry_at of
+TRANSACTION_RETRY_BASE_DELAY * 2^(attempt - 1), capped at
+TRANSACTION_RETRY_MAX_DELAY. Equal jitter (half fixed, half random) keeps
+retries from failing in lockstep. The scheduler reads due retries in
+next_retry_at order from idx_transaction_retry_due, moves them back to
+PENDING and hands them to the payment queue at its lowest priority. The
+payment queue's worker pool runs them, and at most
+TRANSACTION_RETRY_MAX_IN_FLIGHT retries are outstanding at a time, so a
+backlog of retries cannot crowd out new payments.
+
+The scheduler also recovers payments lost from the in-process payment
+queue. A transaction handed to the queue stays PENDING with next_retry_at
+set TRANSACTION_RECOVERY_DELAY ahead; claiming it clears the deadline. If a
+restart drops the queue, the scheduler finds the PENDING transactions whose
+deadline has passed (not expired, no pi_payment_id) and queues them again
+at their own priority. Re-queueing one that is merely slow is harmless,
+since the queue claims a transaction only while it is PENDING.
+
+Only failures where the payment never reached Pi Network are retried.
+Transactions failed by expiry, out of retries, or failed after Pi already
+paid (pi_payment_id set) have no next_retry_at and are never picked up. A
+Pi Network call that timed out may still have paid, so the payment queue
+parks it as UNKNOWN for reconciliation instead of failing it.
+"""
+
+import atexit
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from app.extensions import db
+from app.services.payment_queue import PaymentQueueFullError, payment_queue
+from app.utils.kv_store import get_kv_store
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+BASE_DELAY = 30.0  # Seconds before the first retry
+MAX_DELAY = 3600.0
+RETRY_INTERVAL = 10  # Seconds between scheduler runs
+MAX_IN_FLIGHT = 32
+RETRY_PRIORITY = 10  # Lowest payment queue priority
+RECOVERY_DELAY = 300.0  # Seconds a queued payment may stay unclaimed before it is presumed lost
+LOCK_KEY = 'transaction_retry:lock'
+
+
+class TransactionRetryScheduler:
+    """Moves due failed transactions back through the payment queue."""
+
+    def __init__(self, queue=None):
+        self.queue = queue or payment_queue
+        self.base_delay = BASE_DELAY
+        self.max_delay = MAX_DELAY
+        self.interval = RETRY_INTERVAL
+        self.max_in_flight = MAX_IN_FLIGHT
+        self.recovery_delay = RECOVERY_DELAY
+        self._in_flight: Set[str] = set()
+        self._counts = {'enqueued': 0, 'recovered': 0, 'deferred': 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the schedule unless TESTING or TRANSACTION_RETRY_INTERVAL is 0."""
+        self._app = app
+        self.base_delay = app.config.get('TRANSACTION_RETRY_BASE_DELAY', BASE_DELAY)
+        self.max_delay = app.config.get('TRANSACTION_RETRY_MAX_DELAY', MAX_DELAY)
+        self.interval = app.config.get('TRANSACTION_RETRY_INTERVAL', RETRY_INTERVAL)
+        self.max_in_flight = app.config.get('TRANSACTION_RETRY_MAX_IN_FLIGHT', MAX_IN_FLIGHT)
+        self.recovery_delay = app.config.get('TRANSACTION_RECOVERY_DELAY', RECOVERY_DELAY)
+        app.extensions['transaction_retry'] = self
+        if self._thread is None and self.interval and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='transaction-retry', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def next_retry_at(self, retry_count: int, now: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        When a transaction that has failed retry_count times is retried next.
+
+        Returns:
+            None once MAX_RETRIES attempts have failed
+        """
+        if retry_count >= MAX_RETRIES:
+            return None
+        delay = min(self.max_delay, self.base_delay * 2 ** max(retry_count - 1, 0))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        return (now or datetime.utcnow()) + timedelta(seconds=delay)
+
+    def recovery_at(self, now: Optional[datetime] = None) -> datetime:
+        """Deadline after which a queued, still unclaimed payment is queued again."""
+        return (now or datetime.utcnow()) + timedelta(seconds=self.recovery_delay)
+
+    @staticmethod
+    def _lost_query(now: datetime):
+        from app.models.transaction import Transaction, TransactionStatus
+
+        return Transaction.query.filter(
+            Transaction.status == TransactionStatus.PENDING,
+            Transaction.next_retry_at <= now,
+            Transaction.pi_payment_id.is_(None),
+            db.or_(Transaction.expires_at.is_(None), Transaction.expires_at > now)
+        )
+
+    def _due_query(self, now: datetime):
+        from app.models.transaction import Transaction, TransactionStatus
+
+        return Transaction.query.filter(
+            Transaction.status == TransactionStatus.FAILED,
+            Transaction.next_retry_at <= now,
+            Transaction.retry_count < MAX_RETRIES
+        )
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Queue due retries, then lost payments, up to the free in-flight slots.
+
+        Returns:
+            Number of transactions queued, or 0 if another process holds the lock
+        """
+        from app.models.transaction import Transaction
+
+        with self._lock:
+            self._in_flight = {txn_id for txn_id in self._in_flight if self.queue.is_queued(txn_id)}
+            slots = self.max_in_flight - len(self._in_flight)
+        if slots <= 0:
+            return 0
+
+        store = get_kv_store()
+        if not store.set_if_absent(LOCK_KEY, '1', ttl=60):
+            return 0
+        try:
+            now = now or datetime.utcnow()
+            try:
+                due = self._due_query(now).order_by(Transaction.next_retry_at).limit(slots).with_for_update(
+                    skip_locked=True
+                ).all()
+                for txn in due:
+                    txn.prepare_retry()
+                    txn.mark_queued(now)
+                lost = []
+                if len(due) < slots:
+                    lost = self._lost_query(now).order_by(Transaction.next_retry_at).limit(
+                        slots - len(due)
+                    ).with_for_update(skip_locked=True).all()
+                    for txn in lost:
+                        txn.mark_queued(now)
+                # (id, priority, is_retry)
+                items = [(txn.id, RETRY_PRIORITY, True) for txn in due] + \
+                    [(txn.id, txn.priority, False) for txn in lost]
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            counts = {'enqueued': 0, 'recovered': 0}
+            for index, (txn_id, priority, is_retry) in enumerate(items):
+                try:
+                    self.queue.enqueue(txn_id, priority)
+                except PaymentQueueFullError as e:
+                    remaining = items[index:]
+                    self._defer([item[0] for item in remaining if item[2]],
+                                [item[0] for item in remaining if not item[2]],
+                                now + timedelta(seconds=e.retry_after))
+                    break
+                counts['enqueued' if is_retry else 'recovered'] += 1
+                with self._lock:
+                    self._in_flight.add(txn_id)
+            with self._lock:
+                for name, count in counts.items():
+                    self._counts[name] += count
+            return sum(counts.values())
+        finally:
+            store.delete(LOCK_KEY)
+
+    def _defer(self, retry_ids, lost_ids, retry_at: datetime) -> None:
+        """
+        Put retries the payment queue had no room for back to FAILED, and
+        bring the recovery deadline of lost payments forward to retry_at.
+        """
+        from app.models.transaction import Transaction, TransactionStatus
+
+        try:
+            for ids, values in ((retry_ids, {Transaction.status: TransactionStatus.FAILED}), (lost_ids, {})):
+                if ids:
+                    Transaction.query.filter(
+                        Transaction.id.in_(ids),
+                        Transaction.status == TransactionStatus.PENDING
+                    ).update({**values, Transaction.next_retry_at: retry_at}, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        deferred = len(retry_ids) + len(lost_ids)
+        with self._lock:
+            self._counts['deferred'] += deferred
+        logger.warning(f"Payment queue full; deferred {deferred} transaction retries and recoveries")
+
+    def metrics(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Retry queue depth and age.
+
+        Returns:
+            scheduled (failed with a retry pending), due (retry time passed),
+            oldest_due_seconds (how overdue the oldest due retry is),
+            awaiting_reconciliation (UNKNOWN outcome), in_flight, and
+            enqueued/recovered/deferred counters
+        """
+        from app.models.transaction import Transaction, TransactionStatus
+
+        now = now or datetime.utcnow()
+        # Both are range reads on idx_transaction_retry_due
+        scheduled, oldest = db.session.query(
+            db.func.count(Transaction.id), db.func.min(Transaction.next_retry_at)
+        ).filter(
+            Transaction.status == TransactionStatus.FAILED,
+            Transaction.next_retry_at.isnot(None),
+            Transaction.retry_count < MAX_RETRIES
+        ).one()
+        due = self._due_query(now).with_entities(db.func.count(Transaction.id)).scalar()
+        unknown = Transaction.query.filter(
+            Transaction.status == TransactionStatus.UNKNOWN
+        ).with_entities(db.func.count(Transaction.id)).scalar()
+
+        with self._lock:
+            counters = dict(self._counts)
+            in_flight = len(self._in_flight)
+        overdue = (now - oldest).total_seconds() if oldest is not None and oldest <= now else 0.0
+        return {
+            'scheduled': scheduled,
+            'due': due,
+            'oldest_due_seconds': round(overdue, 1),
+            'awaiting_reconciliation': unknown,
+            'in_flight': in_flight,
+            **counters
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Transaction retry scheduler error: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+transaction_retry = TransactionRetryScheduler()
@@ -0,0 +1,218 @@
+"""
+Transfer Group Commit
+Optional pipeline for POST /api/transactions/transfer that groups concurrent
+transfer requests into one database transaction, so commit latency is paid
+once per batch instead of once per transfer.
+
+Request threads submit a transfer and wait for its result. A single batcher
+thread collects requests for up to TRANSFER_BATCH_WINDOW or until
+TRANSFER_BATCH_SIZE are waiting, then loads every participant in one query,
+validates the batch in memory against each sender's ledger balance (less
+what the sender already moved earlier in the batch) and inserts the
+accepted transfers with a single commit. Rejected transfers get their own error; if
+the batch commit fails, its transfers are retried one by one so a single
+bad row cannot fail the rest.
+
+Each transfer's id is assigned when it is submitted. A request that stops
+waiting before its batch finishes gets 202 with that id, because the batch
+may still commit the transfer; the client looks the outcome up instead of
+retrying blind.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.exceptions import InsufficientFundsError, ValidationError
+from app.extensions import db
+from app.services.ledger import ledger
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW = 0.005  # Seconds the first request of a batch waits for company
+BATCH_SIZE = 200
+MAX_PENDING = 5000
+RESULT_TIMEOUT = 10.0
+
+# (HTTP status, body) returned to the waiting request
+TransferResult = Tuple[int, Dict[str, Any]]
+
+
+class TransferBatcherBusyError(Exception):
+    """Raised when too many transfers are waiting for a batch."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Transfer pipeline is busy")
+        self.retry_after = retry_after
+
+
+class _TransferRequest:
+    __slots__ = ('transaction_id', 'sender_id', 'receiver_id', 'amount', 'description', 'future')
+
+    def __init__(self, sender_id: str, receiver_id: str, amount: Decimal, description: Optional[str]):
+        self.transaction_id = str(uuid.uuid4())
+        self.sender_id = sender_id
+        self.receiver_id = receiver_id
+        self.amount = amount
+        self.description = description
+        self.future: Future = Future()
+
+
+class TransferBatcher:
+    """Micro-batching group commit for transfer creation."""
+
+    def __init__(self, window: float = BATCH_WINDOW, batch_size: int = BATCH_SIZE,
+                 max_pending: int = MAX_PENDING):
+        self.window = window
+        self.batch_size = batch_size
+        self.timeout = RESULT_TIMEOUT
+        self.retry_after = 1
+        self.enabled = False
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+
+    def init_app(self, app) -> None:
+        """Start the batcher when TRANSFER_BATCHING is enabled."""
+        self._app = app
+        self.enabled = bool(app.config.get('TRANSFER_BATCHING', False))
+        self.window = app.config.get('TRANSFER_BATCH_WINDOW', BATCH_WINDOW)
+        self.batch_size = app.config.get('TRANSFER_BATCH_SIZE', BATCH_SIZE)
+        self.timeout = app.config.get('TRANSFER_BATCH_TIMEOUT', RESULT_TIMEOUT)
+        app.extensions['transfer_batcher'] = self
+        if self._thread is None and self.enabled and not app.config.get('TESTING'):
+            self._thread = threading.Thread(target=self._run, name='transfer-batcher', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, sender_id: str, receiver_id: str, amount: Decimal,
+               description: Optional[str] = None) -> TransferResult:
+        """
+        Create a transfer through the next batch and wait for its result.
+
+        Returns:
+            The batch's result, or 202 with the transaction id if the batch
+            has not finished within TRANSFER_BATCH_TIMEOUT
+
+        Raises:
+            TransferBatcherBusyError: If the pipeline's queue is full
+        """
+        request = _TransferRequest(sender_id, receiver_id, amount, description)
+        if self._thread is None:
+            self._process([request])
+            return request.future.result()
+
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            raise TransferBatcherBusyError(self.retry_after)
+        try:
+            return request.future.result(self.timeout)
+        except FutureTimeoutError:
+            logger.warning(f"Transfer {request.transaction_id} still pending after {self.timeout}s")
+            return 202, {
+                'status': 'accepted',
+                'transaction_id': request.transaction_id,
+                'message': 'Transfer is still being processed; check its status before retrying'
+            }
+
+    # --- Batching ---
+
+    def _run(self) -> None:
+        # On stop, keep going until the queue is drained
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self._app.app_context():
+                try:
+                    self._process(batch)
+                except Exception as e:
+                    logger.error(f"Transfer batch failed: {str(e)}")
+                    for request in batch:
+                        if not request.future.done():
+                            request.future.set_result((500, {'error': 'Server error', 'details': str(e)}))
+                finally:
+                    db.session.remove()
+
+    def _process(self, batch: List[_TransferRequest]) -> None:
+        from app.models.transaction import Transaction
+        from app.models.user import User
+
+        user_ids = {request.sender_id for request in batch} | {request.receiver_id for request in batch}
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+        available = ledger.ledger_balances(request.sender_id for request in batch if request.sender_id in users)
+
+        accepted: List[Tuple[_TransferRequest, Transaction]] = []
+        for request in batch:
+            sender, receiver = users.get(request.sender_id), users.get(request.receiver_id)
+            if not sender or not receiver:
+                request.future.set_result((404, {'error': 'Invalid sender or receiver ID'}))
+                continue
+            try:
+                txn = Transaction.create_transfer(sender, receiver, request.amount, request.description,
+                                                  available=available[sender.id])
+            except (ValidationError, InsufficientFundsError) as e:
+                request.future.set_result((400, {'error': str(e)}))
+                continue
+            txn.id = request.transaction_id
+            # Later transfers in the batch see what this sender has committed to
+            available[sender.id] -= request.amount
+            accepted.append((request, txn))
+
+        if not accepted:
+            db.session.rollback()
+            return
+
+        try:
+            db.session.add_all([txn for _, txn in accepted])
+            db.session.flush()
+            results = [(request, {'transaction': txn.to_dict()}) for request, txn in accepted]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if len(accepted) == 1:
+                raise
+            logger.warning(f"Transfer batch of {len(accepted)} failed ({str(e)}); committing individually")
+            self._process_individually([request for request, _ in accepted])
+            return
+
+        for request, body in results:
+            request.future.set_result((201, body))
+
+    def _process_individually(self, requests: List[_TransferRequest]) -> None:
+        for request in requests:
+            try:
+                self._process([request])
+            except Exception as e:
+                db.session.rollback()
+                request.future.set_result((500, {'error': 'Server error', 'details': str(e)}))
+
+    def stop(self) -> None:
+        """Stop after committing the transfers already queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+transfer_batcher = TransferBatcher()
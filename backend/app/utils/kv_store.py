@@ -0,0 +1,364 @@
+"""
+Shared key-value store for counters and short-lived state.
+Uses Redis when REDIS_URL is reachable and falls back to an in-process store,
+so single-worker deployments and tests run without Redis.
+"""
+
+import bisect
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+try:
+    import redis
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - Redis is optional
+    redis = None
+    RedisError = Exception
+
+
+# INCRBY and EXPIRE in one step, so a crash in between cannot leave a
+# counter without its TTL
+_INCR_SCRIPT = """
+local created = redis.call('exists', KEYS[1]) == 0
+local value = redis.call('incrby', KEYS[1], ARGV[1])
+if created and tonumber(ARGV[2]) > 0 then
+    redis.call('expire', KEYS[1], ARGV[2])
+end
+return value
+"""
+
+_INCR_EXISTING_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('incrby', KEYS[1], ARGV[1])
+end
+return false
+"""
+
+
+class KeyValueStore(ABC):
+    """Interface shared by the Redis and in-memory stores."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def get_many(self, keys: Iterable[str]) -> List[Optional[str]]:
+        return [self.get(key) for key in keys]
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ...
+
+    @abstractmethod
+    def set_if_absent(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Set key only if it does not exist. Returns True if the value was stored."""
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        """Atomically add amount to an integer key, setting ttl when the key is created."""
+
+    @abstractmethod
+    def incr_existing(self, key: str, amount: int) -> Optional[int]:
+        """Increment a key only if it exists; returns None when it does not."""
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    def expire(self, key: str, ttl: int) -> None:
+        ...
+
+    # --- Sorted sets (highest score first) ---
+
+    @abstractmethod
+    def zincrby(self, key: str, member: str, amount: float) -> float:
+        """Add amount to member's score, creating the member at zero."""
+
+    @abstractmethod
+    def ztop(self, key: str, count: int, offset: int = 0) -> List[Tuple[str, float]]:
+        """Members with the highest scores as (member, score) pairs."""
+
+    @abstractmethod
+    def zrank(self, key: str, member: str) -> Optional[int]:
+        """Zero-based rank of member by descending score, or None."""
+
+    @abstractmethod
+    def zscores(self, key: str, members: Iterable[str]) -> List[Optional[float]]:
+        ...
+
+    @abstractmethod
+    def zcard(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def zrem(self, key: str, *members: str) -> None:
+        ...
+
+
+class RedisStore(KeyValueStore):
+    """Redis-backed store shared by every worker and node."""
+
+    def __init__(self, client):
+        self.redis = client
+
+    def get(self, key: str) -> Optional[str]:
+        return self.redis.get(key)
+
+    def get_many(self, keys: Iterable[str]) -> List[Optional[str]]:
+        keys = list(keys)
+        return self.redis.mget(keys) if keys else []
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.redis.set(key, value, ex=ttl)
+
+    def set_if_absent(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        return bool(self.redis.set(key, value, ex=ttl, nx=True))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        # Only the creating increment sets the expiry so windows don't slide
+        return int(self.redis.eval(_INCR_SCRIPT, 1, key, amount, ttl or 0))
+
+    def incr_existing(self, key: str, amount: int) -> Optional[int]:
+        value = self.redis.eval(_INCR_EXISTING_SCRIPT, 1, key, amount)
+        return None if value is None else int(value)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.redis.delete(*keys)
+
+    def expire(self, key: str, ttl: int) -> None:
+        self.redis.expire(key, ttl)
+
+    def zincrby(self, key: str, member: str, amount: float) -> float:
+        return float(self.redis.zincrby(key, amount, member))
+
+    def ztop(self, key: str, count: int, offset: int = 0) -> List[Tuple[str, float]]:
+        return self.redis.zrevrange(key, offset, offset + count - 1, withscores=True)
+
+    def zrank(self, key: str, member: str) -> Optional[int]:
+        return self.redis.zrevrank(key, member)
+
+    def zscores(self, key: str, members: Iterable[str]) -> List[Optional[float]]:
+        pipeline = self.redis.pipeline()
+        for member in members:
+            pipeline.zscore(key, member)
+        return pipeline.execute()
+
+    def zcard(self, key: str) -> int:
+        return self.redis.zcard(key)
+
+    def zrem(self, key: str, *members: str) -> None:
+        if members:
+            self.redis.zrem(key, *members)
+
+
+class MemoryStore(KeyValueStore):
+    """Thread-safe in-process store with per-key expiry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+
+    def _live(self, key: str, now: float) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= now:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def _store(self, key: str, value: Any, ttl: Optional[int], now: float) -> None:
+        self._data[key] = value
+        if ttl:
+            self._expires[key] = now + ttl
+        else:
+            self._expires.pop(key, None)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if not self._live(key, time.monotonic()):
+                return None
+            value = self._data[key]
+            return value if isinstance(value, bytes) else str(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl, time.monotonic())
+
+    def set_if_absent(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._live(key, now):
+                return False
+            self._store(key, value, ttl, now)
+            return True
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        with self._lock:
+            now = time.monotonic()
+            if self._live(key, now):
+                value = int(self._data[key]) + amount
+                self._data[key] = value
+            else:
+                value = amount
+                self._store(key, value, ttl, now)
+            return value
+
+    def incr_existing(self, key: str, amount: int) -> Optional[int]:
+        with self._lock:
+            if not self._live(key, time.monotonic()):
+                return None
+            value = int(self._data[key]) + amount
+            self._data[key] = value
+            return value
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+
+    def expire(self, key: str, ttl: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._live(key, now):
+                self._expires[key] = now + ttl
+
+    def _zset(self, key: str, create: bool = False) -> Optional['_SortedSet']:
+        if not self._live(key, time.monotonic()):
+            if not create:
+                return None
+            self._data[key] = _SortedSet()
+        return self._data[key]
+
+    def zincrby(self, key: str, member: str, amount: float) -> float:
+        with self._lock:
+            return self._zset(key, create=True).incr(member, amount)
+
+    def ztop(self, key: str, count: int, offset: int = 0) -> List[Tuple[str, float]]:
+        with self._lock:
+            zset = self._zset(key)
+            return zset.top(count, offset) if zset else []
+
+    def zrank(self, key: str, member: str) -> Optional[int]:
+        with self._lock:
+            zset = self._zset(key)
+            return zset.rank(member) if zset else None
+
+    def zscores(self, key: str, members: Iterable[str]) -> List[Optional[float]]:
+        with self._lock:
+            zset = self._zset(key)
+            return [zset.scores.get(member) if zset else None for member in members]
+
+    def zcard(self, key: str) -> int:
+        with self._lock:
+            zset = self._zset(key)
+            return len(zset.scores) if zset else 0
+
+    def zrem(self, key: str, *members: str) -> None:
+        with self._lock:
+            zset = self._zset(key)
+            if zset:
+                for member in members:
+                    zset.remove(member)
+
+
+class _SortedSet:
+    """Score-ordered members kept in a bisect-maintained list."""
+
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self._ordered: List[Tuple[float, str]] = []  # (-score, member)
+
+    def incr(self, member: str, amount: float) -> float:
+        old = self.scores.get(member)
+        if old is not None:
+            del self._ordered[bisect.bisect_left(self._ordered, (-old, member))]
+        score = (old or 0.0) + amount
+        self.scores[member] = score
+        bisect.insort(self._ordered, (-score, member))
+        return score
+
+    def remove(self, member: str) -> None:
+        score = self.scores.pop(member, None)
+        if score is not None:
+            del self._ordered[bisect.bisect_left(self._ordered, (-score, member))]
+
+    def top(self, count: int, offset: int = 0) -> List[Tuple[str, float]]:
+        return [(member, -neg) for neg, member in self._ordered[offset:offset + count]]
+
+    def rank(self, member: str) -> Optional[int]:
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return bisect.bisect_left(self._ordered, (-score, member))
+
+
+class SharedVersion:
+    """
+    Version counter in the shared store for per-worker in-memory indexes.
+
+    A worker that commits a change bumps the version; every worker compares
+    the shared version with the one its copy was built at and rebuilds when
+    they differ. The shared value is read at most once per check_interval, so
+    hot read paths cost no round trip and other workers' copies trail a
+    commit by at most that long.
+    """
+
+    def __init__(self, key: str, check_interval: float = 1.0, store: Optional[KeyValueStore] = None):
+        self.key = key
+        self.check_interval = check_interval
+        self._store = store
+        self._latest = 0
+        self._checked_at: Optional[float] = None
+
+    @property
+    def store(self) -> KeyValueStore:
+        return self._store or get_kv_store()
+
+    def get(self, refresh: bool = False) -> int:
+        """Shared version, re-read if refresh or check_interval has passed."""
+        now = time.monotonic()
+        if refresh or self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._latest = int(self.store.get(self.key) or 0)
+            self._checked_at = now
+        return self._latest
+
+    def bump(self) -> int:
+        """Advance the shared version and return the new value."""
+        self._latest = self.store.incr(self.key)
+        self._checked_at = time.monotonic()
+        return self._latest
+
+
+def get_kv_store() -> KeyValueStore:
+    """
+    Return the application's shared store, connecting on first use.
+
+    Falls back to an in-process MemoryStore when Redis is not installed or
+    REDIS_URL is unreachable; counters are then local to the worker.
+    """
+    store = current_app.extensions.get('kv_store')
+    if store is not None:
+        return store
+
+    redis_url = current_app.config.get('REDIS_URL')
+    if redis is not None and redis_url:
+        try:
+            client = redis.from_url(redis_url, decode_responses=True)
+            client.ping()
+            store = RedisStore(client)
+            current_app.logger.info(f"Connected to Redis for shared counters: {redis_url}")
+        except (RedisError, ConnectionError) as e:
+            current_app.logger.error(f"Redis connection failed: {e}. Using in-process counters.")
+
+    if store is None:
+        store = MemoryStore()
+
+    current_app.extensions['kv_store'] = store
+    return store
@@ -0,0 +1,201 @@
+"""
+Snowflake Reference Numbers
+Collision-free, time-ordered transaction reference numbers.
+
+Each id packs 41 bits of milliseconds since EPOCH, a 10-bit worker id and a
+12-bit per-millisecond sequence, and is written as 13 fixed-width Crockford
+base32 characters after a prefix ("TXN" + 13 = 16 chars), so string order
+is id order and new rows land at the right edge of the unique index.
+
+Worker ids are leased from the shared key-value store so gunicorn workers
+and nodes never share one; SNOWFLAKE_WORKER_ID pins it explicitly. The
+clock never moves backwards: a stalled or rewound clock keeps the last
+millisecond, and sequence overflow borrows the next one.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+ENCODED_LENGTH = 13
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32
+
+WORKER_LEASE_TTL = 3600  # Seconds; renewed every third of that
+_LEASE_KEY = 'snowflake:worker:{}'
+
+# The last three characters encode the low 15 bits: the sequence plus the
+# worker's low bits. Precomputing them leaves one concatenation per id.
+_SUFFIX_BITS = 15
+_SUFFIXES = tuple(
+    ALPHABET[(value >> 10) & 31] + ALPHABET[(value >> 5) & 31] + ALPHABET[value & 31]
+    for value in range(1 << _SUFFIX_BITS)
+)
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def decode(reference: str, prefix: str = 'TXN') -> Tuple[datetime, int, int]:
+    """
+    Unpack a reference number.
+
+    Returns:
+        (UTC timestamp, worker id, sequence)
+    """
+    value = 0
+    for char in reference[len(prefix):]:
+        value = (value << 5) | ALPHABET.index(char)
+    sequence = value & MAX_SEQUENCE
+    worker_id = (value >> SEQUENCE_BITS) & MAX_WORKER_ID
+    millis = (value >> (SEQUENCE_BITS + WORKER_BITS)) + EPOCH_MS
+    return datetime(1970, 1, 1) + timedelta(milliseconds=millis), worker_id, sequence
+
+
+class SnowflakeGenerator:
+    """Thread-safe generator of prefixed Snowflake ids."""
+
+    def __init__(self, prefix: str = 'TXN', worker_id: Optional[int] = None):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._millis = -1
+        self._sequence = 0
+        self._head = ''
+        self._worker_id = 0
+        self._worker_low = 0
+        self._lease_token = uuid.uuid4().hex
+        self._lease_thread: Optional[threading.Thread] = None
+        self._app = None
+        # Until init_app assigns one, the pid stands in (unique per host only)
+        self._set_worker(os.getpid() & MAX_WORKER_ID if worker_id is None else worker_id)
+
+    @property
+    def worker_id(self) -> int:
+        return self._worker_id
+
+    def init_app(self, app) -> None:
+        """Assign the worker id: SNOWFLAKE_WORKER_ID, else a lease from the shared store."""
+        self._app = app
+        app.extensions['snowflake'] = self
+        configured = app.config.get('SNOWFLAKE_WORKER_ID')
+        if configured is not None:
+            self._set_worker(int(configured))
+        elif app.config.get('TESTING'):
+            self._set_worker(0)
+        else:
+            with app.app_context():
+                self._set_worker(self._lease_worker_id())
+            if self._lease_thread is None:
+                self._lease_thread = threading.Thread(target=self._renew_lease, name='snowflake-lease', daemon=True)
+                self._lease_thread.start()
+
+    def _set_worker(self, worker_id: int) -> None:
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"Worker id must be between 0 and {MAX_WORKER_ID}")
+        with self._lock:
+            self._worker_id = worker_id
+            self._worker_low = (worker_id << SEQUENCE_BITS) & ((1 << _SUFFIX_BITS) - 1)
+            self._millis = max(self._millis, 0)
+            self._head = self._encode_head(self._millis)
+
+    def _lease_worker_id(self) -> int:
+        from app.utils.kv_store import MemoryStore, get_kv_store
+
+        store = get_kv_store()
+        if isinstance(store, MemoryStore):
+            # No shared store: fall back to the pid, unique per host only
+            logger.warning("No shared store for Snowflake worker ids; set SNOWFLAKE_WORKER_ID per process")
+            return os.getpid() & MAX_WORKER_ID
+
+        start = random.randrange(MAX_WORKER_ID + 1)
+        for offset in range(MAX_WORKER_ID + 1):
+            worker_id = (start + offset) & MAX_WORKER_ID
+            if store.set_if_absent(_LEASE_KEY.format(worker_id), self._lease_token, ttl=WORKER_LEASE_TTL):
+                return worker_id
+        raise RuntimeError("All Snowflake worker ids are leased")
+
+    def _renew_lease(self) -> None:
+        from app.utils.kv_store import get_kv_store
+
+        while True:
+            time.sleep(WORKER_LEASE_TTL / 3)
+            try:
+                with self._app.app_context():
+                    store = get_kv_store()
+                    key = _LEASE_KEY.format(self._worker_id)
+                    if store.get(key) == self._lease_token:
+                        store.expire(key, WORKER_LEASE_TTL)
+                    else:
+                        logger.error(f"Lost Snowflake worker lease {self._worker_id}; leasing a new id")
+                        self._set_worker(self._lease_worker_id())
+            except Exception as e:
+                logger.error(f"Snowflake lease renewal failed: {str(e)}")
+
+    def _encode_head(self, millis: int) -> str:
+        high = ((millis << WORKER_BITS) | self._worker_id) << SEQUENCE_BITS >> _SUFFIX_BITS
+        return self.prefix + _encode(high, ENCODED_LENGTH - 3)
+
+    def _advance(self) -> None:
+        """Step to the next (millisecond, sequence) slot. Caller holds the lock."""
+        now = time.time_ns() // 1000000 - EPOCH_MS
+        if now > self._millis:
+            self._millis = now
+            self._sequence = 0
+            self._head = self._encode_head(now)
+        elif self._sequence < MAX_SEQUENCE:
+            self._sequence += 1
+        else:
+            # Sequence exhausted (or clock rewound): borrow the next millisecond
+            self._millis += 1
+            self._sequence = 0
+            self._head = self._encode_head(self._millis)
+
+    def next_id(self, _time_ns=time.time_ns, _suffixes=_SUFFIXES) -> str:
+        """Generate one reference number."""
+        # _advance inlined with bound globals: this is the per-row hot path
+        now = _time_ns() // 1000000 - EPOCH_MS
+        with self._lock:
+            sequence = self._sequence + 1
+            if now > self._millis:
+                self._millis = now
+                sequence = 0
+                self._head = self._encode_head(now)
+            elif sequence > MAX_SEQUENCE:
+                self._millis += 1
+                sequence = 0
+                self._head = self._encode_head(self._millis)
+            self._sequence = sequence
+            return self._head + _suffixes[self._worker_low | sequence]
+
+    def next_ids(self, count: int) -> List[str]:
+        """Generate count reference numbers, in order, with one lock acquisition."""
+        ids: List[str] = []
+        with self._lock:
+            while len(ids) < count:
+                self._advance()
+                # Take the rest of this millisecond's sequence in one slice
+                take = min(count - len(ids), MAX_SEQUENCE - self._sequence + 1)
+                head, low, start = self._head, self._worker_low, self._sequence
+                ids.extend([head + _SUFFIXES[low | sequence] for sequence in range(start, start + take)])
+                self._sequence = start + take - 1
+        return ids
+
+
+reference_numbers = SnowflakeGenerator()
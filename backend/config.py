@@ -62,6 +62,10 @@ class BaseConfig:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     WTF_CSRF_ENABLED = True
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', PASSWORD_HASH_WORKERS * 8))
+    PASSWORD_HASH_RETRY_AFTER = 2  # Seconds, sent with 503 when the hashing queue is full
 
     # Database
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -81,6 +85,49 @@ class BaseConfig:
     # Pi Network
     PI_NETWORK_API_KEY = require_env_var('PI_NETWORK_API_KEY', secret=True)
     PI_NETWORK_SANDBOX = os.environ.get('PI_NETWORK_SANDBOX', 'true').lower() == 'true'
+    PI_NETWORK_STUB_LATENCY = float(os.environ.get('PI_NETWORK_STUB_LATENCY', 0.1))
+    PI_NETWORK_STUB_FAILURE_RATE = float(os.environ.get('PI_NETWORK_STUB_FAILURE_RATE', 0.05))
+
+    # Payment queue
+    PAYMENT_QUEUE_WORKERS = int(os.environ.get('PAYMENT_QUEUE_WORKERS', 16))  # Concurrent Pi Network calls
+    PAYMENT_QUEUE_MAX_PENDING = int(os.environ.get('PAYMENT_QUEUE_MAX_PENDING', 10000))
+    PAYMENT_QUEUE_TIMEOUT = 30.0  # Seconds before a Pi Network call is abandoned
+    PAYMENT_QUEUE_RETRY_AFTER = 5  # Seconds, sent with 503 when the queue is full
+
+    # Transaction expiry and retries
+    TRANSACTION_EXPIRY_INTERVAL = int(os.environ.get('TRANSACTION_EXPIRY_INTERVAL', 300))  # 0 disables the job
+    TRANSACTION_EXPIRY_BATCH_SIZE = 1000
+    TRANSACTION_EXPIRY_TIME_BUDGET = 30.0  # Seconds per run
+    TRANSACTION_RETRY_INTERVAL = int(os.environ.get('TRANSACTION_RETRY_INTERVAL', 10))  # 0 disables retries
+    TRANSACTION_RETRY_BASE_DELAY = 30.0  # Seconds before the first retry; doubles per attempt
+    TRANSACTION_RETRY_MAX_DELAY = 3600.0
+    TRANSACTION_RETRY_MAX_IN_FLIGHT = 32  # Retries outstanding in the payment queue at once
+    TRANSACTION_RECOVERY_DELAY = 300.0  # Seconds before a queued, unclaimed payment is queued again
+
+    # Transfer group commit
+    TRANSFER_BATCHING = os.environ.get('TRANSFER_BATCHING', 'false').lower() == 'true'
+    TRANSFER_BATCH_WINDOW = float(os.environ.get('TRANSFER_BATCH_WINDOW', 0.005))  # Seconds
+    TRANSFER_BATCH_SIZE = 200
+    TRANSFER_BATCH_TIMEOUT = 10.0  # Seconds a request waits for its batch
+
+    # Idempotency-Key handling for transfers and purchases
+    IDEMPOTENCY_TTL = 86400  # Seconds a stored response is replayed
+    IDEMPOTENCY_LOCK_TTL = 60  # Seconds an in-flight claim outlives a crashed worker
+    IDEMPOTENCY_WAIT_TIMEOUT = 10.0  # Seconds a duplicate waits before getting 409
+
+    # Balance ledger
+    LEDGER_SNAPSHOT_INTERVAL = int(os.environ.get('LEDGER_SNAPSHOT_INTERVAL', 300))  # 0 disables snapshots
+    LEDGER_BALANCE_CACHE_TTL = 600  # Seconds a cached balance is trusted
+
+    # Quest participation counters
+    QUEST_PARTICIPATION_FLUSH_INTERVAL = float(os.environ.get('QUEST_PARTICIPATION_FLUSH_INTERVAL', 5.0))  # 0 disables
+
+    # Quest expiry
+    QUEST_EXPIRY_INTERVAL = int(os.environ.get('QUEST_EXPIRY_INTERVAL', 60))  # 0 disables the job
+    QUEST_EXPIRY_BATCH_SIZE = 500
+
+    # Reference numbers: leased from the shared store unless pinned per process (0-1023)
+    SNOWFLAKE_WORKER_ID = int(os.environ['SNOWFLAKE_WORKER_ID']) if os.environ.get('SNOWFLAKE_WORKER_ID') else None
 
     # Rate Limiting
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL', 'memory://')
@@ -31,4 +31,371 @@ def seed_admin(username, email, password, wallet):
 
         db.session.add(admin)
         db.session.commit()
-        click.echo("✅ Admin user seeded successfully.")
\ No newline at end of file
+        click.echo("✅ Admin user seeded successfully.")
+
+
+@cli.command("reconcile_quest_limits")
+@click.option('--user-id', 'user_ids', multiple=True, help='Only rebuild these users.')
+def reconcile_quest_limits(user_ids):
+    """Rebuild daily/weekly quest limit counters from user_quests."""
+    from app.blueprints.quests.routes import quest_limits
+
+    with app.app_context():
+        count = quest_limits.reconcile(user_ids or None)
+        click.echo(f"✅ Reconciled quest limit counters for {count} users.")
+
+
+@cli.command("expire_quests")
+@click.option('--batch-size', default=500, show_default=True, help='Quests per UPDATE batch.')
+def expire_quests(batch_size):
+    """Expire quests past expires_at now; the app also runs this on QUEST_EXPIRY_INTERVAL."""
+    from app.services.quest_expiry import expire_quests as sweep
+
+    with app.app_context():
+        summary = sweep(batch_size=batch_size)
+        click.echo(
+            f"✅ Expired {summary['quests_expired']} quests, closed "
+            f"{summary['progress_closed']} progress rows in {summary['batches']} batches."
+        )
+
+
+@cli.command("expire_transactions")
+@click.option('--batch-size', default=1000, show_default=True, help='Transactions per UPDATE batch.')
+@click.option('--time-budget', default=None, type=float, help='Stop starting batches after this many seconds.')
+@click.option('--dry-run', is_flag=True, help='Only count expired pending transactions.')
+def expire_transactions(batch_size, time_budget, dry_run):
+    """Fail pending transactions past expires_at."""
+    from app.services.transaction_expiry import expire_transactions as sweep
+
+    def report(summary):
+        click.echo(f"  {summary['expired']} expired after {summary['batches']} batches "
+                   f"({summary['elapsed_ms']:.0f}ms)")
+
+    with app.app_context():
+        summary = sweep(batch_size=batch_size, time_budget=time_budget, dry_run=dry_run, progress=report)
+        if dry_run:
+            click.echo(f"✅ {summary['expired']} pending transactions would expire.")
+            return
+        click.echo(f"✅ Expired {summary['expired']} transactions in {summary['batches']} batches.")
+        if summary['budget_exhausted']:
+            click.echo("Time budget reached; run again to continue.")
+
+
+@cli.command("retry_transactions")
+@click.option('--stats', is_flag=True, help='Only show the retry queue.')
+def retry_transactions(stats):
+    """Queue due retries and lost queued payments, and show the retry queue."""
+    from app.services.transaction_retry import transaction_retry
+
+    with app.app_context():
+        if not stats:
+            click.echo(f"✅ Queued {transaction_retry.run_once()} transaction retries and recoveries.")
+        metrics = transaction_retry.metrics()
+        click.echo(f"Retry queue: {metrics['scheduled']} scheduled, {metrics['due']} due, "
+                   f"oldest due {metrics['oldest_due_seconds']}s ago, {metrics['in_flight']} in flight, "
+                   f"{metrics['awaiting_reconciliation']} awaiting reconciliation")
+
+
+@cli.command("rebuild_leaderboard")
+def rebuild_leaderboard():
+    """Recompute the current quest leaderboard buckets from user_quests."""
+    from app.services.quest_leaderboard import quest_leaderboard
+
+    with app.app_context():
+        written = quest_leaderboard.rebuild()
+        click.echo(f"✅ Rebuilt quest leaderboards: {written}")
+
+
+@cli.command("flush_participation")
+def flush_participation():
+    """Fold sharded quest participation counts into the quests table now."""
+    from app.services.quest_participation import quest_participation
+
+    with app.app_context():
+        count = quest_participation.run_once()
+        if count is None:
+            click.echo("Another process is flushing participation counts; try again shortly.")
+            return
+        click.echo(f"✅ Flushed participation counts for {count} quests.")
+
+
+@cli.command("rebuild_quest_stats")
+def rebuild_quest_stats():
+    """Recompute the quest_stats rollup from quest_progress."""
+    from app.services.quest_stats import quest_stats
+
+    with app.app_context():
+        count = quest_stats.rebuild()
+        click.echo(f"✅ Rebuilt {count} quest_stats rows.")
+
+
+@cli.command("open_ledger_balances")
+@click.option('--batch-size', default=1000, show_default=True, help='Users per posting.')
+def open_ledger_balances(batch_size):
+    """Post opening ledger entries from users.total_rewards (safe to re-run)."""
+    from app.services.ledger import ledger
+
+    with app.app_context():
+        count = ledger.open_balances(batch_size=batch_size)
+        click.echo(f"✅ Opened ledger balances for {count} users.")
+
+
+@cli.command("snapshot_ledger")
+def snapshot_ledger():
+    """Fold settled ledger entries into balance snapshots."""
+    from app.services.ledger import ledger
+
+    with app.app_context():
+        summary = ledger.snapshot()
+        click.echo(f"✅ Snapshot updated {summary['accounts']} accounts through entry {summary['watermark']}.")
+
+
+@cli.command("recompute_levels")
+@click.option('--batch-size', default=50000, show_default=True, help='Users per batch.')
+def recompute_levels(batch_size):
+    """Recompute user levels from XP after an XP curve change."""
+    from app.services.leveling import recompute_user_levels
+
+    with app.app_context():
+        summary = recompute_user_levels(batch_size=batch_size)
+        click.echo(f"✅ Updated levels for {summary['updated']} of {summary['scanned']} users.")
+
+
+@cli.command("bench_password_hashing")
+@click.option('--logins', default=400, show_default=True, help='Password verifications to run.')
+@click.option('--threads', default=32, show_default=True, help='Concurrent request threads.')
+def bench_password_hashing(logins, threads):
+    """Measure login (password verification) throughput through the hashing pool."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.password_hasher import password_hasher, HasherBusyError
+
+    with app.app_context():
+        stored = password_hasher.hash('benchmark-password')
+        password_hasher.verify(stored, 'benchmark-password')  # Warm up the pool
+
+        def attempt(_):
+            while True:
+                try:
+                    return password_hasher.verify(stored, 'benchmark-password')
+                except HasherBusyError:
+                    time.sleep(0.01)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(attempt, range(logins)))
+        elapsed = time.perf_counter() - started
+
+        workers = 1 if password_hasher.inline else password_hasher.workers
+        rate = logins / elapsed
+        click.echo(f"✅ {logins} logins in {elapsed:.2f}s with {workers} hashing workers: "
+                   f"{rate:.1f} logins/s, {rate / workers:.1f} logins/s per core "
+                   f"({password_hasher.method}, all verified: {all(results)})")
+
+
+@cli.command("bench_payments")
+@click.option('--user-id', required=True, help='User receiving the benchmark deposits.')
+@click.option('--count', default=1000, show_default=True, help='Deposit transactions to process.')
+def bench_payments(user_id, count):
+    """Load-test the payment queue against the local Pi Network stub (writes deposits)."""
+    import random
+    import time
+    from decimal import Decimal
+    from app.models.transaction import Transaction, TransactionStatus, TransactionType
+    from app.services.payment_queue import payment_queue
+    from app.services.pi_network import pi_network
+
+    with app.app_context():
+        if not User.query.get(user_id):
+            click.echo("User not found.")
+            return
+
+        transactions = [Transaction(
+            receiver_id=user_id,
+            transaction_type=TransactionType.DEPOSIT,
+            amount=Decimal('0.01'),
+            status=TransactionStatus.PENDING,
+            priority=random.randint(1, 10),
+            description='Payment queue benchmark'
+        ) for _ in range(count)]
+        db.session.add_all(transactions)
+        db.session.commit()
+        ids = [(txn.id, txn.priority) for txn in transactions]
+
+        started = time.perf_counter()
+        for txn_id, priority in ids:
+            payment_queue.enqueue(txn_id, priority)
+        while any(payment_queue.is_queued(txn_id) for txn_id, _ in ids):
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+
+        metrics = payment_queue.metrics()
+        click.echo(f"✅ {count} payments in {elapsed:.2f}s with {payment_queue.workers} workers "
+                   f"({pi_network.latency * 1000:.0f}ms stub latency): {count / elapsed:.1f} payments/s, "
+                   f"{metrics['completed']} completed, {metrics['failed']} failed")
+
+
+@cli.command("bench_transfers")
+@click.option('--sender-id', required=True, help='User sending the benchmark transfers.')
+@click.option('--receiver-id', required=True, help='User receiving them.')
+@click.option('--count', default=2000, show_default=True, help='Transfers per mode.')
+@click.option('--threads', default=32, show_default=True, help='Concurrent request threads.')
+def bench_transfers(sender_id, receiver_id, count, threads):
+    """Compare per-request commits with group-committed transfers (writes pending transfers)."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from decimal import Decimal
+    from app.models.transaction import Transaction
+    from app.services.transfer_batcher import transfer_batcher
+
+    amount = Decimal('0.00000001')
+
+    def direct(_):
+        with app.app_context():
+            try:
+                sender, receiver = User.query.get(sender_id), User.query.get(receiver_id)
+                db.session.add(Transaction.create_transfer(sender, receiver, amount))
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def batched(_):
+        with app.app_context():
+            status, body = transfer_batcher.submit(sender_id, receiver_id, amount)
+            assert status == 201, body
+
+    app.config['TRANSFER_BATCHING'] = True
+    transfer_batcher.init_app(app)
+
+    for name, fn in (('per-request commit', direct), ('group commit', batched)):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(fn, range(count)))
+        elapsed = time.perf_counter() - started
+        click.echo(f"✅ {name}: {count} transfers in {elapsed:.2f}s, {count / elapsed:.1f} transfers/s")
+
+
+@cli.command("bench_reference_numbers")
+@click.option('--count', default=1000000, show_default=True, help='Reference numbers per mode.')
+@click.option('--threads', default=8, show_default=True, help='Concurrent generating threads.')
+def bench_reference_numbers(count, threads):
+    """Measure reference number generation and check uniqueness and ordering."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.utils.snowflake import SnowflakeGenerator
+
+    generator = SnowflakeGenerator(worker_id=1)
+    started = time.perf_counter()
+    ids = [generator.next_id() for _ in range(count)]
+    elapsed = time.perf_counter() - started
+    assert ids == sorted(ids) and len(set(ids)) == count, "ids are not unique and ordered"
+    click.echo(f"✅ next_id: {count} ids in {elapsed:.2f}s, {count / elapsed:,.0f} ids/s")
+
+    started = time.perf_counter()
+    ids = generator.next_ids(count)
+    elapsed = time.perf_counter() - started
+    assert ids == sorted(ids) and len(set(ids)) == count, "ids are not unique and ordered"
+    click.echo(f"✅ next_ids: {count} ids in {elapsed:.2f}s, {count / elapsed:,.0f} ids/s")
+
+    per_thread = count // threads
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        chunks = list(pool.map(lambda _: [generator.next_id() for _ in range(per_thread)], range(threads)))
+    elapsed = time.perf_counter() - started
+    ids = [reference for chunk in chunks for reference in chunk]
+    assert len(set(ids)) == len(ids), "duplicate ids across threads"
+    click.echo(f"✅ next_id x{threads} threads: {len(ids)} ids in {elapsed:.2f}s, {len(ids) / elapsed:,.0f} ids/s")
+
+
+@cli.command("bench_transaction_history")
+@click.option('--rows', default=50000000, show_default=True, help='Synthetic transactions to insert first (0 to use existing data).')
+@click.option('--users', default=10000, show_default=True, help='Existing users the synthetic rows are spread over.')
+@click.option('--pages', default=20, show_default=True, help='Pages to follow by cursor.')
+@click.option('--limit', default=50, show_default=True, help='Page size.')
+def bench_transaction_history(rows, users, pages, limit):
+    """Compare the OR history query with the UNION ALL keyset query and show both plans (inserts test data)."""
+    import random
+    import time
+    import uuid
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+    from sqlalchemy import or_
+    from app.models.transaction import Transaction, TransactionStatus, TransactionType
+    from app.services.transaction_history import decode_cursor, history_ids_query, history_page
+    from app.utils.snowflake import reference_numbers
+
+    def explain(stmt):
+        dialect = db.engine.dialect
+        compiled = stmt.compile(dialect=dialect)
+        params = compiled.params
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+        plan = db.session.connection().exec_driver_sql(prefix + str(compiled), params).all()
+        return '\n'.join('    ' + ' | '.join(str(value) for value in row) for row in plan)
+
+    with app.app_context():
+        user_ids = [user_id for user_id, in User.query.with_entities(User.id).limit(users)]
+        if len(user_ids) < 2:
+            click.echo("At least two users are required.")
+            return
+        hot_user = user_ids[0]
+
+        if rows:
+            # Every 20th row involves the hot user, so their history is large
+            chunk, started = 50000, time.perf_counter()
+            start_at = datetime.utcnow() - timedelta(seconds=rows)
+            for offset in range(0, rows, chunk):
+                count = min(chunk, rows - offset)
+                references = reference_numbers.next_ids(count)
+                values = []
+                for i in range(count):
+                    sender, receiver = random.sample(user_ids, 2)
+                    if (offset + i) % 20 == 0:
+                        sender, receiver = (hot_user, receiver) if i % 2 else (sender, hot_user)
+                        if sender == receiver:
+                            sender = user_ids[1]
+                    values.append({
+                        'id': str(uuid.uuid4()), 'reference_number': references[i],
+                        'sender_id': sender, 'receiver_id': receiver,
+                        'transaction_type': TransactionType.TRANSFER, 'amount': Decimal('1'),
+                        'currency': 'PI', 'status': TransactionStatus.COMPLETED, 'priority': 5,
+                        'base_fee': 0, 'network_fee': 0, 'total_fee': 0, 'net_amount': Decimal('1'),
+                        'retry_count': 0, 'created_at': start_at + timedelta(seconds=offset + i),
+                    })
+                db.session.execute(Transaction.__table__.insert(), values)
+                db.session.commit()
+                click.echo(f"  inserted {offset + count}/{rows}")
+            click.echo(f"✅ Inserted {rows} transactions in {time.perf_counter() - started:.1f}s")
+            if db.engine.dialect.name == 'postgresql':
+                click.echo("  Run VACUUM ANALYZE transactions so index-only scans can skip the heap.")
+
+        legacy = Transaction.query.with_entities(Transaction.id, Transaction.created_at).filter(
+            (Transaction.sender_id == hot_user) | (Transaction.receiver_id == hot_user)
+        ).order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit).statement
+        click.echo(f"OR query plan:\n{explain(legacy)}")
+
+        started = time.perf_counter()
+        db.session.execute(legacy).all()
+        click.echo(f"  first page: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        cursor, timings = None, []
+        for _ in range(pages):
+            started = time.perf_counter()
+            page = history_page(hot_user, limit=limit, cursor=cursor)
+            timings.append((time.perf_counter() - started) * 1000)
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        plan = explain(history_ids_query(hot_user, limit + 1, decode_cursor(cursor) if cursor else None))
+        click.echo(f"UNION ALL keyset plan:\n{plan}")
+        click.echo(f"  first page: {timings[0]:.1f}ms, page {len(timings)}: {timings[-1]:.1f}ms, "
+                   f"mean {sum(timings) / len(timings):.1f}ms")
+
+        markers = {'sqlite': 'COVERING INDEX', 'postgresql': 'Index Only Scan', 'mysql': 'Using index'}
+        marker = markers.get(db.engine.dialect.name)
+        if marker and marker in plan and all(index in plan for index in (
+                'idx_transaction_sender_created', 'idx_transaction_receiver_created')):
+            click.echo("✅ Both history branches are index-only range scans")
+        elif marker:
+            click.echo("❌ History branches are not index-only; check the plan above")
@@ -0,0 +1,45 @@
+# tests/conftest.py
+
+import contextlib
+
+import pytest
+
+
+class StubApp:
+    """Just enough of a Flask app for a service's init_app and background threads."""
+
+    def __init__(self, **config):
+        self.config = config
+        self.extensions = {}
+
+    def app_context(self):
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def stub_app():
+    """Factory for StubApp: stub_app(SETTING=value, ...)."""
+    return StubApp
+
+
+@pytest.fixture
+def db_app():
+    """
+    Flask app on an in-memory SQLite database with every model's table
+    created, a local cache and an in-process key-value store.
+    """
+    from flask import Flask
+    import app.models  # noqa: F401  Registers every table
+    from app.extensions import cache, db
+    from app.utils.kv_store import MemoryStore
+
+    flask_app = Flask(__name__)
+    flask_app.config.update(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite://', CACHE_TYPE='SimpleCache')
+    flask_app.extensions['kv_store'] = MemoryStore()
+    db.init_app(flask_app)
+    cache.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,44 @@
+# tests/test_audit_writer.py
+
+import threading
+
+import pytest
+from app.services.audit_writer import AuditWriter
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = AuditWriter(max_queue=5, batch_size=3, flush_interval=0.05)
+    writer.batches = []
+
+    def fake_write(events, dedicated=False):
+        writer.batches.append(list(events))
+
+    monkeypatch.setattr(writer, '_write', fake_write)
+    monkeypatch.setattr('atexit.register', lambda fn: None)
+    return writer
+
+
+def test_full_queue_drops_and_counts(writer):
+    # A thread that never consumes stands in for a stalled writer
+    writer._thread = threading.Thread(target=lambda: None)
+    accepted = [writer.log('login', user_id=i) for i in range(8)]
+    assert accepted.count(True) == 5
+    assert writer.metrics()['dropped'] == 3
+    assert writer.metrics()['queued'] == 5
+
+
+def test_batches_by_size_and_drains_on_stop(writer, stub_app):
+    writer.init_app(stub_app())
+    for i in range(5):
+        writer.log('login', user_id=i)
+    writer.stop()
+    written = [event['user_id'] for batch in writer.batches for event in batch]
+    assert written == list(range(5))
+    assert all(len(batch) <= 3 for batch in writer.batches)
+
+
+def test_writes_inline_without_thread(writer):
+    writer.log('logout', user_id=1, details={'reason': 'idle'})
+    assert writer.batches[0][0]['details'] == {'reason': 'idle'}
+    assert writer.batches[0][0]['user_agent'] == ''
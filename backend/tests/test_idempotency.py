@@ -0,0 +1,98 @@
+# tests/test_idempotency.py
+
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify, request
+from app.services.idempotency import idempotency, idempotent, mark_retryable
+from app.utils.kv_store import MemoryStore
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.extensions['kv_store'] = MemoryStore()
+    app.calls = []
+    app.fail_next = None
+
+    @app.route('/transfer', methods=['POST'])
+    @idempotent('transfer')
+    def transfer():
+        app.calls.append(request.get_json())
+        time.sleep(0.05)
+        failure, app.fail_next = app.fail_next, None
+        if failure == 'error':
+            return jsonify({'error': 'Server error'}), 500
+        if failure == 'raise':
+            raise RuntimeError('Commit acknowledgement lost')
+        if failure == 'busy':
+            mark_retryable()
+            return jsonify({'error': 'Busy'}), 503
+        return jsonify({'transfer': len(app.calls)}), 201
+
+    return app
+
+
+def test_replay_returns_stored_response_without_running_again(app):
+    client = app.test_client()
+    first = client.post('/transfer', json={'amount': '1'}, headers={'Idempotency-Key': 'k1'})
+    second = client.post('/transfer', json={'amount': '1'}, headers={'Idempotency-Key': 'k1'})
+
+    assert first.status_code == second.status_code == 201
+    assert second.get_json() == first.get_json() == {'transfer': 1}
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert len(app.calls) == 1
+
+
+def test_key_reused_for_different_request_is_rejected(app):
+    client = app.test_client()
+    client.post('/transfer', json={'amount': '1'}, headers={'Idempotency-Key': 'k1'})
+    response = client.post('/transfer', json={'amount': '2'}, headers={'Idempotency-Key': 'k1'})
+    assert response.status_code == 422
+    assert len(app.calls) == 1
+
+
+def test_concurrent_duplicates_wait_for_the_first(app):
+    results = []
+
+    def post():
+        response = app.test_client().post('/transfer', json={'amount': '1'}, headers={'Idempotency-Key': 'k1'})
+        results.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=post) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(app.calls) == 1
+    assert results == [(201, {'transfer': 1})] * 8
+
+
+@pytest.mark.parametrize('failure', ['error', 'raise'])
+def test_server_errors_are_replayed_not_run_again(app, failure):
+    client = app.test_client()
+    app.fail_next = failure
+    assert client.post('/transfer', json={}, headers={'Idempotency-Key': 'k1'}).status_code == 500
+    retry = client.post('/transfer', json={}, headers={'Idempotency-Key': 'k1'})
+    assert retry.status_code == 500
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert len(app.calls) == 1
+
+
+def test_retryable_failures_release_the_key(app):
+    client = app.test_client()
+    app.fail_next = 'busy'
+    assert client.post('/transfer', json={}, headers={'Idempotency-Key': 'k1'}).status_code == 503
+    assert client.post('/transfer', json={}, headers={'Idempotency-Key': 'k1'}).status_code == 201
+    assert len(app.calls) == 2
+
+
+def test_requests_without_key_always_run(app):
+    client = app.test_client()
+    client.post('/transfer', json={})
+    client.post('/transfer', json={})
+    assert len(app.calls) == 2
+    assert client.post('/transfer', json={}, headers={'Idempotency-Key': 'x' * 256}).status_code == 400
+    assert idempotency.metrics()['executed'] >= 1
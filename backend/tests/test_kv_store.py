@@ -0,0 +1,41 @@
+# tests/test_kv_store.py
+
+import pytest
+from app.utils.kv_store import KeyValueStore, MemoryStore, RedisStore
+
+
+class _ScriptedRedis:
+    """Evaluates the incr script's logic in memory and records the calls."""
+
+    def __init__(self):
+        self.values, self.ttls, self.calls = {}, {}, []
+
+    def eval(self, script, numkeys, key, amount, ttl):
+        self.calls.append((key, amount, ttl))
+        created = key not in self.values
+        self.values[key] = self.values.get(key, 0) + amount
+        if created and ttl > 0:
+            self.ttls[key] = ttl
+        return self.values[key]
+
+
+def test_interface_cannot_be_partially_implemented():
+    class Partial(KeyValueStore):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+    MemoryStore()
+
+
+def test_redis_incr_sets_ttl_atomically_on_create_only():
+    client = _ScriptedRedis()
+    store = RedisStore(client)
+
+    assert store.incr('window', 1, ttl=60) == 1
+    assert store.incr('window', 1, ttl=60) == 2
+    assert client.ttls == {'window': 60}
+    # One round trip per increment: no separate EXPIRE to be lost
+    assert client.calls == [('window', 1, 60), ('window', 1, 60)]
+    assert store.incr('no-ttl') == 1 and 'no-ttl' not in client.ttls
@@ -0,0 +1,173 @@
+# tests/test_ledger.py
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from app.core.exceptions import InsufficientFundsError, ValidationError
+from app.extensions import db
+from app.services.ledger import (
+    FEES_ACCOUNT, OPENING_ACCOUNT, REWARDS_ACCOUNT, Ledger, _from_units, is_system_account
+)
+from app.utils.kv_store import MemoryStore
+
+
+@pytest.fixture
+def ledger(db_app, monkeypatch):
+    """A Ledger with its own cache, also used by the after_commit hook."""
+    import app.services.ledger as module
+    instance = Ledger(store=MemoryStore())
+    monkeypatch.setattr(module, 'ledger', instance)
+    return instance
+
+
+def _fund(ledger, account_id, amount):
+    ledger.transfer(db.session, REWARDS_ACCOUNT, account_id, amount, 'quest_reward')
+    db.session.commit()
+
+
+def test_unbalanced_posting_is_rejected():
+    with pytest.raises(ValidationError):
+        Ledger(store=MemoryStore()).post(None, [('alice', '-1'), ('bob', '0.99')], 'transfer')
+
+
+def test_zero_legs_post_nothing():
+    assert Ledger(store=MemoryStore()).post(None, [('alice', 0), ('bob', '0.000000001')], 'transfer') is None
+
+
+def test_cached_totals_only_move_when_present():
+    store = MemoryStore()
+    ledger = Ledger(store=store)
+    store.set(ledger._cache_key('alice'), 1050000000)
+
+    ledger._apply({'alice': -300000000, 'bob': 297000000})
+
+    assert _from_units(store.get(ledger._cache_key('alice'))) == Decimal('7.5')
+    assert store.get(ledger._cache_key('bob')) is None
+
+
+def test_system_accounts():
+    assert is_system_account(FEES_ACCOUNT)
+    assert not is_system_account('6f1c2a9e-0000-4000-8000-000000000000')
+
+
+def test_debit_locks_account_and_checks_funds(ledger):
+    from app.models.ledger import BalanceSnapshot
+
+    _fund(ledger, 'alice', '10')
+    assert ledger.transfer(db.session, 'alice', 'bob', '4', 'transfer')
+    db.session.commit()
+
+    # The debit created alice's snapshot row to lock on; credits take no lock
+    assert db.session.get(BalanceSnapshot, 'alice') is not None
+    assert db.session.get(BalanceSnapshot, 'bob') is None
+    assert ledger.ledger_balance('alice') == Decimal('6')
+    assert ledger.ledger_balance('bob') == Decimal('4')
+
+
+def test_overdraft_is_rejected(ledger):
+    from app.models.ledger import LedgerEntry
+
+    _fund(ledger, 'alice', '5')
+    with pytest.raises(InsufficientFundsError):
+        # The check sees the first debit of this same transaction
+        ledger.transfer(db.session, 'alice', 'bob', '3', 'transfer')
+        ledger.transfer(db.session, 'alice', 'bob', '3', 'transfer')
+    db.session.rollback()
+
+    assert ledger.ledger_balance('alice') == Decimal('5')
+    assert LedgerEntry.query.filter_by(account_id='bob').count() == 0
+
+
+def test_ledger_balance_is_snapshot_plus_later_entries(ledger):
+    from app.models.ledger import BalanceSnapshot, LedgerEntry
+
+    _fund(ledger, 'alice', '2')
+    last_entry_id = db.session.query(db.func.max(LedgerEntry.id)).scalar()
+    # Entries up to the watermark are not summed again
+    db.session.add(BalanceSnapshot(account_id='alice', balance=Decimal('100'), last_entry_id=last_entry_id))
+    db.session.commit()
+    _fund(ledger, 'alice', '0.5')
+
+    assert ledger.ledger_balance('alice') == Decimal('100.5')
+
+
+def test_snapshot_folds_entries_past_watermark(ledger):
+    from app.models.ledger import BalanceSnapshot
+
+    _fund(ledger, 'alice', '3')
+    _fund(ledger, 'bob', '1')
+    first = ledger.snapshot(margin=timedelta(0))
+    assert first['accounts'] == 3
+    assert db.session.get(BalanceSnapshot, 'alice').balance == Decimal('3')
+    assert db.session.get(BalanceSnapshot, REWARDS_ACCOUNT).balance == Decimal('-4')
+
+    _fund(ledger, 'alice', '2')
+    assert ledger.snapshot(margin=timedelta(hours=1))['accounts'] == 0  # Too recent to fold
+    second = ledger.snapshot(margin=timedelta(0))
+    assert second['accounts'] == 2
+    assert second['watermark'] > first['watermark']
+    assert db.session.get(BalanceSnapshot, 'alice').balance == Decimal('5')
+    assert db.session.get(BalanceSnapshot, 'bob').balance == Decimal('1')
+    assert ledger.ledger_balance('alice') == Decimal('5')
+    assert ledger.snapshot(margin=timedelta(0)) == {'accounts': 0, 'watermark': second['watermark']}
+
+
+def test_balance_repopulates_cache_on_miss(ledger):
+    _fund(ledger, 'alice', '7')
+    key = ledger._cache_key('alice')
+    assert ledger.store.get(key) is None  # Uncached accounts are not incremented
+
+    assert ledger.balance('alice') == Decimal('7')
+    assert _from_units(ledger.store.get(key)) == Decimal('7')
+
+    _fund(ledger, 'alice', '1')
+    assert _from_units(ledger.store.get(key)) == Decimal('8')
+    assert ledger.balance('alice') == Decimal('8')
+
+
+def test_open_balances_ignores_other_postings(ledger):
+    from app.models.user import User
+
+    db.session.execute(User.__table__.insert(), [
+        {'id': 'alice', 'username': 'alice', 'email': 'alice@example.com', 'password_hash': 'x',
+         'total_rewards': Decimal('12')},
+        {'id': 'bob', 'username': 'bob', 'email': 'bob@example.com', 'password_hash': 'x',
+         'total_rewards': Decimal('3')},
+    ])
+    db.session.commit()
+    # A posting that reached alice before migration must not count as her opening
+    _fund(ledger, 'alice', '1')
+
+    assert ledger.open_balances(batch_size=1) == 2
+    assert ledger.open_balances() == 0
+    assert ledger.ledger_balance('alice') == Decimal('13')
+    assert ledger.ledger_balance('bob') == Decimal('3')
+    assert ledger.ledger_balance(OPENING_ACCOUNT) == Decimal('-15')
+
+
+def test_fill_that_raced_a_commit_is_not_cached(ledger, monkeypatch):
+    _fund(ledger, 'alice', '7')
+    read = ledger.ledger_balance
+
+    def read_then_commit(account_id, session=None):
+        balance = read(account_id, session)
+        _fund(ledger, 'alice', '1')  # Lands after the read, before the fill
+        return balance
+
+    monkeypatch.setattr(ledger, 'ledger_balance', read_then_commit)
+    assert ledger.balance('alice') == Decimal('7')
+    assert ledger.store.get(ledger._cache_key('alice')) is None
+    assert read('alice') == Decimal('8')
+
+
+def test_ledger_balances_match_single_reads(ledger):
+    _fund(ledger, 'alice', '3')
+    _fund(ledger, 'bob', '1')
+    ledger.snapshot(margin=timedelta(0))
+    _fund(ledger, 'alice', '2')
+
+    balances = ledger.ledger_balances(['alice', 'bob', 'carol', REWARDS_ACCOUNT])
+    assert balances == {account_id: ledger.ledger_balance(account_id) for account_id in balances}
+    assert balances['alice'] == Decimal('5')
+    assert balances['carol'] == 0
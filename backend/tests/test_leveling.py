@@ -0,0 +1,39 @@
+# tests/test_leveling.py
+
+import numpy as np
+import pytest
+from app.services.leveling import (
+    MAX_PLAYER_LEVEL, level_for_xp, level_rewards, levels_for_xp, xp_for_level
+)
+
+
+def _loop_level(total_xp):
+    level = 1
+    while level < MAX_PLAYER_LEVEL and xp_for_level(level + 1) <= total_xp:
+        level += 1
+    return level
+
+
+def _loop_rewards(old_level, new_level):
+    return sum(0.1 * (1 + (level - 1) * 0.1) for level in range(old_level + 1, new_level + 1))
+
+
+@pytest.mark.parametrize('total_xp', [0, 1, 281, 282, 283, 5196, 100000, 10 ** 9])
+def test_level_for_xp_matches_linear_scan(total_xp):
+    assert level_for_xp(total_xp) == _loop_level(total_xp)
+
+
+def test_level_is_capped():
+    assert level_for_xp(10 ** 12) == MAX_PLAYER_LEVEL
+    assert level_for_xp(xp_for_level(MAX_PLAYER_LEVEL)) == MAX_PLAYER_LEVEL
+
+
+def test_level_rewards_match_per_level_sum():
+    assert level_rewards(1, 2) == pytest.approx(0.11)
+    assert level_rewards(3, 40) == pytest.approx(_loop_rewards(3, 40))
+    assert level_rewards(5, 5) == 0.0
+
+
+def test_vectorized_levels_match_scalar():
+    xp = np.random.default_rng(0).integers(0, 500000, 1000)
+    assert list(levels_for_xp(xp)) == [level_for_xp(int(value)) for value in xp]
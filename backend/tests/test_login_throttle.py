@@ -0,0 +1,35 @@
+# tests/test_login_throttle.py
+
+from datetime import timedelta
+
+import pytest
+from app.services.login_throttle import LoginFailureCounter
+from app.utils.kv_store import MemoryStore
+
+
+@pytest.fixture
+def failures():
+    return LoginFailureCounter(max_attempts=3, window=timedelta(minutes=30),
+                               max_ip_attempts=5, store=MemoryStore())
+
+
+def test_username_locks_after_max_failures(failures):
+    for _ in range(2):
+        failures.record_failure('alice', '10.0.0.1')
+    assert not failures.is_locked('alice', '10.0.0.1')
+    failures.record_failure('alice', '10.0.0.1')
+    assert failures.is_locked('alice', '10.0.0.2')
+
+
+def test_ip_locks_across_usernames(failures):
+    for name in ('a', 'b', 'c', 'd', 'e'):
+        failures.record_failure(name, '10.0.0.9')
+    assert failures.is_locked('fresh-user', '10.0.0.9')
+    assert not failures.is_locked('fresh-user', '10.0.0.10')
+
+
+def test_success_resets_username(failures):
+    for _ in range(3):
+        failures.record_failure('bob')
+    failures.reset('bob')
+    assert not failures.is_locked('bob')
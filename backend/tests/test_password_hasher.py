@@ -0,0 +1,35 @@
+# tests/test_password_hasher.py
+
+import pytest
+from app.services.password_hasher import HasherBusyError, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher()
+    hasher.method = 'pbkdf2:sha256:1000'
+    return hasher
+
+
+def test_hash_and_verify(hasher):
+    stored = hasher.hash('correct horse')
+    assert stored.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify(stored, 'correct horse')
+    assert not hasher.verify(stored, 'wrong horse')
+
+
+def test_needs_rehash_when_work_factor_changes(hasher):
+    stored = hasher.hash('correct horse')
+    assert not hasher.needs_rehash(stored)
+    hasher.method = 'pbkdf2:sha256:2000'
+    assert hasher.needs_rehash(stored)
+
+
+def test_full_queue_rejects_with_retry_after(hasher):
+    hasher.inline = False
+    hasher.max_pending = 0
+    hasher.retry_after = 3
+    with pytest.raises(HasherBusyError) as excinfo:
+        hasher.submit_verify('pbkdf2:sha256:1000$salt$hash', 'password')
+    assert excinfo.value.retry_after == 3
+    assert hasher.in_flight == 0
@@ -0,0 +1,198 @@
+# tests/test_payment_queue.py
+
+import asyncio
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from app.extensions import db
+from app.services.ledger import HOLDS_ACCOUNT, REWARDS_ACCOUNT, ledger
+from app.services.payment_queue import PaymentQueue, PaymentQueueFullError
+from app.services.pi_network import LocalPiNetwork
+
+
+class _TrackingNetwork:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def create_payment(self, reference, amount):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        return {'pi_transaction_id': reference}
+
+
+@pytest.fixture
+def make_queue(monkeypatch, stub_app):
+    monkeypatch.setattr('atexit.register', lambda fn: None)
+    queues = []
+
+    def make(workers, network=None, claim=None, **config):
+        queue = PaymentQueue(network=network or _TrackingNetwork())
+        queue.claimed, queue.settled, queue.unknown = [], [], []
+
+        def fake_claim(txn_id):
+            if claim:
+                claim(txn_id)
+            queue.claimed.append(txn_id)
+            return (txn_id, 1)
+
+        def fake_settle(txn_id, payment, error, unknown=False):
+            (queue.unknown if unknown else queue.settled).append((txn_id, payment))
+
+        monkeypatch.setattr(queue, '_claim', fake_claim)
+        monkeypatch.setattr(queue, '_settle', fake_settle)
+        monkeypatch.setattr(queue, '_in_context', lambda fn, *args: fn(*args))
+        queue.init_app(stub_app(PAYMENT_QUEUE_WORKERS=workers, **config))
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop()
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_processes_by_priority(make_queue):
+    started, release = threading.Event(), threading.Event()
+
+    def block_first(txn_id):
+        if txn_id == 'first':
+            started.set()
+            release.wait(5)
+
+    queue = make_queue(workers=1, claim=block_first)
+    queue.enqueue('first', 5)
+    started.wait(5)
+    queue.enqueue('low', 9)
+    queue.enqueue('high', 1)
+    queue.enqueue('normal', 5)
+    release.set()
+
+    _wait_until(lambda: len(queue.settled) == 4)
+    assert queue.claimed == ['first', 'high', 'normal', 'low']
+
+
+def test_worker_count_caps_concurrent_payments(make_queue):
+    network = _TrackingNetwork()
+    queue = make_queue(workers=2, network=network)
+    for i in range(8):
+        queue.enqueue(f"txn-{i}")
+
+    _wait_until(lambda: len(queue.settled) == 8)
+    assert network.peak == 2
+    assert not queue.is_queued('txn-0')
+
+
+def test_duplicate_and_overflow(make_queue):
+    release = threading.Event()
+    queue = make_queue(workers=1, claim=lambda txn_id: release.wait(5), PAYMENT_QUEUE_MAX_PENDING=2)
+    assert queue.enqueue('a')
+    assert not queue.enqueue('a')
+    assert queue.enqueue('b')
+    with pytest.raises(PaymentQueueFullError):
+        queue.enqueue('c')
+    release.set()
+
+
+class _HangingNetwork:
+    async def create_payment(self, reference, amount):
+        await asyncio.sleep(1)
+        return {'pi_transaction_id': reference}
+
+
+def test_timeout_settles_as_unknown(make_queue):
+    queue = make_queue(workers=1, network=_HangingNetwork(), PAYMENT_QUEUE_TIMEOUT=0.05)
+    queue.enqueue('slow')
+
+    _wait_until(lambda: queue.unknown)
+    assert queue.unknown == [('slow', None)]
+    assert queue.settled == []
+
+
+def test_stub_settles_or_rejects():
+    assert LocalPiNetwork(latency=0, failure_rate=0).create_payment_blocking('TXN1', 1)['pi_payment_id']
+    assert asyncio.run(LocalPiNetwork(latency=0, failure_rate=1).create_payment('TXN1', 1)) is None
+
+
+_PAYMENT = {'pi_transaction_id': 'pi-txn', 'pi_payment_id': 'pi-pay', 'blockchain_hash': 'hash'}
+
+
+@pytest.fixture
+def transfers(db_app):
+    """Alice holds 10 Pi; returns a factory for her pending transfers to bob."""
+    from app.models.transaction import Transaction, TransactionStatus, TransactionType
+    from app.models.user import User
+
+    db.session.execute(User.__table__.insert(), [
+        {'id': name, 'username': name, 'email': f"{name}@example.com", 'password_hash': 'x'}
+        for name in ('alice', 'bob')
+    ])
+    ledger.transfer(db.session, REWARDS_ACCOUNT, 'alice', '10', 'quest_reward')
+    db.session.commit()
+
+    def make(amount):
+        txn = Transaction(sender_id='alice', receiver_id='bob', transaction_type=TransactionType.TRANSFER,
+                          amount=Decimal(amount), status=TransactionStatus.PENDING)
+        db.session.add(txn)
+        db.session.commit()
+        return txn.id
+
+    return make
+
+
+def _status(transaction_id):
+    from app.models.transaction import Transaction
+
+    db.session.expire_all()
+    return db.session.get(Transaction, transaction_id).status.value
+
+
+def test_claim_holds_funds_so_a_second_payment_cannot_overspend(transfers):
+    first, second = transfers('8'), transfers('8')
+    queue = PaymentQueue()
+
+    assert queue._claim(first) is not None
+    assert ledger.ledger_balance('alice') == Decimal('2')
+    # Pi Network is never asked to pay the second transfer
+    assert queue._claim(second) is None
+    assert _status(second) == 'failed'
+
+    assert queue._settle(first, _PAYMENT) is True
+    assert _status(first) == 'completed'
+    assert ledger.ledger_balance('alice') == Decimal('2')
+    assert ledger.ledger_balance(HOLDS_ACCOUNT) == 0
+    assert ledger.ledger_balance('bob') + ledger.ledger_balance('system:fees') == Decimal('8')
+
+
+def test_declined_payment_releases_the_hold(transfers):
+    transaction_id = transfers('8')
+    queue = PaymentQueue()
+
+    queue._claim(transaction_id)
+    assert queue._settle(transaction_id, None, "Declined") is False
+
+    assert _status(transaction_id) == 'failed'
+    assert ledger.ledger_balance('alice') == Decimal('10')
+    assert ledger.ledger_balance(HOLDS_ACCOUNT) == 0
+
+
+def test_unknown_outcome_keeps_the_hold(transfers):
+    transaction_id = transfers('8')
+    queue = PaymentQueue()
+
+    queue._claim(transaction_id)
+    queue._settle(transaction_id, None, "Pi Network payment timed out", unknown=True)
+
+    assert _status(transaction_id) == 'unknown'
+    assert ledger.ledger_balance('alice') == Decimal('2')
+    assert ledger.ledger_balance(HOLDS_ACCOUNT) == Decimal('8')
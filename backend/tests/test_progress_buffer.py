@@ -0,0 +1,110 @@
+# tests/test_progress_buffer.py
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from app.extensions import db
+from app.services.progress_buffer import ProgressBuffer, _PendingProgress
+
+
+def _progress(progress_id='p1', status='in_progress'):
+    return SimpleNamespace(id=progress_id, user_id='player', quest_id='quest-1', status=status,
+                           progress_value=0, progress_data=None)
+
+
+def test_ticks_coalesce_to_the_highest_value():
+    buffer = ProgressBuffer()
+    progress = _progress()
+    buffer.record(progress, 3, {'a': 1})
+    buffer.record(progress, 5, {'b': 2})
+    buffer.record(progress, 4)  # Reordered or stale tick
+
+    assert buffer.pending_value('player', 'quest-1') == 5
+    assert len(buffer._pending) == 1
+    assert buffer._pending[('player', 'quest-1')].data == {'a': 1, 'b': 2}
+    assert buffer.pending_value('player', 'other') is None
+
+
+def test_completed_progress_is_not_buffered():
+    buffer = ProgressBuffer()
+    assert not buffer.record(_progress(status='completed'), 5)
+    assert buffer.pending_value('player', 'quest-1') is None
+
+
+@pytest.fixture
+def progress_row(db_app):
+    from app.models.quest import Quest, QuestProgress, QuestStatus
+
+    db.session.execute(Quest.__table__.insert().values(
+        id='quest-1', title='Quest', description='Quest', creator_id='creator',
+        status=QuestStatus.ACTIVE, objective_target=10
+    ))
+    db.session.execute(QuestProgress.__table__.insert().values(
+        id='p1', user_id='player', quest_id='quest-1', status='in_progress', progress_value=0
+    ))
+    db.session.commit()
+    return db.session.get(QuestProgress, 'p1')
+
+
+def test_background_flush_writes_buffered_ticks(db_app, progress_row, monkeypatch):
+    from app.models.quest import QuestProgress
+
+    monkeypatch.setattr('atexit.register', lambda fn: None)
+    buffer = ProgressBuffer(interval=0.01)
+    buffer.record(progress_row, 4, {'step': 'a'})
+    buffer.record(progress_row, 7, {'step': 'b'})
+
+    db_app.config['TESTING'] = False
+    buffer.init_app(db_app)
+    try:
+        deadline = time.monotonic() + 5
+        while buffer.pending_value('player', 'quest-1') is not None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        buffer.stop()
+
+    db.session.expire_all()
+    row = db.session.get(QuestProgress, 'p1')
+    assert (row.progress_value, row.progress_data) == (7, {'step': 'b'})
+
+
+def test_tick_reaching_the_target_completes_immediately(progress_row):
+    buffer = ProgressBuffer()
+    buffer.record(progress_row, 6, {'step': 'a'})
+
+    assert buffer.record(progress_row, 12, {'step': 'b'}, target=10)
+    assert progress_row.status == 'completed'
+    assert progress_row.progress_value == 10
+    assert progress_row.progress_data == {'step': 'b'}
+    assert buffer.pending_value('player', 'quest-1') is None
+
+    db.session.commit()
+    # A tick from another worker's buffer must not reopen the completed row
+    other = ProgressBuffer()
+    other._pending[('player', 'quest-1')] = _PendingProgress('p1', 3, None)
+    assert other.flush() == 1
+    db.session.expire_all()
+    assert (progress_row.status, progress_row.progress_value) == ('completed', 10)
+
+
+def test_flush_never_moves_progress_backwards(progress_row):
+    from app.models.quest import QuestProgress
+
+    # Two workers buffered ticks for the same row; the newer one flushes first
+    ahead, behind = ProgressBuffer(), ProgressBuffer()
+    ahead.record(progress_row, 8, {'step': 'b'})
+    behind.record(progress_row, 5, {'step': 'a'})
+    ahead.flush()
+    behind.flush()
+
+    db.session.expire_all()
+    row = db.session.get(QuestProgress, 'p1')
+    assert (row.progress_value, row.progress_data) == (8, {'step': 'b'})
+
+    # The same value still carries new progress data
+    ahead.record(row, 8, {'checkpoint': 2})
+    ahead.flush()
+    db.session.expire_all()
+    assert db.session.get(QuestProgress, 'p1').progress_data == {'step': 'b', 'checkpoint': 2}
@@ -0,0 +1,64 @@
+# tests/test_quest_board.py
+
+import pytest
+from app.extensions import db
+from app.services.quest_board import QuestBoardCache
+
+
+@pytest.fixture
+def boards(db_app):
+    return QuestBoardCache()
+
+
+def test_keys_are_scoped_by_user_and_catalog_version():
+    assert QuestBoardCache._board_key('alice') == 'quest_board:user:alice'
+    assert QuestBoardCache._card_key('v1', 'quest-1') == 'quest_board:card:v1:quest-1'
+    assert QuestBoardCache._card_key('v2', 'quest-1') != QuestBoardCache._card_key('v1', 'quest-1')
+
+
+def test_catalog_rotation_retires_boards_and_cards(boards):
+    version = boards.catalog_version()
+    assert boards.catalog_version() == version  # Created once, then reused
+
+    boards.set_board('alice', {'version': version, 'quest_ids': ['quest-1']})
+    boards.set_cards(version, {'quest-1': {'id': 'quest-1'}, 'quest-2': {'id': 'quest-2'}})
+    assert boards.get_board('alice', version)['quest_ids'] == ['quest-1']
+    assert set(boards.get_cards(version, ['quest-1', 'quest-2', 'quest-3'])) == {'quest-1', 'quest-2'}
+
+    boards.invalidate_catalog()
+    rotated = boards.catalog_version()
+
+    assert rotated != version
+    assert boards.get_board('alice', rotated) is None
+    assert boards.get_cards(rotated, ['quest-1', 'quest-2']) == {}
+
+
+def test_stale_users_are_invalidated_on_commit_only(boards):
+    version = boards.catalog_version()
+    for user_id in ('alice', 'bob'):
+        boards.set_board(user_id, {'version': version})
+
+    QuestBoardCache.mark_user_stale(db.session(), 'alice')
+    db.session.rollback()
+    assert boards.get_board('alice', version) is not None
+
+    QuestBoardCache.mark_user_stale(db.session(), 'alice')
+    db.session.commit()
+    assert boards.get_board('alice', version) is None
+    assert boards.get_board('bob', version) is not None
+
+
+def test_stale_quests_drop_their_cards_or_the_whole_catalog(boards):
+    version = boards.catalog_version()
+    boards.set_board('alice', {'version': version})
+    boards.set_cards(version, {'quest-1': {'id': 'quest-1'}, 'quest-2': {'id': 'quest-2'}})
+
+    QuestBoardCache.mark_quest_stale(db.session(), 'quest-1')
+    db.session.commit()
+    assert set(boards.get_cards(version, ['quest-1', 'quest-2'])) == {'quest-2'}
+    assert boards.catalog_version() == version
+    assert boards.get_board('alice', version) is not None
+
+    QuestBoardCache.mark_quest_stale(db.session(), 'quest-2', catalog=True)
+    db.session.commit()
+    assert boards.catalog_version() != version
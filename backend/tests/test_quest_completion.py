@@ -0,0 +1,81 @@
+# tests/test_quest_completion.py
+
+from decimal import Decimal
+
+import pytest
+from app.extensions import cache, db
+from app.services import leveling
+from app.services.ledger import ledger
+from app.services.quest_board import quest_board_cache
+from app.services.quest_completion import complete_quest_for_users
+from app.services.quest_participation import quest_participation
+from app.services.quest_stats import ALL_TIME, QuestStatsRollup
+
+PLAYERS = ['solo', 'bulk-a', 'bulk-b']
+
+
+@pytest.fixture
+def stats(db_app, monkeypatch):
+    """Fresh quest_stats buffer, also used by the after_commit hook."""
+    import app.services.quest_stats as module
+    instance = QuestStatsRollup()
+    monkeypatch.setattr(module, 'quest_stats', instance)
+    return instance
+
+
+@pytest.fixture
+def quest(db_app):
+    from app.models.quest import Quest, QuestDifficulty, QuestProgress, QuestStatus
+    from app.models.user import User
+
+    db.session.execute(User.__table__.insert(), [
+        {'id': user_id, 'username': user_id, 'email': f'{user_id}@example.com', 'password_hash': 'x',
+         'level': 1, 'experience_points': 10}
+        for user_id in PLAYERS + ['idle']
+    ])
+    # Enough XP to cross several levels, so level rewards are paid too
+    db.session.execute(Quest.__table__.insert().values(
+        id='finale', title='Finale', description='Finale', creator_id='creator',
+        status=QuestStatus.ACTIVE, difficulty=QuestDifficulty.HARD,
+        pi_reward=Decimal('2.5'), xp_reward=leveling.xp_for_level(4)
+    ))
+    db.session.execute(QuestProgress.__table__.insert(), [
+        {'user_id': user_id, 'quest_id': 'finale', 'status': 'in_progress'} for user_id in PLAYERS
+    ])
+    db.session.commit()
+    return db.session.get(Quest, 'finale')
+
+
+def test_bulk_completion_matches_single_user_path(quest, stats):
+    from app.models.quest import QuestProgress, QuestReward
+    from app.models.user import User
+
+    for user_id in PLAYERS:
+        cache.set(quest_board_cache._board_key(user_id), ['cached'])
+
+    single = quest.complete_for_user(db.session.get(User, 'solo'))
+    db.session.commit()
+    bulk = complete_quest_for_users('finale', ['bulk-a', 'bulk-b', 'idle', 'bulk-a'], batch_size=1)
+
+    assert bulk['skipped'] == ['idle']
+    assert set(bulk['results']) == {'bulk-a', 'bulk-b'}
+    for user_id in ('bulk-a', 'bulk-b'):
+        result = bulk['results'][user_id]
+        assert result.pop('pi_reward') == pytest.approx(single['pi_reward'])
+        assert result == single['xp_result']
+    assert single['xp_result']['leveled_up']
+
+    db.session.expire_all()
+    solo = db.session.get(User, 'solo')
+    for user_id in ('bulk-a', 'bulk-b'):
+        user = db.session.get(User, user_id)
+        assert (user.level, user.experience_points) == (solo.level, solo.experience_points)
+        assert ledger.ledger_balance(user_id) == ledger.ledger_balance('solo')
+        assert cache.get(quest_board_cache._board_key(user_id)) is None
+    assert ledger.ledger_balance('idle') == Decimal('0')
+
+    progress = QuestProgress.query.filter_by(quest_id='finale').all()
+    assert {row.status for row in progress} == {'completed'}
+    assert QuestReward.query.filter_by(quest_id='finale').count() == 3
+    assert quest_participation.pending('finale', 'completed') == 3
+    assert stats._pending[('quest', 'finale', ALL_TIME)].completed == 3
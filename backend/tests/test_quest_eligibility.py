@@ -0,0 +1,79 @@
+# tests/test_quest_eligibility.py
+
+from types import SimpleNamespace
+
+import pytest
+from app.extensions import db
+from app.services.quest_graph import QuestGraph
+from sqlalchemy import event
+
+QUESTS = {
+    'done': {},
+    'open': {},
+    'running': {},
+    'chained': {'prerequisites': ['done']},
+    'locked': {'prerequisites': ['open']},
+    'draft': {'status': 'DRAFT'},
+    'elite': {'level_required': 50},
+    'full': {'max_participants': 1, 'total_participants': 1},
+}
+
+
+@pytest.fixture
+def quests(db_app, monkeypatch):
+    """The quest catalog, with a prerequisite graph already built on the shared store."""
+    import app.models.quest as module
+    from app.models.quest import Quest, QuestProgress, QuestStatus
+
+    for quest_id, values in QUESTS.items():
+        values = dict(values)
+        db.session.execute(Quest.__table__.insert().values(
+            id=quest_id, title=quest_id, description=quest_id, creator_id='creator',
+            status=QuestStatus[values.pop('status', 'ACTIVE')], **values
+        ))
+    db.session.execute(QuestProgress.__table__.insert(), [
+        {'user_id': 'player', 'quest_id': 'done', 'status': 'completed'},
+        {'user_id': 'player', 'quest_id': 'running', 'status': 'in_progress'},
+    ])
+    db.session.commit()
+
+    graph = QuestGraph(store=db_app.extensions['kv_store'])
+    monkeypatch.setattr(module, 'quest_graph', graph)
+    graph.ensure_built()
+    return Quest.query.order_by(Quest.id).all()
+
+
+@pytest.fixture
+def statements(db_app):
+    """SQL statements executed while the test runs."""
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_batched_eligibility_matches_per_quest_checks(quests, statements):
+    from app.models.quest import Quest
+
+    user = SimpleNamespace(id='player', level=5)
+    expected = {quest.id: Quest.check_eligibility(user, [quest])[quest.id] for quest in quests}
+
+    progress = Quest.load_user_progress(user, quests)
+    assert {quest.id: quest._evaluate_eligibility(user, progress) for quest in quests} == expected
+    assert Quest.check_eligibility(user, [quest.id for quest in quests]) == expected
+
+    statements.clear()
+    cards = Quest.serialize_for_user(quests, user)
+
+    assert {card['id']: (card['can_participate'], card['participation_reason']) for card in cards} == expected
+    assert len(statements) == 1  # One progress query however many quests are listed
+    assert expected['done'] == (False, "Quest already completed")
+    assert expected['running'] == expected['chained'] == (True, "Eligible")
+    assert expected['locked'] == (False, "Prerequisites not met")
+    assert expected['draft'] == (False, "Quest is not active")
+    assert expected['elite'] == (False, "Level 50 required")
+    assert expected['full'] == (False, "Quest is full")
@@ -0,0 +1,76 @@
+# tests/test_quest_expiry.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from app.extensions import db
+from app.services import quest_expiry
+from app.services.quest_graph import QuestGraph
+from app.services.quest_search import QuestSearchIndex
+
+
+@pytest.fixture
+def store(db_app, monkeypatch):
+    """Shared store plus this worker's graph and search index on it."""
+    store = db_app.extensions['kv_store']
+    monkeypatch.setattr(quest_expiry, 'quest_graph', QuestGraph(store=store))
+    monkeypatch.setattr(quest_expiry, 'quest_search_index', QuestSearchIndex(store=store))
+    return store
+
+
+def _add_quest(quest_id, expires_at):
+    from app.models.quest import Quest, QuestProgress, QuestStatus
+
+    db.session.execute(Quest.__table__.insert().values(
+        id=quest_id, title=quest_id, description=quest_id, creator_id='creator',
+        status=QuestStatus.ACTIVE, expires_at=expires_at
+    ))
+    db.session.execute(QuestProgress.__table__.insert().values(
+        user_id='player', quest_id=quest_id, status='in_progress'
+    ))
+    db.session.commit()
+
+
+def test_job_expires_quests_and_bumps_shared_versions(store):
+    from app.models.quest import Quest, QuestProgress, QuestStatus
+
+    now = datetime.utcnow()
+    _add_quest('old', now - timedelta(minutes=1))
+    _add_quest('current', now + timedelta(days=1))
+    other_worker = QuestGraph(store=store)
+    other_worker._version = other_worker._shared.get(refresh=True)
+
+    summary = quest_expiry.QuestExpiryJob(batch_size=1).run_once()
+
+    assert summary['quests_expired'] == 1
+    assert summary['progress_closed'] == 1
+    assert db.session.get(Quest, 'old').status == QuestStatus.EXPIRED
+    assert db.session.get(Quest, 'current').status == QuestStatus.ACTIVE
+    assert QuestProgress.query.filter_by(quest_id='old').one().status == 'expired'
+    # Other workers see the bump and rebuild on their next read
+    assert other_worker._shared.get(refresh=True) != other_worker._version
+    assert int(store.get('quest_search:version')) == 1
+    assert store.get(quest_expiry.LOCK_KEY) is None
+
+
+def test_job_skips_while_another_process_holds_the_lock(store, monkeypatch):
+    runs = []
+    monkeypatch.setattr(quest_expiry, 'expire_quests', lambda **kwargs: runs.append(kwargs) or {})
+    job = quest_expiry.QuestExpiryJob(batch_size=10)
+
+    store.set(quest_expiry.LOCK_KEY, '1')
+    assert job.run_once() is None
+    assert runs == []
+
+    store.delete(quest_expiry.LOCK_KEY)
+    assert job.run_once() == {}
+    assert runs == [{'batch_size': 10}]
+
+
+def test_init_app_reads_config_and_stays_idle_when_testing(stub_app):
+    job = quest_expiry.QuestExpiryJob()
+    app = stub_app(TESTING=True, QUEST_EXPIRY_INTERVAL=5, QUEST_EXPIRY_BATCH_SIZE=50)
+    job.init_app(app)
+    assert (job.interval, job.batch_size) == (5, 50)
+    assert app.extensions['quest_expiry'] is job
+    assert job._thread is None
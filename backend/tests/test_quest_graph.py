@@ -0,0 +1,99 @@
+# tests/test_quest_graph.py
+
+import pytest
+from app.core.exceptions import ValidationError
+from app.services.quest_graph import QuestGraph
+from app.utils.kv_store import MemoryStore
+
+
+@pytest.fixture
+def graph():
+    graph = QuestGraph()
+    graph.build({
+        'a': [],
+        'b': ['a'],
+        'c': ['b'],
+        'd': ['a', 'c'],
+    })
+    return graph
+
+
+def test_topological_order_puts_prerequisites_first(graph):
+    order = graph.topological_order()
+    assert order.index('a') < order.index('b') < order.index('c') < order.index('d')
+
+
+def test_transitive_closure(graph):
+    assert graph.all_prerequisites('d') == {'a', 'b', 'c'}
+    assert graph.prerequisites_of('d') == {'a', 'c'}
+
+
+def test_prerequisites_met_is_subset_check(graph):
+    assert graph.prerequisites_met('d', {'a', 'c'})
+    assert not graph.prerequisites_met('d', {'a'})
+    assert graph.missing_prerequisites('d', {'a'}) == {'c'}
+
+
+def test_unlocked_by(graph):
+    assert graph.unlocked_by('a', set()) == ['b']
+    assert graph.unlocked_by('c', {'a', 'b'}) == ['d']
+
+
+def test_build_rejects_cycle():
+    with pytest.raises(ValidationError):
+        QuestGraph().build({'x': ['y'], 'y': ['x']})
+
+
+def test_update_rejects_cycle(graph):
+    with pytest.raises(ValidationError):
+        graph.update_quest('a', ['d'])
+    assert graph.prerequisites_of('a') == frozenset()
+
+
+def test_validate_changes_rejects_cycle_across_batch(graph):
+    with pytest.raises(ValidationError):
+        graph.validate_changes({'x': ['y'], 'y': ['x']})
+
+
+def test_incremental_update_refreshes_dependents(graph):
+    graph.update_quest('b', [])
+    assert graph.all_prerequisites('c') == {'b'}
+    assert graph.all_prerequisites('d') == {'a', 'b', 'c'}
+
+    graph.remove_quest('c')
+    assert 'c' not in graph.topological_order()
+    assert graph.all_prerequisites('d') == {'a', 'c'}
+
+
+def test_change_published_by_one_worker_rebuilds_the_others(monkeypatch):
+    store = MemoryStore()
+    database = {'a': [], 'b': ['a']}
+    writer, reader = QuestGraph(store=store), QuestGraph(store=store)
+    loads = []
+    for worker in (writer, reader):
+        worker._shared.check_interval = 0
+        monkeypatch.setattr(worker, '_load_edges', lambda worker=worker: loads.append(worker) or dict(database))
+        worker.ensure_built()
+    assert loads == [writer, reader]
+
+    # The writer commits a new quest: applies it locally, then publishes
+    database['c'] = ['b']
+    writer.update_quest('c', ['b'])
+    writer.publish()
+
+    writer.ensure_built()
+    reader.ensure_built()
+    assert loads == [writer, reader, reader]
+    assert reader.all_prerequisites('c') == {'a', 'b'}
+
+
+def test_version_is_rechecked_only_after_interval():
+    store = MemoryStore()
+    graph = QuestGraph(store=store)
+    graph._shared.check_interval = 60
+    graph.build({'a': []})
+    graph._version = graph._shared.get(refresh=True)
+
+    store.incr('quest_graph:version')
+    graph.ensure_built()  # Within the interval: no round trip, no rebuild
+    assert graph._shared.get() == graph._version
@@ -0,0 +1,50 @@
+# tests/test_quest_leaderboard.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from app.services.quest_leaderboard import QuestLeaderboard
+from app.utils.kv_store import MemoryStore
+
+
+@pytest.fixture
+def leaderboard():
+    return QuestLeaderboard(store=MemoryStore())
+
+
+def _profile(name):
+    return {'username': name, 'display_name': name.title(), 'level': 3}
+
+
+def test_orders_by_completions_then_xp(leaderboard):
+    now = datetime(2025, 6, 4, 12, 0)
+    leaderboard.record_completion('alice', 100, 1.5, _profile('alice'), now)
+    leaderboard.record_completion('bob', 50, 0.5, _profile('bob'), now)
+    leaderboard.record_completion('bob', 10, 0.5, _profile('bob'), now)
+    leaderboard.record_completion('carol', 500, 2.0, _profile('carol'), now)
+
+    top = leaderboard.top('daily', 10, now)
+    assert [entry['user_id'] for entry in top] == ['bob', 'carol', 'alice']
+    assert top[0]['quests_completed'] == 2
+    assert top[0]['total_xp_earned'] == 60
+    assert top[0]['total_pi_earned'] == 1.0
+    assert top[0]['username'] == 'bob'
+
+
+def test_rank_lookup(leaderboard):
+    now = datetime(2025, 6, 4, 12, 0)
+    leaderboard.record_completion('alice', 100, 0, _profile('alice'), now)
+    leaderboard.record_completion('bob', 200, 0, _profile('bob'), now)
+
+    assert leaderboard.rank('weekly', 'alice', now)['rank'] == 2
+    assert leaderboard.rank('weekly', 'nobody', now) is None
+
+
+def test_daily_bucket_rolls_over_without_recompute(leaderboard):
+    today = datetime(2025, 6, 4, 23, 0)
+    leaderboard.record_completion('alice', 100, 0, _profile('alice'), today)
+
+    tomorrow = today + timedelta(hours=2)
+    assert leaderboard.top('daily', 10, tomorrow) == []
+    assert leaderboard.top('weekly', 10, tomorrow)[0]['user_id'] == 'alice'
+    assert leaderboard.top('all-time', 10, tomorrow)[0]['user_id'] == 'alice'
@@ -0,0 +1,74 @@
+# tests/test_quest_limits.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from app.services.quest_limits import QuestLimitCounter
+from app.utils.kv_store import MemoryStore
+
+
+@pytest.fixture
+def limits():
+    return QuestLimitCounter(daily_limit=2, weekly_limit=3, store=MemoryStore())
+
+
+def test_daily_limit_enforced(limits):
+    now = datetime(2025, 6, 4, 12, 0)
+    assert limits.try_acquire('user-1', now)[0]
+    assert limits.try_acquire('user-1', now)[0]
+
+    allowed, message = limits.try_acquire('user-1', now)
+    assert not allowed
+    assert 'Daily quest limit' in message
+    assert limits.counts('user-1', now) == (2, 2)
+
+
+def test_daily_counter_resets_next_day(limits):
+    monday = datetime(2025, 6, 2, 23, 59)
+    limits.try_acquire('user-1', monday)
+    limits.try_acquire('user-1', monday)
+
+    tuesday = monday + timedelta(minutes=2)
+    assert limits.try_acquire('user-1', tuesday)[0]
+    assert limits.counts('user-1', tuesday) == (1, 3)
+
+
+def test_weekly_limit_rolls_back_daily_slot(limits):
+    monday = datetime(2025, 6, 2, 10, 0)
+    limits.try_acquire('user-1', monday)
+    limits.try_acquire('user-1', monday)
+    limits.try_acquire('user-1', monday + timedelta(days=1))
+
+    wednesday = monday + timedelta(days=2)
+    allowed, message = limits.try_acquire('user-1', wednesday)
+    assert not allowed
+    assert 'Weekly quest limit' in message
+    assert limits.counts('user-1', wednesday) == (0, 3)
+
+
+def test_weekly_counter_resets_on_iso_week(limits):
+    sunday = datetime(2025, 6, 8, 10, 0)
+    for day in range(3):
+        limits.try_acquire('user-1', sunday - timedelta(days=day))
+
+    next_monday = sunday + timedelta(days=1)
+    assert limits.try_acquire('user-1', next_monday)[0]
+
+
+def test_release_returns_slot(limits):
+    now = datetime(2025, 6, 4, 12, 0)
+    limits.try_acquire('user-1', now)
+    limits.release('user-1', now)
+    assert limits.counts('user-1', now) == (0, 0)
+
+
+def test_release_after_counter_expired_creates_nothing(limits):
+    now = datetime(2025, 6, 4, 12, 0)
+    limits.try_acquire('user-1', now)
+    limits.store.delete(*limits._keys('user-1', now))  # TTL ran out before the release
+
+    limits.release('user-1', now)
+    assert limits.store.get_many(limits._keys('user-1', now)) == [None, None]
+    assert limits.try_acquire('user-1', now)[0]
+    assert limits.try_acquire('user-1', now)[0]
+    assert not limits.try_acquire('user-1', now)[0]
@@ -0,0 +1,103 @@
+# tests/test_quest_participation.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from app.extensions import db
+from app.services.quest_participation import (
+    LOCK_KEY, QuestParticipation, apply_participation_changes, release_participation_reservations
+)
+from app.utils.kv_store import MemoryStore
+
+
+@pytest.fixture
+def participation():
+    return QuestParticipation(shards=4, store=MemoryStore())
+
+
+def _quest(max_participants, total_participants=0):
+    return SimpleNamespace(id='quest-1', max_participants=max_participants,
+                           total_participants=total_participants)
+
+
+def test_max_participants_enforced_under_concurrency(participation):
+    quest = _quest(max_participants=50, total_participants=10)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda _: participation.reserve(None, quest), range(200)))
+
+    assert results.count(True) == 40
+    assert participation.remaining(quest) == 0
+    assert participation.pending('quest-1') == 40
+
+
+def test_rollback_returns_reserved_slot(participation, monkeypatch):
+    import app.services.quest_participation as module
+    monkeypatch.setattr(module, 'quest_participation', participation)
+
+    quest = _quest(max_participants=1)
+    session = SimpleNamespace(info={})
+    assert participation.reserve(session, quest)
+    assert not participation.reserve(SimpleNamespace(info={}), quest)
+
+    release_participation_reservations(session)
+    assert participation.remaining(quest) == 1
+    assert participation.pending('quest-1') == 0
+
+    session = SimpleNamespace(info={})
+    assert participation.reserve(session, quest)
+    apply_participation_changes(session)
+    assert participation.remaining(quest) == 0
+    assert participation.pending('quest-1') == 1
+
+
+def test_unlimited_quests_are_counted(participation):
+    quest = _quest(max_participants=None)
+    for _ in range(5):
+        assert participation.reserve(None, quest)
+    participation.record_completion(None, 'quest-1')
+    assert participation.remaining(quest) is None
+    assert participation.pending('quest-1', 'started') == 5
+    assert participation.pending('quest-1', 'completed') == 1
+    assert participation._drain('quest-1', 'started') == 5
+    assert participation.pending('quest-1', 'started') == 0
+
+
+def test_flush_lock_lets_one_process_fold(participation):
+    participation.store.set(LOCK_KEY, '1')
+    assert participation.run_once() is None
+
+    participation.store.delete(LOCK_KEY)
+    assert participation.run_once() == 0
+    assert participation.store.get(LOCK_KEY) is None
+
+
+def test_background_flusher_folds_counts(db_app, monkeypatch):
+    from app.models.quest import Quest, QuestStatus
+
+    monkeypatch.setattr('atexit.register', lambda fn: None)
+    db.session.execute(Quest.__table__.insert().values(
+        id='quest-1', title='Quest', description='Quest', creator_id='creator', status=QuestStatus.ACTIVE
+    ))
+    db.session.commit()
+
+    participation = QuestParticipation(shards=4, store=MemoryStore())
+    quest = _quest(max_participants=None)
+    for _ in range(3):
+        participation.reserve(None, quest)
+    participation.record_completion(None, 'quest-1')
+
+    db_app.config.update(TESTING=False, QUEST_PARTICIPATION_FLUSH_INTERVAL=0.01)
+    participation.init_app(db_app)
+    try:
+        deadline = time.monotonic() + 5
+        while participation.pending('quest-1') or participation.pending('quest-1', 'completed'):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        participation.stop()
+
+    db.session.expire_all()
+    quest = db.session.get(Quest, 'quest-1')
+    assert (quest.total_participants, quest.total_completions) == (3, 1)
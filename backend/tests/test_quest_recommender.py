@@ -0,0 +1,72 @@
+# tests/test_quest_recommender.py
+
+import numpy as np
+import pytest
+from app.models.quest import QuestDifficulty
+from app.services.quest_recommender import QuestCatalogMatrix, QuestRecommender
+
+
+@pytest.fixture
+def matrix():
+    return QuestCatalogMatrix(
+        quest_ids=['q1', 'q2', 'q3', 'q4'],
+        level_required=np.array([1.0, 5.0, 10.0, 30.0]),
+        difficulty_multiplier=np.array([1.0, 1.5, 2.0, 3.0]),
+        completion_rate=np.array([0.9, 0.5, 0.2, 0.1]),
+        duration=np.array([10.0, 30.0, 60.0, 120.0]),
+        reward=np.array([100.0, 300.0, 600.0, 2000.0]),
+        category_index=np.array([0, 1, 1, 0]),
+        categories={1: 0, 2: 1},
+        version='v1'
+    )
+
+
+def test_locked_and_started_quests_are_excluded(matrix):
+    history = [('q1', 1, QuestDifficulty.EASY, 'completed')]
+    scores = QuestRecommender().score(matrix, user_level=10, history=history)
+    assert np.isneginf(scores[0])  # already completed
+    assert np.isneginf(scores[3])  # level 30 required
+    assert np.isfinite(scores[1]) and np.isfinite(scores[2])
+
+
+def test_category_affinity_raises_score(matrix):
+    recommender = QuestRecommender()
+    neutral = recommender.score(matrix, user_level=5, history=[])
+    history = [('other', 2, QuestDifficulty.EASY, 'completed')]
+    preferred = recommender.score(matrix, user_level=5, history=history)
+    assert preferred[1] > neutral[1]
+    assert preferred[0] == pytest.approx(neutral[0])
+
+
+def test_quests_the_user_cannot_start_are_replaced(db_app, monkeypatch):
+    import app.models.quest as module
+    from types import SimpleNamespace
+    from app.extensions import db
+    from app.models.quest import Quest, QuestStatus
+    from app.services.quest_graph import QuestGraph
+
+    # Rewards put the two blocked quests at the top of the ranking
+    quests = {
+        'gated': {'xp_reward': 5000, 'prerequisites': ['starter']},
+        'full': {'xp_reward': 4000, 'max_participants': 1, 'total_participants': 1},
+        'starter': {'xp_reward': 100},
+        'side': {'xp_reward': 50},
+    }
+    for quest_id, values in quests.items():
+        db.session.execute(Quest.__table__.insert().values(
+            id=quest_id, title=quest_id, description=quest_id, creator_id='creator',
+            status=QuestStatus.ACTIVE, **values
+        ))
+    db.session.commit()
+    graph = QuestGraph(store=db_app.extensions['kv_store'])
+    monkeypatch.setattr(module, 'quest_graph', graph)
+    graph.ensure_built()
+
+    recommender = QuestRecommender()
+    user = SimpleNamespace(id='player', level=1)
+    scores = recommender.score(recommender.catalog(), user.level, [])
+    assert set(np.array(recommender.catalog().quest_ids)[np.argsort(-scores)[:2]]) == {'gated', 'full'}
+
+    ranked = recommender.recommend(user, limit=1)
+    assert [quest.id for quest, _ in ranked] == ['starter']
+    assert [quest.id for quest, _ in recommender.recommend(user, limit=5)] == ['starter', 'side']
@@ -0,0 +1,95 @@
+# tests/test_quest_search.py
+
+import pytest
+from app.services.quest_search import QuestSearchIndex
+from app.utils.kv_store import MemoryStore
+
+
+def _doc(quest_id, title, tags=(), description='', difficulty='easy',
+         quest_type='daily', status='active', level=1, rate=0.0):
+    return {
+        'id': quest_id,
+        'title': title,
+        'description': description,
+        'short_description': None,
+        'tags': list(tags),
+        'difficulty': difficulty,
+        'quest_type': quest_type,
+        'status': status,
+        'level_required': level,
+        'completion_rate': rate,
+    }
+
+
+@pytest.fixture
+def index():
+    index = QuestSearchIndex()
+    index.build([
+        _doc('q1', 'Dragon Slayer', tags=['combat', 'boss'], difficulty='hard', level=20),
+        _doc('q2', 'Daily Drills', tags=['combat'], description='Practice with the dragon dummy'),
+        _doc('q3', 'Merchant Run', tags=['trade'], quest_type='weekly', level=5),
+        _doc('q4', 'Dragon Egg Hunt', tags=['explore'], status='expired'),
+    ])
+    return index
+
+
+def test_title_match_outranks_description_match(index):
+    hits, total = index.search('dragon')
+    assert [quest_id for quest_id, _ in hits] == ['q1', 'q2']
+    assert total == 2
+
+
+def test_prefix_matching(index):
+    hits, _ = index.search('merch')
+    assert [quest_id for quest_id, _ in hits] == ['q3']
+
+
+def test_all_tokens_must_match(index):
+    hits, _ = index.search('dragon boss')
+    assert [quest_id for quest_id, _ in hits] == ['q1']
+
+
+def test_filters(index):
+    hits, _ = index.search('combat', difficulty='easy')
+    assert [quest_id for quest_id, _ in hits] == ['q2']
+    hits, _ = index.search('', max_level=5)
+    assert {quest_id for quest_id, _ in hits} == {'q2', 'q3'}
+    hits, _ = index.search('egg', status=None)
+    assert [quest_id for quest_id, _ in hits] == ['q4']
+
+
+def test_incremental_update_and_remove(index):
+    index.index_quest(_doc('q3', 'Caravan Escort', tags=['trade']))
+    assert index.search('merchant')[1] == 0
+    assert index.search('caravan')[0][0][0] == 'q3'
+
+    index.remove_quest('q1')
+    assert [quest_id for quest_id, _ in index.search('dragon')[0]] == ['q2']
+    assert index.search('slayer')[1] == 0
+
+
+def test_completion_rate_boosts_ranking(index):
+    index.index_quest(_doc('q2', 'Daily Drills', tags=['combat'],
+                           description='Practice with the dragon dummy', rate=1.0))
+    hits, _ = index.search('combat')
+    assert hits[0][0] == 'q2'
+
+
+def test_change_published_by_one_worker_rebuilds_the_others(monkeypatch):
+    store = MemoryStore()
+    database = {'q1': _doc('q1', 'Dragon Slayer')}
+    writer, reader = QuestSearchIndex(store=store), QuestSearchIndex(store=store)
+    for worker in (writer, reader):
+        worker._shared.check_interval = 0
+        monkeypatch.setattr(worker, '_load_docs', lambda chunk_size: list(database.values()))
+        worker.ensure_built()
+
+    database['q1'] = _doc('q1', 'Dragon Slayer', status='expired')
+    writer.set_status('q1', 'expired')
+    writer.publish()
+
+    writer.ensure_built()
+    assert writer._version == reader._shared.get(refresh=True)
+    assert reader.search('dragon')[1] == 1
+    reader.ensure_built()
+    assert reader.search('dragon')[1] == 0
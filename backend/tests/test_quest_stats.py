@@ -0,0 +1,36 @@
+# tests/test_quest_stats.py
+
+from datetime import datetime
+
+from app.services.quest_stats import (
+    ALL_TIME, QuestStatsRollup, duration_bucket, histogram_median, merge_histograms
+)
+
+
+def test_histogram_median_is_within_bucket_resolution():
+    durations = [60, 120, 300, 600, 3600]
+    histogram = merge_histograms([{duration_bucket(d): 1} for d in durations])
+    median = histogram_median(histogram)
+    assert 300 / 1.2 < median < 300 * 1.2
+    assert histogram_median({}) is None
+
+
+def test_record_merges_hourly_and_all_time_deltas():
+    rollup = QuestStatsRollup()
+    started = datetime(2025, 6, 4, 10, 15)
+    finished = datetime(2025, 6, 4, 11, 5)
+    rollup.record([
+        ('started', 'q1', started, {}),
+        ('started', 'q1', started, {}),
+        ('completed', 'q1', finished, {'duration': 3000}),
+        ('abandoned', 'q1', finished, {}),
+        ('active_quests', 'q1', ALL_TIME, {'category_id': 7, 'delta': 1}),
+    ])
+
+    totals = rollup._pending[('quest', 'q1', ALL_TIME)]
+    assert (totals.started, totals.completed, totals.abandoned) == (2, 1, 1)
+    assert totals.duration_total == 3000
+
+    assert rollup._pending[('quest', 'q1', datetime(2025, 6, 4, 10))].started == 2
+    assert rollup._pending[('quest', 'q1', datetime(2025, 6, 4, 11))].completed == 1
+    assert rollup._pending[('category', '7', ALL_TIME)].active_quests == 1
@@ -0,0 +1,67 @@
+# tests/test_snowflake.py
+
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from app.utils.snowflake import MAX_SEQUENCE, SnowflakeGenerator, decode
+
+
+def test_ids_are_unique_ordered_and_fit_the_column():
+    generator = SnowflakeGenerator(worker_id=7)
+    ids = [generator.next_id() for _ in range(20000)]
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(len(reference) == 16 and reference.startswith('TXN') for reference in ids)
+
+
+def test_decode_round_trip():
+    generator = SnowflakeGenerator(worker_id=513)
+    before = datetime.utcnow() - timedelta(milliseconds=5)
+    created_at, worker_id, sequence = decode(generator.next_id())
+    assert worker_id == 513
+    assert sequence == 0
+    assert before <= created_at <= datetime.utcnow() + timedelta(milliseconds=5)
+
+
+def test_batch_continues_single_sequence():
+    generator = SnowflakeGenerator(worker_id=3)
+    ids = [generator.next_id()] + generator.next_ids(3 * (MAX_SEQUENCE + 1)) + [generator.next_id()]
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+
+
+def test_clock_rewind_and_sequence_overflow_stay_ordered():
+    generator = SnowflakeGenerator(worker_id=1)
+    now = 1800000000000 * 1000000
+    with patch('time.time_ns', return_value=now):
+        first = generator.next_ids(MAX_SEQUENCE + 2)  # Overflows into the next millisecond
+    with patch('time.time_ns', return_value=now - 10 ** 9):
+        rewound = generator.next_ids(10)
+    ids = first + rewound
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert decode(rewound[0])[0] >= decode(first[-1])[0]
+
+
+def test_threads_never_share_an_id():
+    generator = SnowflakeGenerator(worker_id=2)
+    results = []
+
+    def generate():
+        results.append([generator.next_id() for _ in range(5000)])
+
+    threads = [threading.Thread(target=generate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = [reference for chunk in results for reference in chunk]
+    assert len(set(ids)) == len(ids) == 40000
+
+
+def test_workers_differ():
+    a, b = SnowflakeGenerator(worker_id=1), SnowflakeGenerator(worker_id=2)
+    assert not set(a.next_ids(1000)) & set(b.next_ids(1000))
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(worker_id=1024)
@@ -0,0 +1,77 @@
+# tests/test_transaction_expiry.py
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from app.extensions import db
+from app.services import transaction_expiry
+from app.services.transaction_expiry import LOCK_KEY, TransactionExpiryJob, expire_transactions
+
+
+@pytest.fixture
+def transactions(db_app):
+    """Five expired pending transactions, one live pending and one expired completed."""
+    from app.models.transaction import Transaction, TransactionStatus, TransactionType
+
+    now = datetime.utcnow()
+    rows = [(f"expired-{i}", TransactionStatus.PENDING, now - timedelta(minutes=i + 1)) for i in range(5)]
+    rows += [('live', TransactionStatus.PENDING, now + timedelta(hours=1)),
+             ('done', TransactionStatus.COMPLETED, now - timedelta(hours=1))]
+    db.session.execute(Transaction.__table__.insert(), [{
+        'id': txn_id, 'reference_number': f"REF-{txn_id}", 'transaction_type': TransactionType.TRANSFER,
+        'amount': Decimal('1'), 'net_amount': Decimal('1'), 'status': status, 'expires_at': expires_at,
+        'created_at': now - timedelta(hours=2)
+    } for txn_id, status, expires_at in rows])
+    db.session.commit()
+    return now
+
+
+def _statuses():
+    from app.models.transaction import Transaction
+
+    db.session.expire_all()
+    return {txn.id: txn.status.value for txn in Transaction.query}
+
+
+def test_expires_in_chunked_updates(transactions):
+    batches = []
+    summary = expire_transactions(batch_size=2, now=transactions, progress=batches.append)
+
+    assert summary['expired'] == 5
+    assert summary['batches'] == 3
+    assert [batch['expired'] for batch in batches] == [2, 4, 5]
+    statuses = _statuses()
+    assert {statuses[f"expired-{i}"] for i in range(5)} == {'failed'}
+    assert (statuses['live'], statuses['done']) == ('pending', 'completed')
+
+
+def test_dry_run_only_counts(transactions):
+    summary = expire_transactions(dry_run=True, now=transactions)
+    assert summary['expired'] == 5
+    assert summary['batches'] == 0
+    assert set(_statuses().values()) == {'pending', 'completed'}
+
+
+def test_time_budget_stops_between_batches(transactions, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(transaction_expiry.time, 'monotonic', lambda: next(clock))
+
+    summary = expire_transactions(batch_size=2, time_budget=1.5, now=transactions)
+
+    assert summary['budget_exhausted']
+    assert summary['expired'] == 2  # The next run picks up the rest
+    assert expire_transactions(batch_size=10, time_budget=None, now=transactions)['expired'] == 3
+
+
+def test_job_skips_while_another_process_holds_the_lock(db_app, transactions):
+    store = db_app.extensions['kv_store']
+    job = TransactionExpiryJob(batch_size=10)
+
+    store.set(LOCK_KEY, '1')
+    assert job.run_once() is None
+    assert 'failed' not in _statuses().values()
+
+    store.delete(LOCK_KEY)
+    assert job.run_once()['expired'] == 5
+    assert store.get(LOCK_KEY) is None
@@ -0,0 +1,51 @@
+# tests/test_transaction_export.py
+
+import csv
+import gzip
+import io
+import json
+import zlib
+
+from app.services.transaction_export import COLUMNS, _render_csv, _render_ndjson, gzip_stream
+
+RECORD = {column: None for column in COLUMNS}
+RECORD.update(id='t1', amount='1.50000000', description='rent, "march"')
+
+
+def test_ndjson_is_one_object_per_line():
+    lines = _render_ndjson([RECORD, dict(RECORD, id='t2')]).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == ['t1', 't2']
+    assert json.loads(lines[0])['amount'] == '1.50000000'
+
+
+def test_csv_header_once_and_quoted_fields():
+    body = _render_csv([], header=True) + _render_csv([RECORD]) + _render_csv([dict(RECORD, id='t2')])
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [row['id'] for row in rows] == ['t1', 't2']
+    assert rows[0]['description'] == 'rent, "march"'
+
+
+def test_gzip_stream_round_trips_and_flushes_each_chunk():
+    chunks = ['a' * 1000, 'b' * 1000, 'c']
+    compressed = list(gzip_stream(iter(chunks)))
+    assert gzip.decompress(b''.join(compressed)).decode() == ''.join(chunks)
+
+    # Each chunk decompresses on arrival, before the stream ends
+    decompressor = zlib.decompressobj(31)
+    assert decompressor.decompress(compressed[0]) == b'a' * 1000
+
+
+def test_gzip_stream_closes_source_on_disconnect():
+    closed = []
+
+    def source():
+        try:
+            while True:
+                yield 'row\n'
+        finally:
+            closed.append(True)
+
+    stream = gzip_stream(source())
+    next(stream)
+    stream.close()
+    assert closed == [True]
@@ -0,0 +1,49 @@
+# tests/test_transaction_history.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from app.core.exceptions import ValidationError
+from app.extensions import db
+from app.services.transaction_history import decode_cursor, encode_cursor, history_page
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 1, 12, 30, 5, 123456)
+    cursor = encode_cursor(created_at, '6f1c2a9e-0000-4000-8000-000000000000')
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (created_at, '6f1c2a9e-0000-4000-8000-000000000000')
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '!!!', encode_cursor(datetime(2026, 1, 1), 'x')[:-4]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValidationError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_sent_and_received_in_order_without_gaps(db_app):
+    from app.models.transaction import Transaction, TransactionType
+
+    start = datetime(2026, 3, 1)
+    rows = []
+    for index in range(9):
+        sender, receiver = [('alice', 'bob'), ('bob', 'alice'), ('carol', 'bob')][index % 3]
+        rows.append({
+            'id': f"txn-{index}", 'reference_number': f"REF{index}", 'sender_id': sender,
+            'receiver_id': receiver, 'transaction_type': TransactionType.TRANSFER, 'amount': 1,
+            'net_amount': 1, 'created_at': start + timedelta(seconds=index // 4)  # Ties across pages
+        })
+    db.session.execute(Transaction.__table__.insert(), rows)
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = history_page('alice', limit=2, cursor=cursor)
+        seen.extend(txn.id for txn in page['transactions'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    expected = sorted((row for row in rows if 'alice' in (row['sender_id'], row['receiver_id'])),
+                      key=lambda row: (row['created_at'], row['id']), reverse=True)
+    assert seen == [row['id'] for row in expected]
@@ -0,0 +1,138 @@
+# tests/test_transaction_retry.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from app.extensions import db
+from app.models.transaction import Transaction, TransactionStatus
+from app.services.transaction_retry import MAX_RETRIES, TransactionRetryScheduler
+
+
+class _Queue:
+    def __init__(self, queued=()):
+        self.queued = set(queued)
+        self.enqueued = []
+
+    def is_queued(self, transaction_id):
+        return transaction_id in self.queued
+
+    def enqueue(self, transaction_id, priority=5):
+        self.enqueued.append((transaction_id, priority))
+        self.queued.add(transaction_id)
+        return True
+
+
+class _Txn:
+    """Just the state Transaction's settle methods touch."""
+    apply_pi_payment = Transaction.apply_pi_payment
+    mark_payment_unknown = Transaction.mark_payment_unknown
+    _fail_transaction = Transaction._fail_transaction
+
+    def __init__(self):
+        self.released = False
+        self.status = TransactionStatus.PROCESSING
+        self.error_message = None
+        self.retry_count = 0
+        self.next_retry_at = None
+        self.pi_payment_id = None
+
+    def _complete_transaction(self):
+        self.status = TransactionStatus.COMPLETED
+
+    def _release_hold(self):
+        self.released = True
+
+
+_PAYMENT = {'pi_transaction_id': 'pi-txn', 'pi_payment_id': 'pi-pay', 'blockchain_hash': 'hash'}
+
+
+@pytest.mark.parametrize('retry_count, delay', [(1, 30), (2, 60)])
+def test_backoff_doubles_with_jitter(retry_count, delay):
+    scheduler = TransactionRetryScheduler(queue=_Queue())
+    now = datetime(2026, 1, 1)
+    delays = {(scheduler.next_retry_at(retry_count, now) - now).total_seconds() for _ in range(200)}
+    assert all(delay / 2 <= value <= delay for value in delays)
+    assert len(delays) > 1
+
+
+def test_backoff_is_capped_and_stops_after_max_retries():
+    scheduler = TransactionRetryScheduler(queue=_Queue())
+    scheduler.base_delay, scheduler.max_delay = 600, 900
+    now = datetime(2026, 1, 1)
+    assert scheduler.next_retry_at(2, now) <= now + timedelta(seconds=900)
+    assert scheduler.next_retry_at(MAX_RETRIES, now) is None
+
+
+def test_no_retries_scheduled_while_in_flight_slots_are_full():
+    scheduler = TransactionRetryScheduler(queue=_Queue(queued={'a', 'b'}))
+    scheduler.max_in_flight = 2
+    scheduler._in_flight = {'a', 'b', 'finished'}
+    assert scheduler.run_once() == 0
+    assert scheduler._in_flight == {'a', 'b'}
+
+
+def test_declined_payment_is_scheduled_for_retry():
+    txn = _Txn()
+    assert not txn.apply_pi_payment(None, "Declined")
+    assert txn.status == TransactionStatus.FAILED
+    assert txn.next_retry_at is not None
+    assert txn.released
+
+
+def test_paid_payment_always_completes():
+    txn = _Txn()
+    assert txn.apply_pi_payment(_PAYMENT)
+    assert txn.status == TransactionStatus.COMPLETED
+    assert txn.pi_payment_id == 'pi-pay'
+    assert not txn.released
+
+
+def test_failure_after_pi_paid_is_not_retried():
+    txn = _Txn()
+    txn.pi_payment_id = 'pi-pay'
+    txn._fail_transaction("Reconciliation failed")
+    assert txn.status == TransactionStatus.FAILED
+    assert txn.next_retry_at is None
+
+
+def test_timed_out_payment_awaits_reconciliation():
+    txn = _Txn()
+    txn.next_retry_at = datetime(2026, 1, 1)
+    txn.mark_payment_unknown("Pi Network payment timed out")
+    assert txn.status == TransactionStatus.UNKNOWN
+    assert txn.next_retry_at is None
+
+
+def test_lost_queued_payments_are_queued_again(db_app):
+    from app.models.transaction import TransactionType
+
+    now = datetime.utcnow()
+    past, future = now - timedelta(minutes=1), now + timedelta(minutes=5)
+    for txn_id, values in {
+        'lost': {'next_retry_at': past, 'priority': 2},
+        'waiting': {'next_retry_at': future},
+        'unqueued': {'next_retry_at': None},
+        'expired': {'next_retry_at': past, 'expires_at': past},
+        'paid': {'next_retry_at': past, 'pi_payment_id': 'pi-pay'},
+    }.items():
+        db.session.add(Transaction(id=txn_id, receiver_id='player', transaction_type=TransactionType.DEPOSIT,
+                                   amount=1, status=TransactionStatus.PENDING, **values))
+    db.session.commit()
+    queue = _Queue()
+    scheduler = TransactionRetryScheduler(queue=queue)
+
+    assert scheduler.run_once(now) == 1
+    assert queue.enqueued == [('lost', 2)]
+    assert db.session.get(Transaction, 'lost').next_retry_at == scheduler.recovery_at(now)
+    assert scheduler.metrics(now)['recovered'] == 1
+    # Queued again only once its new deadline passes
+    assert scheduler.run_once(now) == 0
+
+
+def test_claiming_clears_the_recovery_deadline():
+    txn = Transaction(amount=1, status=TransactionStatus.PENDING, expires_at=datetime.utcnow() - timedelta(1))
+    txn.mark_queued()
+    assert txn.next_retry_at is not None
+    assert not txn.begin_processing()
+    assert txn.status == TransactionStatus.FAILED
+    assert txn.next_retry_at is None
@@ -0,0 +1,117 @@
+# tests/test_transfer_batcher.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from app.extensions import db
+from app.services.ledger import REWARDS_ACCOUNT, ledger
+from app.services.transfer_batcher import TransferBatcher, TransferBatcherBusyError, _TransferRequest
+
+
+@pytest.fixture
+def batcher(monkeypatch):
+    monkeypatch.setattr('atexit.register', lambda fn: None)
+    session = type('Session', (), {'remove': lambda self: None})()
+    monkeypatch.setattr('app.services.transfer_batcher.db', type('DB', (), {'session': session}))
+    batcher = TransferBatcher()
+    batcher.batches = []
+
+    batcher.release = threading.Event()
+    batcher.release.set()
+
+    def fake_process(batch):
+        batcher.release.wait(5)
+        batcher.batches.append(len(batch))
+        for request in batch:
+            if request.amount <= 0:
+                request.future.set_result((400, {'error': 'Invalid amount'}))
+            else:
+                request.future.set_result((201, {'sender': request.sender_id}))
+
+    monkeypatch.setattr(batcher, '_process', fake_process)
+    yield batcher
+    batcher.stop()
+
+
+def test_concurrent_transfers_share_batches(batcher, stub_app):
+    batcher.init_app(stub_app(TRANSFER_BATCHING=True, TRANSFER_BATCH_WINDOW=0.05, TRANSFER_BATCH_SIZE=50))
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        results = list(pool.map(
+            lambda i: batcher.submit(f"user-{i}", 'receiver', Decimal(i % 5)), range(40)
+        ))
+
+    assert sum(batcher.batches) == 40
+    assert len(batcher.batches) < 40
+    assert [status for status, _ in results].count(400) == 8
+    assert results[1] == (201, {'sender': 'user-1'})
+
+
+def test_full_queue_is_rejected(batcher):
+    batcher._queue.maxsize = 1
+    batcher._queue.put_nowait(object())
+    batcher._thread = threading.Thread(target=lambda: None)  # Stalled batcher
+    with pytest.raises(TransferBatcherBusyError):
+        batcher.submit('a', 'b', Decimal(1))
+    batcher._thread = None
+
+
+def test_timed_out_request_gets_a_lookup_handle(batcher, stub_app):
+    batcher.init_app(stub_app(TRANSFER_BATCHING=True, TRANSFER_BATCH_TIMEOUT=0.05))
+    batcher.release.clear()
+    status, body = batcher.submit('alice', 'bob', Decimal(1))
+    batcher.release.set()
+
+    assert status == 202
+    assert body['status'] == 'accepted'
+    assert body['transaction_id']
+
+
+@pytest.fixture
+def users(db_app):
+    from app.models.user import User
+
+    db.session.execute(User.__table__.insert(), [
+        {'id': name, 'username': name, 'email': f"{name}@example.com", 'password_hash': 'x'}
+        for name in ('alice', 'bob')
+    ])
+    ledger.transfer(db.session, REWARDS_ACCOUNT, 'alice', '10', 'quest_reward')
+    db.session.commit()
+
+
+def _request(sender_id, receiver_id, amount):
+    return _TransferRequest(sender_id, receiver_id, Decimal(amount), None)
+
+
+def test_batch_checks_each_sender_against_what_it_already_moved(users):
+    from app.models.transaction import Transaction
+
+    batch = [
+        _request('alice', 'bob', '6'),
+        _request('alice', 'bob', '5'),  # Only 4 left after the first
+        _request('alice', 'bob', '4'),
+        _request('bob', 'alice', '1'),  # Incoming transfers are still pending, not funds
+        _request('carol', 'bob', '1'),
+    ]
+    TransferBatcher()._process(batch)
+
+    assert [request.future.result()[0] for request in batch] == [201, 400, 201, 400, 404]
+    assert {txn.id for txn in Transaction.query} == {batch[0].transaction_id, batch[2].transaction_id}
+    assert batch[0].future.result()[1]['transaction']['id'] == batch[0].transaction_id
+
+
+def test_failed_batch_commit_falls_back_to_one_commit_per_transfer(users):
+    from app.models.transaction import Transaction
+
+    first = [_request('alice', 'bob', '1')]
+    TransferBatcher()._process(first)
+    batch = [_request('alice', 'bob', '2'), _request('alice', 'bob', '3')]
+    batch[1].transaction_id = first[0].transaction_id  # Duplicate key fails the batch insert
+
+    TransferBatcher()._process(batch)
+
+    assert batch[0].future.result()[0] == 201
+    assert batch[1].future.result()[0] == 500
+    assert Transaction.query.count() == 2
+    assert db.session.get(Transaction, batch[0].transaction_id).amount == Decimal('2')